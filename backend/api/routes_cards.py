@@ -1,6 +1,10 @@
 from flask import Blueprint, jsonify, request
-from models import db, User, Credential, Role, Tenant, CredentialType
+from models import db, User, Credential, Role, Tenant, CredentialType, ParkingSession, Zone
 from sqlalchemy.orm import joinedload
+from services.credential_cache import CREDENTIAL_CACHE
+from services.session_index import SESSION_INDEX
+from services.occupancy import OCCUPANCY
+from services.dashboard_state import DASHBOARD_STATE
 
 users_bp = Blueprint('users', __name__)
 
@@ -74,6 +78,8 @@ def create_user():
                     db.session.add(new_c)
 
         db.session.commit()
+        # Nove vrednosti su mozda negativno kesirane (skenirane pre registracije)
+        CREDENTIAL_CACHE.invalidate_values(c.get('value') for c in data.get('credentials') or [] if c.get('value'))
         return jsonify({"message": "User created", "id": new_user.id}), 201
     except Exception as e:
         db.session.rollback()
@@ -111,6 +117,8 @@ def update_user(id):
                     db.session.add(new_c)
         
         db.session.commit()
+        CREDENTIAL_CACHE.invalidate_user(user.id)
+        CREDENTIAL_CACHE.invalidate_values(c.get('value') for c in data.get('credentials') or [] if c.get('value'))
         return jsonify({"message": "User updated"})
     except Exception as e:
         db.session.rollback()
@@ -121,6 +129,27 @@ def delete_user(id):
     user = User.query.get(id)
     if not user: return jsonify({"error": "Not found"}), 404
     
+    # Sesije ne postoje bez korisnika (user_id NOT NULL) - brisu se, a otvorena oslobadja mesto
+    open_session = ParkingSession.query.filter_by(user_id=id, exit_time=None).first()
+    zone_id = None
+    if open_session:
+        zone_id = open_session.zone_id or (open_session.entry_gate.zone_to_id if open_session.entry_gate else None)
+    tenant_id = user.tenant_id
+    if open_session and not OCCUPANCY.is_loaded:
+        # DB mod: brojaci su u Zone/Tenant redovima
+        zone = db.session.get(Zone, zone_id) if zone_id else None
+        if zone and zone.occupancy > 0: zone.occupancy -= 1
+        if user.tenant and user.tenant.current_usage > 0: user.tenant.current_usage -= 1
+    ParkingSession.query.filter_by(user_id=id).delete()
+
     db.session.delete(user) # Cascade će obrisati i credentials
     db.session.commit()
+    CREDENTIAL_CACHE.invalidate_user(id)
+    SESSION_INDEX.set(id, None)
+    if open_session:
+        if OCCUPANCY.is_loaded and zone_id:
+            # Memorijski mod: oslobadja se samo ovo vozilo (zona, preci i tenant), kao izlaz;
+            # write-behind upisuje nove vrednosti, a istovremeni skenovi ostaju uracunati
+            OCCUPANCY.release(zone_id, tenant_id)
+        DASHBOARD_STATE.invalidate()
     return jsonify({"message": "Deleted"})
\ No newline at end of file
@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request
 from models import db, Device, Gate
 from sqlalchemy.exc import IntegrityError
+from services.device_registry import DEVICE_ROUTES
+from services.dashboard_state import DASHBOARD_STATE
+from services.device_liveness import DEVICE_LIVENESS
 
 devices_bp = Blueprint('devices', __name__)
 
@@ -17,14 +20,18 @@ def get_devices():
             gate = Gate.query.get(d.gate_id)
             if gate: gate_name = gate.name
 
+        last_seen = DEVICE_LIVENESS.last_seen(d.ip_address)
         result.append({
             "id": d.id,
             "name": d.name if hasattr(d, 'name') else f"Device {d.id}", # Ako nemas 'name' kolonu, koristi ID
             "ip_address": d.ip_address,
             "port": d.port,
+            "ingress_port": d.ingress_port,
             "device_type": d.device_type.value if hasattr(d.device_type, 'value') else str(d.device_type),
             "gate_id": d.gate_id,
-            "gate_name": gate_name
+            "gate_name": gate_name,
+            "is_online": DEVICE_LIVENESS.is_online(d.ip_address),
+            "last_seen": last_seen.isoformat() if last_seen else None
         })
     return jsonify(result)
 
@@ -44,11 +51,14 @@ def create_device():
             name=data.get('name', 'New Device'),
             ip_address=data['ip_address'],
             port=int(data.get('port', 80)),
+            ingress_port=int(data['ingress_port']) if data.get('ingress_port') else None,
             device_type=data['device_type'], # Očekujemo string: "LPR_CAMERA", "CONTROLLER"...
             gate_id=int(data['gate_id']) if data.get('gate_id') else None
         )
         db.session.add(new_device)
         db.session.commit()
+        DEVICE_ROUTES.reload() # Forwarder odmah vidi novi IP
+        DASHBOARD_STATE.invalidate()
         return jsonify({"message": "Device added", "id": new_device.id}), 201
     except IntegrityError:
         db.session.rollback()
@@ -66,10 +76,14 @@ def update_device(id):
         device.name = data.get('name', device.name)
         device.ip_address = data.get('ip_address', device.ip_address)
         device.port = int(data.get('port', device.port))
+        if 'ingress_port' in data:
+            device.ingress_port = int(data['ingress_port']) if data['ingress_port'] else None
         device.device_type = data.get('device_type', device.device_type)
         device.gate_id = int(data['gate_id']) if data.get('gate_id') else None
         
         db.session.commit()
+        DEVICE_ROUTES.reload()
+        DASHBOARD_STATE.invalidate()
         return jsonify({"message": "Device updated"})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -81,4 +95,6 @@ def delete_device(id):
     
     db.session.delete(device)
     db.session.commit()
+    DEVICE_ROUTES.reload()
+    DASHBOARD_STATE.invalidate()
     return jsonify({"message": "Device deleted"})
\ No newline at end of file
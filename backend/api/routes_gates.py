@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request, current_app
 from sqlalchemy.orm import joinedload
 from models import db, Gate, Zone, ValidationRule, Device, ScanLog, RuleScope
+from services.device_liveness import DEVICE_LIVENESS
+from services.occupancy import OCCUPANCY
+from services.dashboard_state import DASHBOARD_STATE
 
 gates_bp = Blueprint('gates', __name__)
 
@@ -13,6 +16,7 @@ def serialize_log(log):
         'scan_type': log.scan_type.value if hasattr(log.scan_type, 'value') else str(log.scan_type),
         'status': 'ALLOWED' if log.is_access_granted else 'DENIED',
         'reason': log.denial_reason,
+        'hw_ack': log.hw_ack_status,
         'user': f"{log.resolved_user.first_name} {log.resolved_user.last_name}" if log.resolved_user else "Unknown"
     }
 
@@ -55,6 +59,11 @@ def get_gates():
     """
     gates = Gate.query.options(joinedload(Gate.zone_to), joinedload(Gate.zone_from)).all()
     results = []
+
+    # IP adrese uredjaja po gejtu (jedan upit za sve gejtove)
+    gate_ips = {}
+    for gate_id, ip in db.session.query(Device.gate_id, Device.ip_address).all():
+        gate_ips.setdefault(gate_id, []).append(ip)
     
     for gate in gates:
         # 1. Pronađi aktivna pravila specifična za ovu rampu
@@ -66,9 +75,9 @@ def get_gates():
 
         rule_names = [r.rule_type.value for r in active_rules]
 
-        # 2. Status uređaja (Simulacija - u realnosti proveravamo ping)
-        # Ovde bi smo pitali Device tabelu ili Cache
-        is_online = True 
+        # 2. Status uređaja iz Liveness registra (HEARTBEAT/sken u poslednjih N sekundi)
+        # Gejt je online ako je bar jedan njegov uređaj živ
+        is_online = any(DEVICE_LIVENESS.is_online(ip) for ip in gate_ips.get(gate.id, []))
 
         results.append({
             'id': gate.id,
@@ -91,26 +100,34 @@ def dashboard_stats():
     2. Status Hardvera (Total vs Online).
     """
     
-    # 1. Rekurzivna funkcija za izgradnju stabla zona
-    def build_zone_tree(zone):
-        children = Zone.query.filter_by(parent_zone_id=zone.id).all()
-        return {
+    # 1. Stablo zona: jedan upit, cvorovi se kace na roditelje (bez rekurzije i upita po cvoru).
+    # Popunjenost je vec zbirna po podstablu (OccupancyEngine rollup), pa se nista ne sabira ovde.
+    zones = Zone.query.order_by(Zone.id).all()
+    nodes = {}
+    for zone in zones:
+        occupancy = OCCUPANCY.zone_occupancy(zone.id, zone.occupancy)
+        nodes[zone.id] = {
             'id': zone.id,
             'name': zone.name,
             'capacity': zone.capacity,
-            'occupancy': zone.occupancy,
-            'percent_full': round((zone.occupancy / zone.capacity * 100), 1) if zone.capacity > 0 else 0,
-            'children': [build_zone_tree(child) for child in children]
+            'occupancy': occupancy,
+            'percent_full': round((occupancy / zone.capacity * 100), 1) if zone.capacity > 0 else 0,
+            'children': []
         }
 
     # Krećemo od Root zona (onih koje nemaju roditelja)
-    root_zones = Zone.query.filter_by(parent_zone_id=None).all()
-    zone_tree = [build_zone_tree(z) for z in root_zones]
-
-    # 2. Statistika Uređaja
-    total_devices = Device.query.count()
-    # Ovde bi išla logika za proveru 'last_seen'
-    online_devices = Device.query.count() # Placeholder za demo
+    zone_tree = []
+    for zone in zones:
+        parent = nodes.get(zone.parent_zone_id)
+        if parent is not None and zone.parent_zone_id != zone.id:
+            parent['children'].append(nodes[zone.id])
+        else:
+            zone_tree.append(nodes[zone.id])
+
+    # 2. Statistika Uređaja (online = javio se u poslednjih DEVICE_TIMEOUT_SECONDS)
+    device_ips = [ip for (ip,) in db.session.query(Device.ip_address).all()]
+    total_devices = len(device_ips)
+    online_devices = DEVICE_LIVENESS.count_online(device_ips)
 
     return jsonify({
         'zones_tree': zone_tree,
@@ -121,6 +138,17 @@ def dashboard_stats():
         }
     })
 
+@gates_bp.route('/dashboard/state', methods=['GET'])
+def dashboard_state():
+    """
+    Verzionisano stanje dashboard-a (zone, gejtovi, uredjaji, poslednji skenovi).
+    Bez parametra: ceo snapshot. Sa ?since=<verzija>: samo promene posle te verzije
+    ("type": "delta"), ili snapshot ako je verzija prestara za istorijat.
+    Posle snapshot-a klijent prati dashboard_delta evente preko Socket.IO.
+    """
+    since = request.args.get('since', type=int)
+    return jsonify(DASHBOARD_STATE.read(since))
+
 @gates_bp.route('/logs', methods=['GET'])
 def get_recent_logs():
     """Live Feed skeniranja za Dashboard"""
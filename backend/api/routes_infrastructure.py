@@ -1,5 +1,10 @@
 from flask import Blueprint, jsonify, request
-from models import db, Zone, Gate
+from models import db, Zone, Gate, Device
+from services.device_registry import DEVICE_ROUTES
+from services.device_liveness import DEVICE_LIVENESS
+from services.rule_index import RULE_INDEX
+from services.occupancy import OCCUPANCY
+from services.dashboard_state import DASHBOARD_STATE
 
 infra_bp = Blueprint('infrastructure', __name__)
 
@@ -15,7 +20,7 @@ def get_zones():
             "id": z.id,
             "name": z.name,
             "capacity": z.capacity,
-            "occupancy": z.occupancy,
+            "occupancy": OCCUPANCY.zone_occupancy(z.id, z.occupancy),
             "parent_zone_id": z.parent_zone_id,
             "parent_name": parent.name if parent else "ROOT (Main Complex)"
         })
@@ -32,6 +37,8 @@ def create_zone():
         )
         db.session.add(new_zone)
         db.session.commit()
+        OCCUPANCY.reload_limits()
+        DASHBOARD_STATE.invalidate()
         return jsonify({"message": "Zone created", "id": new_zone.id}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -54,6 +61,8 @@ def update_zone(id):
             zone.parent_zone_id = None
             
         db.session.commit()
+        OCCUPANCY.reload_limits() # Novi kapacitet vazi odmah za admit()
+        DASHBOARD_STATE.invalidate()
         return jsonify({"message": "Zone updated"})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -65,6 +74,9 @@ def delete_zone(id):
     try:
         db.session.delete(zone)
         db.session.commit()
+        RULE_INDEX.reload() # ZONE pravila za ovu zonu su obrisana kaskadno
+        OCCUPANCY.reload_limits()
+        DASHBOARD_STATE.invalidate()
         return jsonify({"message": "Deleted"})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -74,6 +86,10 @@ def delete_zone(id):
 @infra_bp.route('/gates', methods=['GET'])
 def get_gates():
     gates = Gate.query.all()
+    gate_ips = {}
+    for gate_id, ip in db.session.query(Device.gate_id, Device.ip_address).all():
+        gate_ips.setdefault(gate_id, []).append(ip)
+
     result = []
     for g in gates:
         z_from = Zone.query.get(g.zone_from_id) if g.zone_from_id else None
@@ -86,7 +102,7 @@ def get_gates():
             "zone_to_id": g.zone_to_id,
             "zone_from_name": z_from.name if z_from else "WORLD (Outside)",
             "zone_to_name": z_to.name if z_to else "WORLD (Outside)",
-            "is_online": True
+            "is_online": any(DEVICE_LIVENESS.is_online(ip) for ip in gate_ips.get(g.id, []))
         })
     return jsonify(result)
 
@@ -101,6 +117,7 @@ def create_gate():
         )
         db.session.add(new_gate)
         db.session.commit()
+        DASHBOARD_STATE.invalidate()
         return jsonify({"message": "Gate created", "id": new_gate.id}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -118,6 +135,7 @@ def update_gate(id):
         gate.zone_to_id = data.get('zone_to_id') or None
         
         db.session.commit()
+        DASHBOARD_STATE.invalidate()
         return jsonify({"message": "Gate updated"})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -129,6 +147,9 @@ def delete_gate(id):
     try:
         db.session.delete(gate)
         db.session.commit()
+        DEVICE_ROUTES.reload() # Brisanje gejta kaskadno brise i njegove uredjaje
+        RULE_INDEX.reload()    # ...i GATE pravila
+        DASHBOARD_STATE.invalidate()
         return jsonify({"message": "Deleted"})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
\ No newline at end of file
@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
 from models import db, Role
+from services.credential_cache import CREDENTIAL_CACHE
+from services.rule_index import RULE_INDEX
 
 roles_bp = Blueprint('roles', __name__)
 
@@ -49,6 +51,8 @@ def update_role(id):
         role.is_billable = data.get('is_billable', role.is_billable)
         
         db.session.commit()
+        # Snapshot-i korisnika nose flagove role
+        CREDENTIAL_CACHE.clear()
         return jsonify({"message": "Role updated"})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -60,6 +64,8 @@ def delete_role(id):
     try:
         db.session.delete(role)
         db.session.commit()
+        CREDENTIAL_CACHE.clear()
+        RULE_INDEX.reload() # ROLE pravila za ovu rolu su obrisana kaskadno
         return jsonify({"message": "Role deleted"})
     except Exception as e:
         return jsonify({"error": "Cannot delete role (maybe assigned to users?)"}), 400
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from models import db, ValidationRule, RuleType, RuleScope
+from services.rule_index import RULE_INDEX
 
 rules_bp = Blueprint('rules', __name__)
 
@@ -28,6 +29,7 @@ def toggle_rule(id):
     # Obrni vrednost (True -> False, False -> True)
     rule.is_enabled = not rule.is_enabled
     db.session.commit()
+    RULE_INDEX.reload()
     
     status = "ENABLED" if rule.is_enabled else "DISABLED"
     return jsonify({"message": f"Rule {status}", "is_enabled": rule.is_enabled})
@@ -44,4 +46,5 @@ def init_default_rules():
         db.session.add(ValidationRule(rule_type=RuleType.CHECK_BLACKLIST, scope=RuleScope.GLOBAL, is_enabled=True))
         
     db.session.commit()
+    RULE_INDEX.reload()
     return jsonify({"message": "Default rules initialized"})
\ No newline at end of file
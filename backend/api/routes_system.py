@@ -0,0 +1,179 @@
+from flask import Blueprint, jsonify, current_app, request
+
+from services.debounce import SCAN_DEBOUNCE
+from services.credential_cache import CREDENTIAL_CACHE
+from services.occupancy import OCCUPANCY
+from services.session_index import SESSION_INDEX
+from services.lock_manager import SCAN_LOCKS
+from services.latency import SCAN_LATENCY
+from services.realtime_rooms import SUBSCRIPTIONS
+from services.async_logging import async_logging_stats
+
+system_bp = Blueprint('system', __name__)
+
+def _get_forwarder():
+    return getattr(current_app, 'forwarder', None)
+
+@system_bp.route('/ingress', methods=['GET'])
+def ingress_stats():
+    """
+    Stanje ingress-a: dubina per-gate redova, backpressure i protok worker pool-a.
+    Koristi se za dijagnostiku kad baza uspori.
+    """
+    forwarder = _get_forwarder()
+    if not forwarder:
+        return jsonify({"error": "Forwarder service is not running or not attached to app"}), 503
+
+    return jsonify({
+        "dispatcher": forwarder.dispatcher.stats()
+    })
+
+@system_bp.route('/controllers', methods=['GET'])
+def controller_stats():
+    """Stanje trajnih konekcija ka kontrolerima i RTT (CMD:OPEN -> ack) po uredjaju."""
+    forwarder = _get_forwarder()
+    if not forwarder:
+        return jsonify({"error": "Forwarder service is not running or not attached to app"}), 503
+
+    return jsonify({
+        "controllers": forwarder.controller_pool.stats()
+    })
+
+@system_bp.route('/outbox', methods=['GET'])
+def outbox_stats():
+    """Command Outbox: komande na cekanju, retry-evi i ishodi (ACKED/FAILED/EXPIRED/DROPPED)."""
+    forwarder = _get_forwarder()
+    if not forwarder:
+        return jsonify({"error": "Forwarder service is not running or not attached to app"}), 503
+
+    return jsonify({
+        "outbox": forwarder.command_outbox.stats()
+    })
+
+@system_bp.route('/debounce', methods=['GET'])
+def debounce_stats():
+    """Debounce store: broj unosa, hit/miss brojaci i podeseni prozori."""
+    return jsonify(SCAN_DEBOUNCE.stats())
+
+@system_bp.route('/debounce/windows', methods=['PUT'])
+def set_debounce_window():
+    """
+    Postavlja prozor: {"seconds": 5, "gate_id": 3, "cred_type": "LPR"}.
+    gate_id/cred_type su opcioni; bez oba menja se podrazumevani prozor.
+    "seconds": null brise override za dati gejt/tip.
+    """
+    data = request.json or {}
+    gate_id = data.get('gate_id')
+    cred_type = data.get('cred_type')
+    cred_type = cred_type.upper() if cred_type else None
+
+    if data.get('seconds') is None:
+        if gate_id is None and cred_type is None:
+            return jsonify({"error": "Default window cannot be removed"}), 400
+        SCAN_DEBOUNCE.clear_window(gate_id, cred_type)
+    else:
+        try:
+            seconds = float(data['seconds'])
+        except (TypeError, ValueError):
+            return jsonify({"error": "seconds must be a number"}), 400
+        SCAN_DEBOUNCE.set_window(seconds, gate_id, cred_type)
+
+    return jsonify(SCAN_DEBOUNCE.stats())
+
+@system_bp.route('/group-commit', methods=['GET'])
+def group_commit_stats():
+    """Group commit: prosecna velicina batch-a, trajanje commit-a i cekanje na potvrdu upisa."""
+    forwarder = _get_forwarder()
+    if not forwarder:
+        return jsonify({"error": "Forwarder service is not running or not attached to app"}), 503
+
+    committer = forwarder.parking_logic.committer
+    return jsonify({
+        "enabled": committer is not None,
+        "group_commit": committer.stats() if committer else None
+    })
+
+@system_bp.route('/scan-log-writer', methods=['GET'])
+def scan_log_writer_stats():
+    """Async ScanLog writer: dubina queue-a, trajanje flush-a i stanje spill fajla."""
+    forwarder = _get_forwarder()
+    if not forwarder:
+        return jsonify({"error": "Forwarder service is not running or not attached to app"}), 503
+
+    log_writer = forwarder.parking_logic.log_writer
+    return jsonify({
+        "enabled": log_writer is not None,
+        "scan_log_writer": log_writer.stats() if log_writer else None
+    })
+
+@system_bp.route('/occupancy-broadcast', methods=['GET'])
+def occupancy_broadcast_stats():
+    """Koalescirani occupancy_batch: broj batch-eva po tick-u i koliko je medjuvrednosti preskoceno."""
+    forwarder = _get_forwarder()
+    if not forwarder:
+        return jsonify({"error": "Forwarder service is not running or not attached to app"}), 503
+
+    broadcaster = forwarder.parking_logic.broadcaster
+    return jsonify({
+        "enabled": broadcaster is not None,
+        "occupancy_broadcast": broadcaster.stats() if broadcaster else None
+    })
+
+@system_bp.route('/event-bus', methods=['GET'])
+def event_bus_stats():
+    """Red real-time eventa: dubina, i po eventu poslato / uzorkovanjem preskoceno / odbaceno."""
+    forwarder = _get_forwarder()
+    if not forwarder:
+        return jsonify({"error": "Forwarder service is not running or not attached to app"}), 503
+
+    events = forwarder.parking_logic.events
+    return jsonify({
+        "enabled": events is not None,
+        "event_bus": events.stats() if events else None
+    })
+
+@system_bp.route('/credential-cache', methods=['GET'])
+def credential_cache_stats():
+    """Kes identiteta (Credential -> User -> Role): hit ratio, negativni pogoci, invalidacije."""
+    return jsonify(CREDENTIAL_CACHE.stats())
+
+@system_bp.route('/occupancy', methods=['GET'])
+def occupancy_stats():
+    """Occupancy engine: admit/reject brojaci i stanje write-behind upisa u bazu."""
+    return jsonify(OCCUPANCY.stats())
+
+@system_bp.route('/sessions', methods=['GET'])
+def session_index_stats():
+    """Indeks aktivnih sesija (user_id -> zona): broj otvorenih sesija i lookup-ova."""
+    return jsonify(SESSION_INDEX.stats())
+
+@system_bp.route('/locks', methods=['GET'])
+def lock_stats():
+    """Striped lock-ovi odluka: cekanje po zoni (contention na root zoni) i ukupno za korisnike."""
+    return jsonify(SCAN_LOCKS.stats())
+
+@system_bp.route('/latency', methods=['GET'])
+def latency_stats():
+    """
+    Latencija po fazama skena (p50/p95/p99): "ingress" (parsiranje, rutiranje, red gejta)
+    i "decision" (handle_scan). Opcioni filteri: ?gate_id=3&outcome=ACCESS_GRANTED
+    """
+    return jsonify(SCAN_LATENCY.snapshot(
+        gate_id=request.args.get('gate_id', type=int),
+        outcome=request.args.get('outcome') or None,
+    ))
+
+@system_bp.route('/latency/reset', methods=['POST'])
+def reset_latency():
+    SCAN_LATENCY.reset()
+    return jsonify({"status": "reset"})
+
+@system_bp.route('/rooms', methods=['GET'])
+def room_stats():
+    """Socket.IO sobe: broj pretplatnika i fan-out (eventi / isporuke) po sobi i po tipu eventa."""
+    return jsonify(SUBSCRIPTIONS.stats())
+
+@system_bp.route('/logging', methods=['GET'])
+def logging_stats():
+    """Async logging: dubina reda ka listener thread-u, odbaceni (pun red) i rate-limitovani zapisi."""
+    return jsonify(async_logging_stats())
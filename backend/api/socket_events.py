@@ -0,0 +1,39 @@
+from flask import request
+from flask_socketio import join_room, leave_room
+
+from services.realtime_rooms import SUBSCRIPTIONS, parse_subscription
+
+
+def register_socket_events(socketio):
+    """
+    Pretplate dashboard klijenata na sobe.
+
+    emit('subscribe', {"zones": [1], "gates": [3], "tenants": [2], "all": false})
+    Odgovor (ack): {"rooms": [...]} ili {"error": "..."}.
+    access_log / occupancy_batch / occupancy_update / device_status stizu samo u sobe
+    na koje se klijent pretplatio; bez pretplate klijent ne dobija nista.
+    """
+
+    @socketio.on('subscribe')
+    def on_subscribe(data=None):
+        try:
+            rooms = parse_subscription(data or {})
+        except ValueError as e:
+            return {"error": str(e)}
+        for room in rooms:
+            join_room(room)
+        return {"rooms": SUBSCRIPTIONS.join(request.sid, rooms)}
+
+    @socketio.on('unsubscribe')
+    def on_unsubscribe(data=None):
+        try:
+            rooms = parse_subscription(data or {})
+        except ValueError as e:
+            return {"error": str(e)}
+        for room in rooms:
+            leave_room(room)
+        return {"rooms": SUBSCRIPTIONS.leave(request.sid, rooms)}
+
+    @socketio.on('disconnect')
+    def on_disconnect(*args):
+        SUBSCRIPTIONS.drop(request.sid)
@@ -1,16 +1,33 @@
 import os
 import logging
-from logging.handlers import TimedRotatingFileHandler
+from functools import partial
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from dotenv import load_dotenv
 
 # Importovanje modela i baze
-from models import db
+from models import db, upgrade_schema
 
 # Importovanje servisa
-from services.forwarder_tcp import ForwarderIngressServer
+from services.forwarder_tcp import (
+    ForwarderIngressServer, build_listeners, DATA_STREAM_PORT, STATUS_STREAM_PORT, ROLE_BY_LOCAL_PORT
+)
+from services.forwarder_async import AsyncForwarderIngressServer, DEFAULT_DECISION_WORKERS
+from services.dispatcher import DEFAULT_WORKERS
+from services.framing import FRAMING_NEWLINE, FRAMING_LENGTH
+from services.device_liveness import DEVICE_LIVENESS, DEVICE_TIMEOUT_SECONDS
+from services.traffic_capture import TrafficCaptureWriter
+from services.debounce import SCAN_DEBOUNCE, parse_window_spec
+from services.occupancy import OCCUPANCY
+from services.group_commit import GroupCommitter
+from services.scan_log_writer import ScanLogWriter
+from services.session_index import SESSION_INDEX
+from services.occupancy_broadcaster import OccupancyBroadcaster
+from services.event_bus import RealtimeEventBus
+from services.async_logging import setup_async_logging
+from services.dashboard_state import DashboardStream
+from services.realtime_rooms import emit_to_rooms
 
 # Importovanje API ruta (Blueprints)
 # Pretpostavljamo da su fajlovi u folderu /api/
@@ -20,22 +37,25 @@ from api.routes_infrastructure import infra_bp
 from api.routes_roles import roles_bp
 from api.routes_rules import rules_bp
 from api.routes_devices import devices_bp
+from api.routes_system import system_bp
+from api.socket_events import register_socket_events
 # Učitavanje Environment varijabli
 load_dotenv()
 
 # --- KONFIGURACIJA LOGOVANJA ---
-LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+# LOG_DIR: folder za parking_os.log (testovi ga preusmeravaju u privremeni folder)
+LOG_DIR = os.getenv('LOG_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs'))
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
-logging.basicConfig(level=logging.INFO)
-file_handler = TimedRotatingFileHandler(
-    os.path.join(LOG_DIR, 'parking_os.log'), when="midnight", interval=1, backupCount=7
-)
-file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s'))
-logging.getLogger().addHandler(file_handler)
+# Decision thread samo stavi zapis u red; fajl i konzolu pise QueueListener thread
+# LOG_RATE_LIMIT: najvise zapisa u sekundi po tipu poruke (ostali se broje kao suppressed)
+setup_async_logging(LOG_DIR, rate=int(os.getenv('LOG_RATE_LIMIT', 20)),
+                    overrides={"scan_decision": int(os.getenv('SCAN_LOG_RATE_LIMIT', 500))})
 logger = logging.getLogger("app")
 
+API_PORT = 5000
+
 def create_app():
     """Factory funkcija za kreiranje aplikacije"""
     app = Flask(__name__)
@@ -53,6 +73,8 @@ def create_app():
     # 3. Inicijalizacija Socket.IO
     # async_mode='threading' je ključan jer koristimo standardne threadove za TCP server
     socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    # Klijenti se pretplacuju na sobe (zona / gejt / tenant / sve)
+    register_socket_events(socketio)
 
     # 4. Registracija API Ruta (Blueprints)
     app.register_blueprint(gates_bp, url_prefix='/api/gates')
@@ -61,6 +83,7 @@ def create_app():
     app.register_blueprint(roles_bp, url_prefix='/api/roles')
     app.register_blueprint(rules_bp, url_prefix='/api/rules')
     app.register_blueprint(devices_bp, url_prefix='/api/devices')
+    app.register_blueprint(system_bp, url_prefix='/api/system')
     # 5. Global Error Handlers
     @app.errorhandler(404)
     def not_found(e):
@@ -88,27 +111,125 @@ if __name__ == '__main__':
     with app.app_context():
         try:
             db.create_all()
+            # Postojeca baza (npr. parking_v3.db pre zone_id/event_id/hw_ack_*) dobija nove kolone
+            for column in upgrade_schema():
+                logger.info(f" Database schema upgraded: added column {column}")
             logger.info(" Database tables checked/created.")
         except Exception as e:
             logger.error(f" Database connection failed: {e}")
 
     # Startovanje TCP Forwardera u pozadini
     # Sluša na portu 7000 za podatke sa hardvera
-    try:
-        logger.info("[TCP] Starting Forwarder TCP Server...")
-        forwarder_server = ForwarderIngressServer(
-            host="0.0.0.0", 
-            port=7000, 
-            flask_app=app, 
-            socketio=socketio
+    # INGRESS_MODE: "threaded" (thread po konekciji) ili "asyncio" (jedan event loop + bounded executor)
+    ingress_mode = os.getenv('INGRESS_MODE', 'threaded').lower()
+    # Posle koliko sekundi bez HEARTBEAT-a/skena uredjaj postaje OFFLINE
+    DEVICE_LIVENESS.timeout_seconds = float(os.getenv('DEVICE_TIMEOUT_SECONDS', DEVICE_TIMEOUT_SECONDS))
+    # DEBOUNCE_WINDOWS="20,LPR=5,gate3=10,gate3:RFID=2" (podrazumevani prozor + override-i po gejtu/tipu)
+    for seconds, gate_id, cred_type in parse_window_spec(os.getenv('DEBOUNCE_WINDOWS', '')):
+        SCAN_DEBOUNCE.set_window(seconds, gate_id, cred_type)
+    # FORWARDER_FRAMING: "newline" ("TYPE:VALUE\n") ili "length" (4B big-endian duzina + payload)
+    framing = os.getenv('FORWARDER_FRAMING', FRAMING_NEWLINE).lower()
+    if framing not in (FRAMING_NEWLINE, FRAMING_LENGTH):
+        logger.warning(f"[TCP] Unknown FORWARDER_FRAMING '{framing}', using '{FRAMING_NEWLINE}'")
+        framing = FRAMING_NEWLINE
+    # Broj worker-a koji donose odluke (= max paralelnih DB transakcija)
+    decision_workers = int(os.getenv('DECISION_WORKERS', DEFAULT_WORKERS))
+
+    # Listener-i: 7000 (DATA "TYPE:VALUE"), 7001 (STATUS/heartbeat) + "typed" portovi iz ROLE_BY_LOCAL_PORT
+    # INGRESS_TYPED_PORTS="5050,5555" bira podskup ("" = bez typed portova)
+    typed_ports_env = os.getenv('INGRESS_TYPED_PORTS')
+    if typed_ports_env is None:
+        typed_ports = dict(ROLE_BY_LOCAL_PORT)
+    else:
+        wanted = {int(p) for p in typed_ports_env.split(',') if p.strip()}
+        typed_ports = {p: t for p, t in ROLE_BY_LOCAL_PORT.items() if p in wanted}
+    if API_PORT in typed_ports:
+        logger.warning(f"[TCP] Skipping typed port {API_PORT} ({typed_ports.pop(API_PORT)}): reserved for the API server")
+    listeners = build_listeners(DATA_STREAM_PORT, STATUS_STREAM_PORT, typed_ports)
+    # INGRESS_CAPTURE_FILE=logs/ingress.pkcap snima sav dolazni DATA saobracaj (za replay_traffic.py)
+    capture_path = os.getenv('INGRESS_CAPTURE_FILE')
+    capture = TrafficCaptureWriter(capture_path) if capture_path else None
+    # OCCUPANCY_MODE: "memory" (atomski brojaci + write-behind) ili "db" (stari put sa FOR UPDATE)
+    occupancy = OCCUPANCY if os.getenv('OCCUPANCY_MODE', 'memory').lower() == 'memory' else None
+    # SESSION_INDEX_MODE: "memory" (APB iz indeksa aktivnih sesija) ili "db" (upit po skenu)
+    sessions = SESSION_INDEX if os.getenv('SESSION_INDEX_MODE', 'memory').lower() == 'memory' else None
+    # GROUP_COMMIT_WINDOW_MS: koliko ms committer skuplja odluke u jedan commit (0 = svaka odluka svoj commit)
+    group_commit_window = float(os.getenv('GROUP_COMMIT_WINDOW_MS', 3))
+    committer = GroupCommitter(app, window_ms=group_commit_window) if group_commit_window > 0 else None
+    # SCAN_LOG_MODE: "async" (batch upis iz pozadine, spill u SCAN_LOG_SPILL_FILE ako baza ne radi) ili "sync"
+    log_writer = None
+    if os.getenv('SCAN_LOG_MODE', 'async').lower() == 'async':
+        log_writer = ScanLogWriter(
+            app,
+            flush_interval_ms=float(os.getenv('SCAN_LOG_FLUSH_MS', 200)),
+            spill_path=os.getenv('SCAN_LOG_SPILL_FILE', os.path.join(LOG_DIR, 'scan_log_spill.jsonl'))
         )
+    # EVENT_BUS_CAPACITY: red Socket.IO eventa za emiter thread (0 = emit direktno sa decision thread-a)
+    event_bus_capacity = int(os.getenv('EVENT_BUS_CAPACITY', 1000))
+    events = None
+    if event_bus_capacity > 0:
+        events = RealtimeEventBus(socketio, capacity=event_bus_capacity,
+                                  sample_every=int(os.getenv('EVENT_BUS_SAMPLE_EVERY', 10)))
+    # OCCUPANCY_BROADCAST_MS: tick za spojeni occupancy_batch event (0 = occupancy_update po zoni po skenu)
+    broadcast_tick = float(os.getenv('OCCUPANCY_BROADCAST_MS', 250))
+    broadcaster = None
+    if broadcast_tick > 0:
+        broadcaster = OccupancyBroadcaster(socketio, tick_ms=broadcast_tick,
+                                           zone_path=occupancy.zone_path if occupancy else None, events=events)
+    # DASHBOARD_STREAM_MS: tick za dashboard_delta (verzionisane promene stanja dashboard-a, 0 = bez stream-a)
+    dashboard_tick = float(os.getenv('DASHBOARD_STREAM_MS', 250))
+    dashboard = None
+    if dashboard_tick > 0:
+        dashboard = DashboardStream(events.publish if events else partial(emit_to_rooms, socketio),
+                                    tick_ms=dashboard_tick)
+    try:
+        logger.info(f"[TCP] Starting Forwarder TCP Server (mode: {ingress_mode})...")
+        if ingress_mode == 'asyncio':
+            forwarder_server = AsyncForwarderIngressServer(
+                host="0.0.0.0",
+                port=DATA_STREAM_PORT,
+                flask_app=app,
+                socketio=socketio,
+                max_workers=int(os.getenv('INGRESS_WORKERS', DEFAULT_DECISION_WORKERS)),
+                framing=framing,
+                decision_workers=decision_workers,
+                listeners=listeners,
+                capture=capture,
+                occupancy=occupancy,
+                committer=committer,
+                log_writer=log_writer,
+                sessions=sessions,
+                broadcaster=broadcaster,
+                events=events,
+                dashboard=dashboard
+            )
+        else:
+            forwarder_server = ForwarderIngressServer(
+                host="0.0.0.0", 
+                port=DATA_STREAM_PORT, 
+                flask_app=app, 
+                socketio=socketio,
+                framing=framing,
+                decision_workers=decision_workers,
+                listeners=listeners,
+                capture=capture,
+                occupancy=occupancy,
+                committer=committer,
+                log_writer=log_writer,
+                sessions=sessions,
+                broadcaster=broadcaster,
+                events=events,
+                dashboard=dashboard
+            )
         forwarder_server.start()
+        # Rute (npr. manuelno otvaranje) dohvataju forwarder preko current_app.forwarder
+        app.forwarder = forwarder_server
     except Exception as e:
         logger.error(f" Failed to start TCP Server: {e}")
 
     # Startovanje Flask Servera
-    logger.info("[APP] Starting ParkingOS V3.0 Backend on port 5000...")
+    logger.info(f"[APP] Starting ParkingOS V3.0 Backend on port {API_PORT}...")
     
     # --- GLAVNA PROMENA OVDE ---
     # debug=False sprečava pokretanje dva procesa
-    socketio.run(app, host='0.0.0.0', port=5000, debug=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    socketio.run(app, host='0.0.0.0', port=API_PORT, debug=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -146,7 +146,10 @@ class Device(db.Model):
     id = Column(Integer, primary_key=True)
     name = Column(String(50))
     ip_address = Column(String(50), nullable=False)
-    port = Column(Integer, default=5005)
+    port = Column(Integer, default=5005)  # Komandni port kontrolera (CMD:OPEN)
+    # Port Forwarder listener-a na koji uredjaj salje skenove (7000, 5050, 5555...);
+    # rutiranje (ip, ingress_port) ima prednost nad rutiranjem samo po IP-u
+    ingress_port = Column(Integer, nullable=True)
     
     device_type = Column(String(20)) # Camera, Controller
     config = Column(Text, nullable=True) # JSON config for specific hardware parameters
@@ -201,6 +204,9 @@ class ParkingSession(db.Model):
     exit_gate_id = Column(Integer, ForeignKey('gates.id'), nullable=True)
     exit_time = Column(DateTime(timezone=True), nullable=True)
 
+    # Zona u kojoj je vozilo trenutno (ulaz je postavlja, tranzit menja) - potrebna za APB na internim gejtovima
+    zone_id = Column(Integer, ForeignKey('zones.id', ondelete='SET NULL'), nullable=True, index=True)
+
     # Derived Data for Analysis
     total_cost = Column(Integer, default=0) # In cents
     
@@ -219,6 +225,8 @@ class ScanLog(db.Model):
 
     id = Column(Integer, primary_key=True)
     created_at = Column(DateTime(timezone=True), default=func.now(), index=True)
+    # Generise se u trenutku odluke - HW ack se vezuje za red i pre nego sto je upisan (async writer)
+    event_id = Column(String(32), unique=True, index=True, nullable=True)
 
     # Gde se desilo?
     gate_id = Column(Integer, ForeignKey('gates.id', ondelete='SET NULL'), nullable=True, index=True)
@@ -236,10 +244,49 @@ class ScanLog(db.Model):
     resolved_user_id = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
     resolved_tenant_id = Column(Integer, ForeignKey('tenants.id', ondelete='SET NULL'), nullable=True)
 
+    # Ishod komande ka hardveru (CMD:OPEN) - Command Outbox ga upisuje naknadno
+    hw_ack_status = Column(String(20), nullable=True) # "ACKED", "FAILED", "EXPIRED", "DROPPED"
+    hw_ack_message = Column(String(255), nullable=True)
+    hw_ack_attempts = Column(Integer, nullable=True)
+    hw_ack_at = Column(DateTime(timezone=True), nullable=True)
+
     # Relacije (samo za čitanje)
     gate = relationship("Gate")
     resolved_user = relationship("User")
 
     def __repr__(self):
         status = "ALLOWED" if self.is_access_granted else f"DENIED ({self.denial_reason})"
-        return f"<ScanLog {self.raw_payload} @ {self.gate_name_snapshot} -> {status}>"
\ No newline at end of file
+        return f"<ScanLog {self.raw_payload} @ {self.gate_name_snapshot} -> {status}>"
+
+def upgrade_schema():
+    """
+    Dodaje kolone koje postoje u modelima, a nedostaju u postojecim tabelama
+    (create_all pravi samo nove tabele). Samo nullable kolone ili kolone sa
+    server_default - one se mogu dodati bez popunjavanja starih redova; FK
+    ogranicenje se ne dodaje (SQLite ALTER ga ne podrzava), ali indeksi da.
+    Mora u App Context-u. Vraca listu dodatih kolona ("tabela.kolona").
+    """
+    from sqlalchemy import inspect, text
+    from sqlalchemy.schema import CreateColumn
+
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            missing = [c for c in table.columns if c.name not in existing]
+            for column in missing:
+                if not column.nullable and column.server_default is None:
+                    raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} without a default")
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                added.append(f"{table.name}.{column.name}")
+            missing_names = {c.name for c in missing}
+            for index in table.indexes:
+                if missing_names & {c.name for c in index.columns}:
+                    index.create(conn, checkfirst=True)
+    return added
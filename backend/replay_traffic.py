@@ -0,0 +1,244 @@
+# backend/replay_traffic.py
+"""
+Replay snimljenog ingress saobracaja (INGRESS_CAPTURE_FILE) nazad u Forwarder.
+
+    python replay_traffic.py logs/ingress.pkcap                # 1x (realno vreme)
+    python replay_traffic.py logs/ingress.pkcap --speed 10     # 10x brze
+    python replay_traffic.py logs/ingress.pkcap --speed max    # bez pauza
+
+Svaka snimljena konekcija dobija svoj socket bindovan na originalnu IP adresu uredjaja
+(kao stress_test.py) i ide na port na koji je snimljena (7000, typed portovi...), pa
+Forwarder rutira skenove na iste gejtove i parsira ih istim parserom.
+Sa --single-port sve ide na --port (npr. Forwarder bez typed listener-a).
+Na kraju se ispisuje protok i latencija odluka (iz /api/system/ingress) i ack latencija
+za PKB1 konekcije.
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+import urllib.request
+from collections import deque
+
+from services.traffic_capture import read_capture, EVENT_DATA, EVENT_CLOSE
+from services.binary_protocol import (
+    BinaryFrameDecoder, MAGIC, FRAME_SCAN_BATCH, FRAME_ACK
+)
+
+SERVER_IP = '127.0.0.1'
+SERVER_PORT = 7000
+API_URL = 'http://127.0.0.1:5000/api/system/ingress'
+DRAIN_TIMEOUT = 30.0
+
+
+class ReplayConnection:
+    """Jedna snimljena konekcija uredjaja. Za PKB1 konekcije meri vreme od slanja batch-a do ACK-a."""
+
+    def __init__(self, source_ip, host, port, ack_latencies):
+        self.source_ip = source_ip
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            self.sock.bind((source_ip, 0))
+        except OSError as e:
+            print(f"⚠️  Ne mogu da bindujem {source_ip} ({e}). Saljem bez bind-a - gejt mozda nece biti prepoznat.")
+        self.sock.connect((host, port))
+
+        self._head = b""
+        self._binary = None
+        self._outgoing = None
+        self._sent_at = deque()
+        self._ack_latencies = ack_latencies
+        self._reader = None
+
+    def send(self, data):
+        if self._binary is None:
+            self._head += data
+            if len(self._head) >= len(MAGIC):
+                self._binary = self._head.startswith(MAGIC)
+                if self._binary:
+                    self._outgoing = BinaryFrameDecoder()
+                    self._reader = threading.Thread(target=self._read_acks, daemon=True)
+                    self._reader.start()
+                    self._track(self._head[len(MAGIC):])
+        elif self._binary:
+            self._track(data)
+        self.sock.sendall(data)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        if self._reader:
+            # Sacekaj preostale ACK-ove pre zatvaranja
+            self._reader.join(timeout=2)
+        self.sock.close()
+
+    def _track(self, data):
+        now = time.perf_counter()
+        for frame in self._outgoing.feed(data):
+            if frame.frame_type == FRAME_SCAN_BATCH:
+                self._sent_at.append(now)
+
+    def _read_acks(self):
+        decoder = BinaryFrameDecoder()
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            now = time.perf_counter()
+            for frame in decoder.feed(data):
+                if frame.frame_type == FRAME_ACK and self._sent_at:
+                    self._ack_latencies.append(now - self._sent_at.popleft())
+
+
+def fetch_ingress_stats(api_url):
+    try:
+        with urllib.request.urlopen(api_url, timeout=2) as resp:
+            return json.loads(resp.read())["dispatcher"]
+    except Exception:
+        return None
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def replay(path, host, port, speed, single_port=False):
+    records = list(read_capture(path))
+    if not records:
+        print("Capture je prazan.")
+        return None
+
+    connections = {}
+    ack_latencies = []
+    sent_chunks = 0
+    sent_bytes = 0
+    opened = 0
+
+    first_ts = records[0].ts
+    started = time.perf_counter()
+
+    for record in records:
+        if speed:
+            delay = started + (record.ts - first_ts) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        key = (record.ip, record.conn_id)
+        if record.event == EVENT_CLOSE:
+            conn = connections.pop(key, None)
+            if conn:
+                conn.close()
+            continue
+
+        if record.event != EVENT_DATA:
+            continue
+
+        conn = connections.get(key)
+        if conn is None:
+            target_port = port if single_port or not record.local_port else record.local_port
+            try:
+                conn = connections[key] = ReplayConnection(record.ip, host, target_port, ack_latencies)
+            except OSError as e:
+                print(f"❌ Greška pri konekciji ({record.ip} -> {host}:{target_port}): {e}")
+                continue
+            opened += 1
+
+        try:
+            conn.send(record.data)
+            sent_chunks += 1
+            sent_bytes += len(record.data)
+        except OSError as e:
+            print(f"❌ Greška pri slanju ({record.ip}): {e}")
+            connections.pop(key, None).close()
+
+    # Konekcije koje nisu zatvorene u snimku (npr. snimanje prekinuto usred sesije)
+    for conn in connections.values():
+        conn.close()
+
+    return {
+        "records": len(records),
+        "connections": opened,
+        "chunks": sent_chunks,
+        "bytes": sent_bytes,
+        "send_seconds": time.perf_counter() - started,
+        "capture_seconds": records[-1].ts - first_ts,
+        "ack_latencies": ack_latencies,
+    }
+
+
+def wait_for_drain(api_url, before, timeout=DRAIN_TIMEOUT):
+    """Ceka da dispatcher obradi sve sto je primio tokom replay-a; vraca poslednji snimak stats-a."""
+    deadline = time.time() + timeout
+    stats = fetch_ingress_stats(api_url)
+    while stats and time.time() < deadline:
+        if stats["pending"] == 0 and stats["submitted"] > before["submitted"]:
+            return stats
+        time.sleep(0.2)
+        stats = fetch_ingress_stats(api_url)
+    return stats
+
+
+def parse_speed(value):
+    if value.lower() in ("max", "0"):
+        return 0.0
+    speed = float(value.lower().rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be > 0 or 'max'")
+    return speed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay ParkingOS ingress capture")
+    parser.add_argument("capture", help="Putanja do capture fajla (INGRESS_CAPTURE_FILE)")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10, 10x ... ili 'max'")
+    parser.add_argument("--host", default=SERVER_IP)
+    parser.add_argument("--port", type=int, default=SERVER_PORT,
+                        help="Port za zapise bez snimljenog porta (i za sve zapise uz --single-port)")
+    parser.add_argument("--single-port", action="store_true",
+                        help="Salji sve na --port umesto na snimljeni lokalni port (raw kodovi sa "
+                             "typed portova ce biti parsirani kao TYPE:VALUE)")
+    parser.add_argument("--api", default=API_URL, help="URL za /api/system/ingress ('' = bez metrika odluka)")
+    args = parser.parse_args()
+
+    print("--- ⏪ PARKING OS TRAFFIC REPLAY ⏪ ---")
+    target = f"{args.host}:{args.port}" if args.single_port else f"{args.host} (snimljeni portovi)"
+    print(f"🎯 Target: {target}  |  Speed: {'max' if not args.speed else f'{args.speed:g}x'}")
+
+    before = fetch_ingress_stats(args.api) if args.api else None
+    replay_started = time.perf_counter()
+    result = replay(args.capture, args.host, args.port, args.speed, args.single_port)
+    if result is None:
+        raise SystemExit(1)
+
+    print(f"📦 Poslato {result['chunks']} chunk-ova ({result['bytes']} B) kroz {result['connections']} konekcija "
+          f"za {result['send_seconds']:.2f}s (snimak traje {result['capture_seconds']:.2f}s)")
+
+    latencies = result["ack_latencies"]
+    if latencies:
+        print(f"📨 PKB1 ack latencija ({len(latencies)} batch-eva): "
+              f"p50={percentile(latencies, 50) * 1000:.1f}ms p95={percentile(latencies, 95) * 1000:.1f}ms "
+              f"p99={percentile(latencies, 99) * 1000:.1f}ms")
+
+    if before is None:
+        print("ℹ️  /api/system/ingress nije dostupan - preskacem metrike odluka.")
+        raise SystemExit(0)
+
+    after = wait_for_drain(args.api, before)
+    elapsed = time.perf_counter() - replay_started
+    decided = (after["processed"] + after["failed"]) - (before["processed"] + before["failed"])
+    print(f"⚙️  Odluka: {decided} (odbijeno zbog zagusenja: {after['rejected'] - before['rejected']}, "
+          f"max red: {after['max_pending_seen']})")
+    if decided:
+        decision_ms = (after["decision_ms_total"] - before["decision_ms_total"]) / decided
+        queue_ms = (after["queue_wait_ms_total"] - before["queue_wait_ms_total"]) / decided
+        print(f"🚀 Protok: {decided / elapsed:.1f} odluka/s  |  "
+              f"prosek odluke: {decision_ms:.2f}ms  |  prosek cekanja u redu: {queue_ms:.2f}ms")
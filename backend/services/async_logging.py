@@ -0,0 +1,165 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Dict, Optional
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_RATE = 20              # zapisa po tipu poruke u prozoru
+DEFAULT_RATE_WINDOW = 1.0      # sekundi
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s]: %(message)s'
+
+
+def structured(event: str, **fields) -> dict:
+    """
+    extra= za strukturisan zapis: logger.info("...", extra=structured("scan_decision", gate_id=3)).
+    event je i tip poruke za rate limit, fields se ispisuju kao key=value.
+    """
+    return {"event": event, "fields": fields}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Obican format + event/fields kao key=value (grep/logfmt parseri ih citaju bez regex-a)."""
+
+    def format(self, record):
+        line = super().format(record)
+        event = getattr(record, "event", None)
+        if event:
+            parts = [f"event={event}"]
+            parts += [f"{key}={_logfmt_value(value)}" for key, value in (getattr(record, "fields", None) or {}).items()]
+            line = f"{line} | {' '.join(parts)}"
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            line = f"{line} (+{suppressed} similar suppressed)"
+        return line
+
+
+def _logfmt_value(value):
+    text = str(value)
+    if not text or any(c in text for c in ' "='):
+        return '"' + text.replace('"', '\\"') + '"'
+    return text
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Najvise `rate` zapisa po tipu poruke u prozoru od `window` sekundi.
+
+    Tip je `event` iz structured(...) ili, za obicne poruke, mesto poziva
+    (logger + fajl + linija) - f-string poruke se razlikuju po sadrzaju, a poziv je isti.
+    Broj odbacenih se dopise na prvi sledeci propusten zapis istog tipa.
+    """
+
+    def __init__(self, rate: int = DEFAULT_RATE, window: float = DEFAULT_RATE_WINDOW,
+                 overrides: Optional[Dict[str, int]] = None, clock=time.monotonic):
+        super().__init__()
+        self.rate = rate
+        self.window = window
+        self.overrides = overrides or {}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = {}        # tip -> [pocetak prozora, propusteno, odbaceno]
+        self.suppressed_total = 0
+
+    def filter(self, record) -> bool:
+        event = getattr(record, "event", None)
+        key = event or (record.name, record.pathname, record.lineno)
+        limit = self.overrides.get(event, self.rate) if event else self.rate
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or now - bucket[0] >= self.window:
+                suppressed = bucket[2] if bucket else 0
+                bucket = self._buckets[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if bucket[1] >= limit:
+                bucket[2] += 1
+                self.suppressed_total += 1
+                return False
+            bucket[1] += 1
+            return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler koji pri punom redu odbacuje zapis umesto da blokira ili baci gresku."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_active = None   # (handler, listener) - setup je idempotentan (testovi vise puta importuju app)
+
+
+def setup_async_logging(log_dir: str, level=logging.INFO, queue_size: int = DEFAULT_QUEUE_SIZE,
+                        rate: int = DEFAULT_RATE, overrides: Optional[Dict[str, int]] = None,
+                        console: bool = True) -> QueueListener:
+    """
+    Root logger dobija samo DroppingQueueHandler (+ rate limit): thread koji loguje
+    uradi filter i put_nowait. Fajl (rotacija u ponoc) i konzolu pise QueueListener thread.
+    """
+    global _active
+    root = logging.getLogger()
+    if _active:
+        handler, listener = _active
+        listener.stop()
+        root.removeHandler(handler)
+
+    formatter = StructuredFormatter(LOG_FORMAT)
+    file_handler = TimedRotatingFileHandler(
+        f"{log_dir}/parking_os.log", when="midnight", interval=1, backupCount=7
+    )
+    file_handler.setFormatter(formatter)
+    sinks = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        sinks.append(console_handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter(rate=rate, overrides=overrides))
+    listener = QueueListener(log_queue, *sinks, respect_handler_level=True)
+
+    root.setLevel(level)
+    root.addHandler(handler)
+    listener.start()
+    _active = (handler, listener)
+    return listener
+
+
+def stop_async_logging():
+    """Prazni red i zaustavlja listener (atexit)."""
+    global _active
+    if _active:
+        handler, listener = _active
+        listener.stop()
+        logging.getLogger().removeHandler(handler)
+        _active = None
+
+
+def async_logging_stats() -> dict:
+    if not _active:
+        return {"enabled": False}
+    handler, _ = _active
+    rate_limit = next(f for f in handler.filters if isinstance(f, RateLimitFilter))
+    return {
+        "enabled": True,
+        "queue_depth": handler.queue.qsize(),
+        "queue_capacity": handler.queue.maxsize,
+        "dropped": handler.dropped,
+        "suppressed": rate_limit.suppressed_total,
+    }
+
+
+atexit.register(stop_async_logging)
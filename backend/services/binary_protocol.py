@@ -0,0 +1,177 @@
+"""
+ParkingOS binarni protokol (PKB1) za uredjaje sa velikim protokom (LPR kamere na izlazima).
+
+Konekcija bira protokol prvim bajtovima: ako pocinje sa MAGIC ("PKB1"), dalje idu
+binarni frejmovi; u suprotnom je to stari tekstualni "TYPE:VALUE" stream.
+
+Frejm (big-endian):
+    u32 length      - broj bajtova posle ovog polja
+    u8  frame_type  - SCAN_BATCH / HEARTBEAT / ACK
+    u16 count       - broj zapisa u frejmu
+    ... zapisi
+
+SCAN_BATCH zapis:
+    u8  cred_type   - 1=RFID 2=LPR 3=QR 4=PIN
+    u32 sequence    - redni broj na uredjaju (vraca se u ack-u)
+    u64 device_ts   - vreme citanja na uredjaju (ms od epohe)
+    u8  value_len
+    ... value (UTF-8)
+
+ACK zapis (server -> uredjaj, jedan ACK frejm po primljenom SCAN_BATCH-u):
+    u32 sequence
+    u8  status      - ACK_* konstante
+"""
+import struct
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("forwarder")
+
+MAGIC = b"PKB1"
+
+PROTOCOL_TEXT = "text"
+PROTOCOL_BINARY = "binary"
+
+FRAME_SCAN_BATCH = 0x01
+FRAME_HEARTBEAT = 0x02
+FRAME_ACK = 0x81
+
+ACK_ACCEPTED = 0
+ACK_UNKNOWN_DEVICE = 1
+ACK_INVALID_TYPE = 2
+ACK_BUSY = 3
+
+CRED_TYPE_CODES = {1: "RFID", 2: "LPR", 3: "QR", 4: "PIN"}
+CRED_TYPE_BY_NAME = {name: code for code, name in CRED_TYPE_CODES.items()}
+
+LENGTH_FIELD = struct.Struct("!I")
+FRAME_HEADER = struct.Struct("!BH")        # frame_type, count
+SCAN_RECORD = struct.Struct("!BIQB")       # cred_type, sequence, device_ts, value_len
+ACK_RECORD = struct.Struct("!IB")          # sequence, status
+
+MAX_FRAME_BYTES = 256 * 1024
+
+
+@dataclass(frozen=True)
+class BinaryRecord:
+    cred_type: Optional[str]   # None ako je kod tipa nepoznat
+    value: str
+    sequence: int
+    device_ts: int
+
+
+@dataclass(frozen=True)
+class BinaryFrame:
+    frame_type: int
+    records: Tuple[BinaryRecord, ...]
+
+
+def detect_protocol(head: bytes) -> Optional[str]:
+    """Vraca PROTOCOL_BINARY/PROTOCOL_TEXT, ili None ako jos nema dovoljno bajtova da se odluci."""
+    if len(head) >= len(MAGIC):
+        return PROTOCOL_BINARY if head[:len(MAGIC)] == MAGIC else PROTOCOL_TEXT
+    return None if MAGIC.startswith(bytes(head)) else PROTOCOL_TEXT
+
+
+class BinaryFrameDecoder:
+    """
+    Inkrementalni dekoder PKB1 frejmova.
+    Zaglavlja se citaju struct.unpack_from direktno iz memoryview-a nad buffer-om,
+    pa se frejm ne kopira - jedina alokacija po zapisu je dekodirana vrednost.
+    """
+
+    def __init__(self, max_frame_bytes: int = MAX_FRAME_BYTES):
+        self.max_frame_bytes = max_frame_bytes
+        self._buffer = bytearray()
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._buffer)
+
+    def feed(self, data: bytes) -> List[BinaryFrame]:
+        self._buffer += data
+        frames = []
+        offset = 0
+        view = memoryview(self._buffer)
+        try:
+            while len(view) - offset >= LENGTH_FIELD.size:
+                (length,) = LENGTH_FIELD.unpack_from(view, offset)
+                if length > self.max_frame_bytes or length < FRAME_HEADER.size:
+                    logger.warning(f"Invalid PKB1 frame length {length}, discarding buffer")
+                    offset = len(view)
+                    break
+                end = offset + LENGTH_FIELD.size + length
+                if end > len(view):
+                    break
+                frame = self._parse_frame(view, offset + LENGTH_FIELD.size, end)
+                if frame is not None:
+                    frames.append(frame)
+                offset = end
+        finally:
+            view.release()
+
+        if offset:
+            del self._buffer[:offset]
+        return frames
+
+    @staticmethod
+    def _parse_frame(view: memoryview, start: int, end: int) -> Optional[BinaryFrame]:
+        frame_type, count = FRAME_HEADER.unpack_from(view, start)
+        pos = start + FRAME_HEADER.size
+        records = []
+
+        if frame_type == FRAME_SCAN_BATCH:
+            for _ in range(count):
+                if pos + SCAN_RECORD.size > end:
+                    logger.warning("Truncated PKB1 scan record, dropping rest of frame")
+                    break
+                type_code, sequence, device_ts, value_len = SCAN_RECORD.unpack_from(view, pos)
+                pos += SCAN_RECORD.size
+                if pos + value_len > end:
+                    logger.warning("Truncated PKB1 scan value, dropping rest of frame")
+                    break
+                with view[pos:pos + value_len] as chunk:
+                    value = str(chunk, "utf-8", "replace")
+                pos += value_len
+                records.append(BinaryRecord(CRED_TYPE_CODES.get(type_code), value, sequence, device_ts))
+        elif frame_type not in (FRAME_HEARTBEAT, FRAME_ACK):
+            logger.warning(f"Unknown PKB1 frame type 0x{frame_type:02x}")
+            return None
+
+        return BinaryFrame(frame_type, tuple(records))
+
+
+def _frame(frame_type: int, count: int, body: bytes) -> bytes:
+    return LENGTH_FIELD.pack(FRAME_HEADER.size + len(body)) + FRAME_HEADER.pack(frame_type, count) + body
+
+
+def encode_scan_batch(records: Iterable[Tuple[str, str, int, int]]) -> bytes:
+    """records: (cred_type, value, sequence, device_ts_ms). Koriste ga simulatori i replay alat."""
+    parts = []
+    count = 0
+    for cred_type, value, sequence, device_ts in records:
+        raw = value.encode("utf-8")
+        parts.append(SCAN_RECORD.pack(CRED_TYPE_BY_NAME[cred_type], sequence, device_ts, len(raw)))
+        parts.append(raw)
+        count += 1
+    return _frame(FRAME_SCAN_BATCH, count, b"".join(parts))
+
+
+def encode_heartbeat() -> bytes:
+    return _frame(FRAME_HEARTBEAT, 0, b"")
+
+
+def encode_ack(acks: List[Tuple[int, int]]) -> bytes:
+    """acks: (sequence, status)"""
+    return _frame(FRAME_ACK, len(acks), b"".join(ACK_RECORD.pack(seq, status) for seq, status in acks))
+
+
+def decode_ack(frame_bytes: bytes) -> List[Tuple[int, int]]:
+    """Pomocna funkcija za klijente: jedan kompletan ACK frejm -> [(sequence, status)]."""
+    view = memoryview(frame_bytes)
+    frame_type, count = FRAME_HEADER.unpack_from(view, LENGTH_FIELD.size)
+    if frame_type != FRAME_ACK:
+        raise ValueError(f"Not an ACK frame: 0x{frame_type:02x}")
+    pos = LENGTH_FIELD.size + FRAME_HEADER.size
+    return [ACK_RECORD.unpack_from(view, pos + i * ACK_RECORD.size) for i in range(count)]
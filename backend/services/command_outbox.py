@@ -0,0 +1,157 @@
+import threading
+import queue
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger("outbox")
+
+DEFAULT_OUTBOX_WORKERS = 4
+DEFAULT_OUTBOX_CAPACITY = 1000
+DEFAULT_DEADLINE_SECONDS = 6.0     # Posle ovoga vozac je vec odustao / pozvao interfon
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 1.0
+
+ACK_STATUS_ACKED = "ACKED"
+ACK_STATUS_FAILED = "FAILED"
+ACK_STATUS_EXPIRED = "EXPIRED"
+ACK_STATUS_DROPPED = "DROPPED"
+
+
+@dataclass
+class OutboxCommand:
+    ip: str
+    port: int
+    gate_id: Optional[int] = None
+    scan_log_id: Optional[int] = None
+    scan_event_id: Optional[str] = None   # ScanLog.event_id kad je red jos u async writer-u
+    payload: bytes = b"CMD:OPEN\n"
+    created_at: float = field(default_factory=time.monotonic)
+    deadline: float = 0.0
+    attempts: int = 0
+
+
+class CommandOutbox:
+    """
+    In-process outbox za komande ka hardveru.
+
+    Decision thread samo upise komandu i ide dalje (O(1)), a outbox worker-i
+    salju CMD:OPEN, ponavljaju do deadline-a i na kraju prijave ishod preko
+    on_result callback-a (Forwarder ga upisuje u ScanLog red).
+    Spor ili ugasen kontroler tako vise ne blokira odluke za druge skenove.
+    """
+
+    def __init__(self, sender: Callable[..., Tuple[bool, str]],
+                 on_result: Optional[Callable[[OutboxCommand, str, str], None]] = None,
+                 workers: int = DEFAULT_OUTBOX_WORKERS, capacity: int = DEFAULT_OUTBOX_CAPACITY,
+                 deadline_seconds: float = DEFAULT_DEADLINE_SECONDS):
+        self.sender = sender
+        self.on_result = on_result
+        self.workers = workers
+        self.deadline_seconds = deadline_seconds
+
+        self._queue = queue.Queue(maxsize=capacity)
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0, "acked": 0, "failed": 0, "expired": 0,
+            "dropped": 0, "retries": 0, "ack_latency_total": 0.0,
+        }
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, daemon=True, name=f"outbox-{i}")
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def enqueue(self, ip: str, port: int, gate_id: Optional[int] = None,
+                scan_log_id: Optional[int] = None, payload: bytes = b"CMD:OPEN\n",
+                scan_event_id: Optional[str] = None) -> bool:
+        """Neblokirajuce. Vraca False ako je outbox pun (komanda se odmah prijavljuje kao DROPPED)."""
+        command = OutboxCommand(ip=ip, port=port, gate_id=gate_id, scan_log_id=scan_log_id,
+                                scan_event_id=scan_event_id, payload=payload)
+        command.deadline = command.created_at + self.deadline_seconds
+        try:
+            self._queue.put_nowait(command)
+        except queue.Full:
+            logger.error(f"Command outbox full, dropping CMD for gate {gate_id} ({ip})")
+            self._finish(command, ACK_STATUS_DROPPED, "Outbox full")
+            return False
+
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+        return True
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            s = dict(self._stats)
+        acked = s.pop("ack_latency_total")
+        s["pending"] = self._queue.qsize()
+        s["avg_time_to_ack_ms"] = round(acked / s["acked"] * 1000, 1) if s["acked"] else None
+        return s
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                command = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._deliver(command)
+            except Exception as e:
+                logger.error(f"Outbox delivery crashed for gate {command.gate_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, command: OutboxCommand):
+        delay = RETRY_BASE_DELAY
+        message = ""
+        while True:
+            if time.monotonic() >= command.deadline:
+                self._finish(command, ACK_STATUS_EXPIRED, message or "Deadline exceeded before send")
+                return
+
+            command.attempts += 1
+            success, message = self.sender(command.ip, command.port)
+            if success:
+                self._finish(command, ACK_STATUS_ACKED, message)
+                return
+
+            # Ima li smisla jos jedan pokusaj pre deadline-a?
+            if time.monotonic() + delay >= command.deadline or self._stop_event.is_set():
+                self._finish(command, ACK_STATUS_FAILED, message)
+                return
+
+            with self._stats_lock:
+                self._stats["retries"] += 1
+            time.sleep(delay)
+            delay = min(RETRY_MAX_DELAY, delay * 2)
+
+    def _finish(self, command: OutboxCommand, status: str, message: str):
+        with self._stats_lock:
+            if status == ACK_STATUS_ACKED:
+                self._stats["acked"] += 1
+                self._stats["ack_latency_total"] += time.monotonic() - command.created_at
+            elif status == ACK_STATUS_FAILED:
+                self._stats["failed"] += 1
+            elif status == ACK_STATUS_EXPIRED:
+                self._stats["expired"] += 1
+            else:
+                self._stats["dropped"] += 1
+
+        if status != ACK_STATUS_ACKED:
+            logger.warning(f"CMD to gate {command.gate_id} ({command.ip}) {status} after {command.attempts} attempt(s): {message}")
+
+        if self.on_result:
+            try:
+                self.on_result(command, status, message)
+            except Exception as e:
+                logger.error(f"Outbox result callback failed: {e}")
@@ -0,0 +1,447 @@
+import socket
+import selectors
+import threading
+import queue
+import time
+import logging
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger("controller_pool")
+
+CONTROLLER_PORT = 5005
+CONNECT_TIMEOUT = 2.0       # Isto kao stari send_open_command
+ACK_TIMEOUT = 2.0
+HEALTH_INTERVAL = 5.0       # Koliko cesto keeper thread obilazi konekcije
+PROBE_INTERVAL = 30.0       # Konekcija bez saobracaja ovoliko dugo dobija probe komandu (ako je zadata)
+MAX_UNUSED_SECONDS = 600.0  # Bez prave komande ovoliko dugo -> link se uklanja (otvara se ponovo na zahtev)
+MAX_RECONNECT_BACKOFF = 30.0
+
+# TCP keepalive: mrtav link (kontroler bez struje, prekinut kabl) OS otkriva posle
+# IDLE + INTERVAL * COUNT sekundi, a IO thread ga tada zatvara i keeper podize ponovo
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+
+STATE_CONNECTED = "CONNECTED"
+STATE_DISCONNECTED = "DISCONNECTED"
+
+
+class _PendingAck:
+    __slots__ = ("event", "response", "error", "sent_at", "rtt", "probe")
+
+    def __init__(self, probe: bool = False):
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+        self.sent_at = time.monotonic()
+        self.rtt = None
+        self.probe = probe
+
+
+class _ControllerLink:
+    """Jedna dugotrajna konekcija ka kontroleru (ip, port) + statistika."""
+
+    def __init__(self, ip: str, port: int):
+        self.ip = ip
+        self.port = port
+        self.sock = None
+        self.state = STATE_DISCONNECTED
+
+        self.write_lock = threading.Lock()   # redosled bajtova na zici == redosled pending-a
+        self.lock = threading.Lock()         # pending red i stanje soketa
+        self.pending = deque()
+        self.rx = bytearray()
+
+        self.last_used = time.monotonic()    # poslednja prava komanda (probe se ne racuna)
+        self.last_activity = 0.0             # poslednji saobracaj na soketu (komanda, probe, ack)
+        self.connected_at = 0.0
+        self.next_reconnect_at = 0.0
+        self.connect_failures = 0
+
+        # Statistika (RTT = slanje CMD -> prijem ack-a)
+        self.commands = 0
+        self.acks = 0
+        self.errors = 0
+        self.connects = 0
+        self.probes = 0
+        self.probe_failures = 0
+        self.rtt_last = None
+        self.rtt_min = None
+        self.rtt_max = None
+        self.rtt_total = 0.0
+
+    def record_rtt(self, rtt: float):
+        self.acks += 1
+        self.rtt_last = rtt
+        self.rtt_total += rtt
+        self.rtt_min = rtt if self.rtt_min is None else min(self.rtt_min, rtt)
+        self.rtt_max = rtt if self.rtt_max is None else max(self.rtt_max, rtt)
+
+    def stats(self) -> dict:
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "ip": self.ip,
+            "port": self.port,
+            "state": self.state,
+            "in_flight": len(self.pending),
+            "commands": self.commands,
+            "acks": self.acks,
+            "errors": self.errors,
+            "connects": self.connects,
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+            "rtt_last_ms": ms(self.rtt_last),
+            "rtt_avg_ms": ms(self.rtt_total / self.acks) if self.acks else None,
+            "rtt_min_ms": ms(self.rtt_min),
+            "rtt_max_ms": ms(self.rtt_max),
+        }
+
+
+class ControllerConnectionPool:
+    """
+    Pool trajnih TCP konekcija ka kontrolerima rampi.
+
+    - Konekcija se otvara pri prvoj komandi i ostaje otvorena (nema connect handshake-a po otvaranju).
+    - CMD:OPEN se pipeline-uje: vise komandi moze biti "u letu" na istom soketu,
+      ack-ovi se uparuju po FIFO redosledu.
+    - Jedan IO thread (selector) cita ack-ove sa svih soketa.
+    - Pale konekcije otkriva TCP keepalive; keeper thread ih u pozadini ponovo povezuje.
+      Protokol kontrolera nema komandu za proveru, pa je probe opcion: sa probe_payload
+      (komanda koju firmware sigurno potvrdjuje) neaktivna konekcija dobija round-trip,
+      a bez odgovora u ack_timeout se zatvara i podize ponovo.
+    - Link bez prave komande duze od max_unused, ili ciji uredjaj vise ne postoji
+      (is_known), se uklanja - keeper ga vise ne povezuje; sledeca komanda ga otvara ponovo.
+    - Kontroleri koji zatvaraju konekciju posle svakog odgovora (stari firmware) i dalje rade.
+    """
+
+    def __init__(self, connect_timeout: float = CONNECT_TIMEOUT, ack_timeout: float = ACK_TIMEOUT,
+                 health_interval: float = HEALTH_INTERVAL, probe_interval: float = PROBE_INTERVAL,
+                 max_unused: float = MAX_UNUSED_SECONDS, probe_payload: Optional[bytes] = None,
+                 is_known: Optional[Callable[[str], bool]] = None):
+        self.connect_timeout = connect_timeout
+        self.ack_timeout = ack_timeout
+        self.health_interval = health_interval
+        self.probe_interval = probe_interval
+        self.max_unused = max_unused
+        self.probe_payload = probe_payload
+        # ip -> da li uredjaj jos postoji (npr. DEVICE_ROUTES); None = ne proverava se
+        self.is_known = is_known
+
+        self._links = {}
+        self._links_lock = threading.Lock()
+
+        self._selector = selectors.DefaultSelector()
+        self._io_commands = queue.Queue()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    # --- LIFECYCLE ---
+
+    def start(self):
+        for target, name in ((self._io_loop, "controller-io"), (self._keeper_loop, "controller-keeper")):
+            t = threading.Thread(target=target, daemon=True, name=name)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake()
+        for t in self._threads:
+            t.join(timeout=2)
+        self._threads = []
+        with self._links_lock:
+            links = list(self._links.values())
+        for link in links:
+            self._close_link(link, link.sock, "pool stopped")
+        # IO thread vise ne radi - sami zatvaramo sokete iz reda
+        while True:
+            try:
+                _, _, sock = self._io_commands.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    # --- PUBLIC API ---
+
+    def send_command(self, ip: str, port: int = CONTROLLER_PORT, payload: bytes = b"CMD:OPEN\n") -> Tuple[bool, str]:
+        """
+        Salje komandu preko tople konekcije i ceka ack.
+        Vraca (success: bool, message: str) - isto kao stari send_open_command.
+        """
+        link = self._get_link(ip, port)
+
+        for attempt in range(2):
+            try:
+                waiter, reused = self._send(link, payload)
+            except OSError as e:
+                err_msg = self._describe_error(link, e)
+                link.errors += 1
+                logger.error(err_msg)
+                return False, err_msg
+
+            if not waiter.event.wait(self.ack_timeout):
+                # Ack-ovi su sada van sinhronizacije - konekcija se gasi, keeper je podize ponovo
+                link.errors += 1
+                self._close_link(link, link.sock, "ack timeout")
+                err_msg = f"Socket Error: no ack from {ip}:{port} within {self.ack_timeout}s"
+                logger.error(err_msg)
+                return False, err_msg
+
+            if waiter.error is None:
+                logger.info(f"Hardware confirmed: {waiter.response} ({waiter.rtt * 1000:.1f} ms)")
+                return True, waiter.response
+
+            # Topla konekcija je bila mrtva (kontroler je zatvorio) - jedan pokusaj preko nove
+            if reused and attempt == 0:
+                continue
+
+            link.errors += 1
+            err_msg = f"Socket Error: {waiter.error}"
+            logger.error(err_msg)
+            return False, err_msg
+
+        return False, "Socket Error: retry exhausted"
+
+    def is_connected(self, ip: str, port: int = CONTROLLER_PORT) -> bool:
+        with self._links_lock:
+            link = self._links.get((ip, int(port)))
+        return bool(link and link.state == STATE_CONNECTED)
+
+    def stats(self) -> list:
+        with self._links_lock:
+            links = list(self._links.values())
+        return [link.stats() for link in links]
+
+    # --- INTERNALS ---
+
+    def _get_link(self, ip: str, port: int) -> _ControllerLink:
+        key = (ip, int(port))
+        with self._links_lock:
+            link = self._links.get(key)
+            if link is None:
+                link = self._links[key] = _ControllerLink(ip, int(port))
+            return link
+
+    def _send(self, link: _ControllerLink, payload: bytes, probe: bool = False):
+        with link.write_lock:
+            reused = link.sock is not None
+            if not reused:
+                self._connect(link)
+
+            waiter = _PendingAck(probe)
+            with link.lock:
+                link.pending.append(waiter)
+                sock = link.sock
+
+            link.last_activity = time.monotonic()
+            if not probe:
+                link.commands += 1
+                link.last_used = link.last_activity
+            try:
+                sock.sendall(payload)
+            except OSError as e:
+                self._close_link(link, sock, f"send failed: {e}")
+                if not reused:
+                    raise
+            return waiter, reused
+
+    def _connect(self, link: _ControllerLink):
+        """Poziva se pod link.write_lock."""
+        logger.info(f"Connecting to hardware controller at {link.ip}:{link.port}...")
+        try:
+            sock = socket.create_connection((link.ip, link.port), timeout=self.connect_timeout)
+        except OSError:
+            link.connect_failures += 1
+            backoff = min(MAX_RECONNECT_BACKOFF, 2 ** link.connect_failures)
+            link.next_reconnect_at = time.monotonic() + backoff
+            raise
+
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE), ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+                              ("TCP_KEEPCNT", KEEPALIVE_COUNT)):
+            if hasattr(socket, option):    # nema ih na svim platformama (npr. stariji Windows)
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with link.lock:
+            link.sock = sock
+            link.state = STATE_CONNECTED
+            link.rx.clear()
+        link.connects += 1
+        link.connect_failures = 0
+        link.connected_at = link.last_activity = time.monotonic()
+
+        self._io_commands.put(("register", link, sock))
+        self._wake()
+
+    def _close_link(self, link: _ControllerLink, sock, reason: str):
+        """Zatvara soket (ako je jos aktuelan) i obara sve komande koje cekaju ack."""
+        if sock is None:
+            return
+        with link.lock:
+            if link.sock is not sock:
+                return
+            link.sock = None
+            link.state = STATE_DISCONNECTED
+            failed = list(link.pending)
+            link.pending.clear()
+            link.rx.clear()
+
+        for waiter in failed:
+            waiter.error = f"connection to {link.ip}:{link.port} closed ({reason})"
+            waiter.event.set()
+
+        self._io_commands.put(("unregister", link, sock))
+        self._wake()
+
+    def _describe_error(self, link, e: OSError) -> str:
+        if isinstance(e, ConnectionRefusedError):
+            return f"Connection Refused at {link.ip}:{link.port}. Is the device online?"
+        return f"Socket Error: {str(e)}"
+
+    def _wake(self):
+        try:
+            self._wakeup_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _io_loop(self):
+        """Jedini thread koji menja selector i cita ack-ove."""
+        while not self._stop_event.is_set():
+            for key, _ in self._selector.select(timeout=1.0):
+                if key.data is None:
+                    try:
+                        self._wakeup_r.recv(4096)
+                    except OSError:
+                        pass
+                    continue
+                self._on_readable(key.data, key.fileobj)
+
+            while True:
+                try:
+                    action, link, sock = self._io_commands.get_nowait()
+                except queue.Empty:
+                    break
+                if action == "register":
+                    if link.sock is sock:
+                        self._selector.register(sock, selectors.EVENT_READ, link)
+                else:
+                    try:
+                        self._selector.unregister(sock)
+                    except (KeyError, ValueError):
+                        pass
+                    try:
+                        sock.close()
+                    except OSError:
+                        pass
+
+    def _on_readable(self, link: _ControllerLink, sock):
+        try:
+            data = sock.recv(4096)
+        except (BlockingIOError, socket.timeout):
+            return
+        except OSError as e:
+            self._close_link(link, sock, str(e))
+            return
+
+        now = time.monotonic()
+        with link.lock:
+            if link.sock is not sock:
+                return
+            link.rx += data
+            resolved = []
+            while True:
+                idx = link.rx.find(b"\n")
+                if idx == -1:
+                    break
+                line = bytes(link.rx[:idx]).decode(errors="replace").strip()
+                del link.rx[:idx + 1]
+                if link.pending:
+                    resolved.append((link.pending.popleft(), line))
+
+            # Stari kontroleri odgovaraju bez '\n' i odmah zatvaraju - ostatak je ack
+            if not data and link.rx and link.pending:
+                resolved.append((link.pending.popleft(), bytes(link.rx).decode(errors="replace").strip()))
+                link.rx.clear()
+
+        if resolved:
+            link.last_activity = now
+        for waiter, line in resolved:
+            waiter.response = line
+            waiter.rtt = now - waiter.sent_at
+            if not waiter.probe:
+                link.record_rtt(waiter.rtt)
+            waiter.event.set()
+
+        if not data:
+            self._close_link(link, sock, "closed by controller")
+
+    def _keeper_loop(self):
+        """Pozadinsko odrzavanje: uklanjanje nepotrebnih linkova, probe i ponovno povezivanje."""
+        while not self._stop_event.wait(self.health_interval):
+            try:
+                self.check_links()
+            except Exception as e:
+                logger.error(f"Controller keeper pass failed: {e}")
+
+    def check_links(self):
+        """Jedan prolaz keeper-a (keeper thread; testovi ga zovu direktno)."""
+        now = time.monotonic()
+        with self._links_lock:
+            links = list(self._links.values())
+
+        probes = []
+        for link in links:
+            if link.write_lock.locked():
+                continue
+            if self.is_known is not None and not self.is_known(link.ip):
+                self._drop_link(link, "device removed")
+                continue
+            if now - link.last_used > self.max_unused:
+                self._drop_link(link, "unused")
+                continue
+
+            if link.sock is not None:
+                if (self.probe_payload and not link.pending
+                        and now - link.last_activity >= self.probe_interval):
+                    try:
+                        probes.append((link, self._send(link, self.probe_payload, probe=True)[0]))
+                    except OSError as e:
+                        logger.debug(f"Probe to {link.ip}:{link.port} failed: {e}")
+            elif now >= link.next_reconnect_at:
+                with link.write_lock:
+                    if link.sock is not None:
+                        continue
+                    try:
+                        self._connect(link)
+                    except OSError as e:
+                        logger.debug(f"Background reconnect to {link.ip}:{link.port} failed: {e}")
+
+        # Probe-ovi su poslati svima odjednom - ukupno cekanje je najvise jedan ack_timeout
+        deadline = time.monotonic() + self.ack_timeout
+        for link, waiter in probes:
+            if not waiter.event.wait(max(0.0, deadline - time.monotonic())):
+                link.probe_failures += 1
+                self._close_link(link, link.sock, "probe timeout")
+                logger.warning(f"Controller {link.ip}:{link.port} did not answer probe, reconnecting")
+            elif waiter.error is not None:
+                link.probe_failures += 1
+            else:
+                link.probes += 1
+
+    def _drop_link(self, link: _ControllerLink, reason: str):
+        key = (link.ip, link.port)
+        with self._links_lock:
+            if self._links.get(key) is link:
+                del self._links[key]
+        self._close_link(link, link.sock, reason)
+        logger.info(f"Dropped controller link {link.ip}:{link.port} ({reason})")
@@ -0,0 +1,209 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy.orm import joinedload
+
+from models import User, Credential, CredentialType
+
+logger = logging.getLogger("credential_cache")
+
+DEFAULT_MAX_ENTRIES = 20000
+# Nepoznate vrednosti (tudje kartice, pogresno procitane tablice) se pamte krace
+DEFAULT_NEGATIVE_TTL_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class RoleSnapshot:
+    id: int
+    name: str
+    can_ignore_capacity: bool
+    can_ignore_antipassback: bool
+    can_ignore_schedule: bool
+    is_billable: bool
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: int
+    first_name: str
+    last_name: str
+    is_active: bool
+    tenant_id: Optional[int]
+    role: RoleSnapshot
+
+
+@dataclass(frozen=True)
+class CredentialSnapshot:
+    """Nepromenljiv snapshot identiteta (Credential -> User -> Role) - bezbedno se deli izmedju thread-ova."""
+    id: int
+    cred_type: str
+    cred_value: str
+    user: UserSnapshot
+
+
+def load_credential_snapshot(cred_type: str, cred_value: str) -> Optional[CredentialSnapshot]:
+    """Isti upit kao ranije u handle_scan, pretvoren u snapshot. Mora u App Context-u."""
+    credential = Credential.query.filter_by(
+        cred_type=cred_type,
+        cred_value=cred_value,
+        is_active=True
+    ).options(
+        joinedload(Credential.user).joinedload(User.role)
+    ).first()
+
+    if not credential:
+        return None
+
+    user = credential.user
+    role = user.role
+    return CredentialSnapshot(
+        id=credential.id,
+        cred_type=credential.cred_type.value,
+        cred_value=credential.cred_value,
+        user=UserSnapshot(
+            id=user.id,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            is_active=bool(user.is_active),
+            tenant_id=user.tenant_id,
+            role=RoleSnapshot(
+                id=role.id,
+                name=role.name,
+                can_ignore_capacity=bool(role.can_ignore_capacity),
+                can_ignore_antipassback=bool(role.can_ignore_antipassback),
+                can_ignore_schedule=bool(role.can_ignore_schedule),
+                is_billable=bool(role.is_billable),
+            ),
+        ),
+    )
+
+
+class CredentialCache:
+    """
+    LRU kes snapshot-a kredencijala po (cred_type, cred_value), sa negativnim unosima.
+
+    Topli sken ne ide u bazu za identitet. CRUD rute (routes_cards, routes_roles)
+    posle commit-a pozivaju invalidate_* metode (write-through invalidacija).
+    Ucitavanje ide van lock-a; ako se invalidacija desi dok upit traje,
+    rezultat se vraca pozivaocu ali se ne upisuje u kes (generation brojac).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+                 loader: Callable[[str, str], Optional[CredentialSnapshot]] = load_credential_snapshot,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.loader = loader
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (type, value) -> CredentialSnapshot ili (None, expires_at)
+        self._by_user = {}              # user_id -> set((type, value))
+        self._generation = 0
+
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._evicted = 0
+        self._invalidations = 0
+
+    def resolve(self, cred_type: str, cred_value: str) -> Optional[CredentialSnapshot]:
+        key = (cred_type, cred_value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if isinstance(entry, CredentialSnapshot):
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry
+                if entry[1] > self._clock():
+                    self._negative_hits += 1
+                    return None
+                del self._entries[key]
+            self._misses += 1
+            generation = self._generation
+
+        snapshot = self.loader(cred_type, cred_value)
+
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, snapshot)
+        return snapshot
+
+    def invalidate_user(self, user_id: int):
+        """Brise sve kredencijale korisnika (izmena/brisanje korisnika ili njegovih kartica)."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            for key in self._by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def invalidate_values(self, cred_values: Iterable[str]):
+        """Brise unose (i negativne) za date vrednosti, za sve tipove - novi kredencijal odmah radi."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            for value in cred_values:
+                for c_type in CredentialType:
+                    entry = self._entries.pop((c_type.value, value), None)
+                    if isinstance(entry, CredentialSnapshot):
+                        self._unindex(entry)
+
+    def clear(self):
+        """Izmena role menja snapshot-e mnogih korisnika - najjednostavnije je isprazniti kes."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            self._entries.clear()
+            self._by_user.clear()
+
+    def reset(self):
+        self.clear()
+        with self._lock:
+            self._hits = self._negative_hits = self._misses = self._evicted = self._invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._negative_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "negative_hits": self._negative_hits,
+                "misses": self._misses,
+                "hit_ratio": round((self._hits + self._negative_hits) / lookups, 3) if lookups else None,
+                "evicted": self._evicted,
+                "invalidations": self._invalidations,
+            }
+
+    # --- Interno (pod lock-om) ---
+
+    def _store(self, key, snapshot):
+        if snapshot is None:
+            self._entries[key] = (None, self._clock() + self.negative_ttl)
+        else:
+            self._entries[key] = snapshot
+            self._by_user.setdefault(snapshot.user.id, set()).add(key)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            if isinstance(evicted, CredentialSnapshot):
+                self._unindex(evicted)
+            self._evicted += 1
+
+    def _unindex(self, snapshot):
+        keys = self._by_user.get(snapshot.user.id)
+        if keys is not None:
+            keys.discard((snapshot.cred_type, snapshot.cred_value))
+            if not keys:
+                del self._by_user[snapshot.user.id]
+
+
+# Globalna instanca (Logic Engine cita, API rute invalidiraju)
+CREDENTIAL_CACHE = CredentialCache()
@@ -0,0 +1,300 @@
+import threading
+import logging
+from collections import deque
+from typing import Callable, Optional
+
+from sqlalchemy.orm import joinedload
+
+from models import Zone, Gate, Device, ScanLog
+from services.device_liveness import DEVICE_LIVENESS, STATUS_ONLINE, STATUS_OFFLINE
+from services.occupancy import OCCUPANCY
+
+logger = logging.getLogger("dashboard_state")
+
+DEFAULT_HISTORY = 5000       # koliko promena se pamti za ?since= (stariji klijent dobija snapshot)
+DEFAULT_MAX_LOGS = 20        # isto kao /api/gates/logs
+DEFAULT_STREAM_TICK_MS = 250.0
+
+EVENT_DASHBOARD_DELTA = "dashboard_delta"
+
+KIND_ZONE = "zones"
+KIND_DEVICE = "devices"
+KIND_LOG = "logs"
+
+
+def _zone_entry(zone_id, name, parent_id, capacity, occupancy) -> dict:
+    return {
+        "id": zone_id,
+        "name": name,
+        "parent_id": parent_id,
+        "capacity": capacity,
+        "occupancy": occupancy,
+        "percent_full": round((occupancy / capacity * 100), 1) if capacity > 0 else 0,
+    }
+
+
+def log_entry_from_scan_log(log: ScanLog) -> dict:
+    """Isti oblik kao serialize_log u api/routes_gates.py (+ gate_id)."""
+    return {
+        "id": log.id,
+        "scan_time": log.created_at.isoformat() if log.created_at else None,
+        "gate_id": log.gate_id,
+        "gate_name": log.gate_name_snapshot,
+        "status": "ALLOWED" if log.is_access_granted else "DENIED",
+        "reason": log.denial_reason,
+        "user": f"{log.resolved_user.first_name} {log.resolved_user.last_name}" if log.resolved_user else "Unknown",
+    }
+
+
+class DashboardState:
+    """
+    Autoritativno stanje dashboard-a u memoriji: zone (sa popunjenoscu), gejtovi,
+    uredjaji (ONLINE/OFFLINE) i poslednji skenovi, sa verzijom koja samo raste.
+
+    Svaka promena poveca verziju i ide u ograniceni istorijat, pa klijent koji
+    zna svoju verziju dobija samo ono sto se promenilo (changes_since), spojeno
+    po kljucu - zona/uredjaj nose samo poslednje stanje. Ako je verzija starija
+    od istorijata (ili je stanje ponovo ucitano posle izmene infrastrukture),
+    klijent dobija ceo snapshot.
+
+    Promene se upisuju na decision thread-u: lock + dict + deque append, bez baze.
+    Dok stanje nije ucitano (load) promene se ignorisu - load ionako cita bazu.
+    """
+
+    def __init__(self, history: int = DEFAULT_HISTORY, max_logs: int = DEFAULT_MAX_LOGS):
+        self.max_logs = max_logs
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()      # load cita bazu - ne drzi _lock koji koriste odluke
+        self._history = deque(maxlen=history)   # (verzija, vrsta, kljuc, podaci)
+        self._version = 0
+        self._base_version = 0                  # verzija poslednjeg load-a (istorijat pocinje posle nje)
+        self._loaded = False
+        self._zones = {}
+        self._gates = {}
+        self._devices = {}
+        self._logs = deque(maxlen=max_logs)     # najnoviji na kraju
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def load(self):
+        """Gradi stanje iz baze (+ OccupancyEngine / Liveness registar). Mora u App Context-u."""
+        zones = {
+            z.id: _zone_entry(z.id, z.name, z.parent_zone_id, z.capacity, OCCUPANCY.zone_occupancy(z.id, z.occupancy))
+            for z in Zone.query.order_by(Zone.id).all()
+        }
+        gates = {
+            g.id: {"id": g.id, "name": g.name, "zone_from_id": g.zone_from_id, "zone_to_id": g.zone_to_id}
+            for g in Gate.query.order_by(Gate.id).all()
+        }
+        devices = {}
+        for d in Device.query.order_by(Device.id).all():
+            last_seen = DEVICE_LIVENESS.last_seen(d.ip_address)
+            devices[d.ip_address] = {
+                "ip": d.ip_address,
+                "name": d.name,
+                "gate_id": d.gate_id,
+                "status": STATUS_ONLINE if DEVICE_LIVENESS.is_online(d.ip_address) else STATUS_OFFLINE,
+                "last_seen": last_seen.isoformat() if last_seen else None,
+            }
+        logs = ScanLog.query.options(joinedload(ScanLog.resolved_user))\
+            .order_by(ScanLog.created_at.desc())\
+            .limit(self.max_logs).all()
+
+        with self._lock:
+            self._zones, self._gates, self._devices = zones, gates, devices
+            self._logs = deque((log_entry_from_scan_log(log) for log in reversed(logs)), maxlen=self.max_logs)
+            self._version += 1
+            self._base_version = self._version
+            self._history.clear()
+            self._loaded = True
+        logger.info(f"Dashboard state loaded: {len(zones)} zones, {len(gates)} gates, {len(devices)} devices "
+                    f"(v{self._version})")
+
+    def invalidate(self):
+        """Infrastruktura je izmenjena (zone/gejtovi/uredjaji) - sledeci citalac ucitava ponovo."""
+        with self._lock:
+            self._loaded = False
+            self._version += 1
+            self._base_version = self._version
+            self._history.clear()
+
+    def reset(self):
+        with self._lock:
+            self._loaded = False
+            self._history.clear()
+            self._zones, self._gates, self._devices = {}, {}, {}
+            self._logs.clear()
+
+    # --- Promene (decision thread, liveness sweeper) ---
+
+    def update_zone(self, zone_id, occupancy, capacity=None):
+        with self._lock:
+            zone = self._zones.get(zone_id) if self._loaded else None
+            if zone is None:
+                return
+            capacity = zone["capacity"] if capacity is None else capacity
+            if zone["occupancy"] == occupancy and zone["capacity"] == capacity:
+                return
+            zone = _zone_entry(zone_id, zone["name"], zone["parent_id"], capacity, occupancy)
+            self._zones[zone_id] = zone
+            self._record(KIND_ZONE, zone_id, zone)
+
+    def update_device(self, ip, status, last_seen=None):
+        with self._lock:
+            device = self._devices.get(ip) if self._loaded else None
+            if device is None:
+                return
+            device = dict(device, status=status, last_seen=last_seen)
+            self._devices[ip] = device
+            self._record(KIND_DEVICE, ip, device)
+
+    def add_log(self, entry: dict):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._logs.append(entry)
+            self._record(KIND_LOG, None, entry)
+
+    def _record(self, kind, key, data):
+        self._version += 1
+        self._history.append((self._version, kind, key, data))
+
+    # --- Citanje ---
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "type": "snapshot",
+                "version": self._version,
+                "zones": list(self._zones.values()),
+                "gates": list(self._gates.values()),
+                "devices": list(self._devices.values()),
+                "logs": list(reversed(self._logs)),
+            }
+
+    def changes_since(self, version: int) -> Optional[dict]:
+        """
+        Delta od `version` do trenutne verzije, ili None ako klijent mora na snapshot
+        (verzija je starija od istorijata, pre poslednjeg load-a ili "iz buducnosti").
+        """
+        with self._lock:
+            if not self._loaded or version > self._version:
+                return None
+            oldest = self._history[0][0] if self._history else self._version + 1
+            if version < self._base_version or version < oldest - 1:
+                return None
+            zones, devices, logs = {}, {}, []
+            # Istorijat je sortiran po verziji - preskace se ono sto klijent vec ima
+            start = max(0, version - oldest + 1)
+            for i in range(start, len(self._history)):
+                _, kind, key, data = self._history[i]
+                if kind == KIND_ZONE:
+                    zones[key] = data
+                elif kind == KIND_DEVICE:
+                    devices[key] = data
+                else:
+                    logs.append(data)
+            return {
+                "type": "delta",
+                "from_version": version,
+                "version": self._version,
+                "zones": list(zones.values()),
+                "devices": list(devices.values()),
+                "logs": list(reversed(logs[-self.max_logs:])),
+            }
+
+    def ensure_loaded(self):
+        """
+        Load tacno jednom i kad vise HTTP citanja stigne istovremeno: svaki load
+        pomera baznu verziju i brise istorijat, pa bi klijenti bez potrebe radili resync.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.load()
+
+    def read(self, since: Optional[int] = None) -> dict:
+        """HTTP: delta ako je moguca, inace (i za since=None) snapshot. Ucitava stanje po potrebi."""
+        self.ensure_loaded()
+        if since is not None:
+            delta = self.changes_since(since)
+            if delta is not None:
+                return delta
+        return self.snapshot()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "version": self._version,
+                "base_version": self._base_version,
+                "history": len(self._history),
+                "history_capacity": self._history.maxlen,
+            }
+
+
+# Globalna instanca (Logic Engine i Forwarder upisuju, /api/gates/dashboard/state cita)
+DASHBOARD_STATE = DashboardState()
+
+
+class DashboardStream:
+    """
+    Jednom po tick-u salje dashboard_delta sa svim promenama od prethodnog slanja.
+    Klijent proverava from_version == svoja verzija; ako nije (propusten event,
+    reconnect) ili stigne {"type": "resync"}, trazi GET /api/gates/dashboard/state?since=<verzija>.
+    """
+
+    def __init__(self, publish: Callable, state: DashboardState = DASHBOARD_STATE,
+                 tick_ms: float = DEFAULT_STREAM_TICK_MS):
+        self.publish = publish     # publish(event, payload, rooms) - RealtimeEventBus ili emit_to_rooms
+        self.state = state
+        self.tick = tick_ms / 1000.0
+        self._sent_version = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.deltas_sent = 0
+        self.resyncs_sent = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._sent_version = self.state.version
+        self._thread = threading.Thread(target=self._run, daemon=True, name="dashboard-stream")
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def flush(self) -> bool:
+        """Salje jednu deltu (ili resync) ako se stanje promenilo od poslednjeg slanja."""
+        version = self.state.version
+        if self._sent_version is not None and version == self._sent_version:
+            return False
+        delta = self.state.changes_since(self._sent_version) if self._sent_version is not None else None
+        if delta is None:
+            payload = {"type": "resync", "version": version}
+            self.resyncs_sent += 1
+        else:
+            payload = delta
+            version = delta["version"]
+            self.deltas_sent += 1
+        self.publish(EVENT_DASHBOARD_DELTA, payload, ())
+        self._sent_version = version
+        return True
+
+    def _run(self):
+        while not self._stop_event.wait(self.tick):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Dashboard stream tick failed: {e}")
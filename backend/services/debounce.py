@@ -0,0 +1,186 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger("debounce")
+
+# Podrazumevani prozor u kome se isti sken na istom gejtu ignorise
+DEFAULT_WINDOW_SECONDS = 20.0
+DEFAULT_MAX_ENTRIES = 50000
+
+
+class ScanDebouncer:
+    """
+    Thread-safe TTL store za debounce skenova (kljuc: gejt + vrednost kredencijala).
+
+    Unosi su rasporedjeni u "trake" po duzini prozora: unutar jedne trake rok isteka
+    raste redosledom upisa (monotonic clock), pa OrderedDict trake je uredjen po isteku.
+    Istekli unosi se skidaju sa pocetka traka, a provera i upis su dict pristup -
+    sve amortizovano O(1) (broj traka = broj razlicitih prozora, tipicno 1-3).
+
+    Prozor se bira po (gejt, tip) -> gejt -> tip -> podrazumevani.
+    Memorija je ogranicena sa max_entries (izbacuje se unos koji bi najpre istekao).
+    """
+
+    def __init__(self, default_window: float = DEFAULT_WINDOW_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.default_window = default_window
+        self.max_entries = max_entries
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._windows = {}      # (gate_id|None, cred_type|None) -> sekunde
+        self._lanes = {}        # window -> OrderedDict(key -> expires_at)
+        self._index = {}        # key -> window (u kojoj traci je kljuc)
+
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+
+    # --- Konfiguracija ---
+
+    def set_window(self, seconds: float, gate_id: Optional[int] = None, cred_type: Optional[str] = None):
+        """Postavlja prozor za gejt, tip kredencijala ili njihovu kombinaciju (seconds <= 0 iskljucuje debounce)."""
+        with self._lock:
+            if gate_id is None and cred_type is None:
+                self.default_window = float(seconds)
+            else:
+                self._windows[(gate_id, cred_type)] = float(seconds)
+
+    def clear_window(self, gate_id: Optional[int] = None, cred_type: Optional[str] = None):
+        with self._lock:
+            self._windows.pop((gate_id, cred_type), None)
+
+    def window_for(self, gate_id: Optional[int], cred_type: Optional[str]) -> float:
+        windows = self._windows
+        for key in ((gate_id, cred_type), (gate_id, None), (None, cred_type)):
+            if key in windows:
+                return windows[key]
+        return self.default_window
+
+    # --- Glavna operacija ---
+
+    def check_and_mark(self, gate_id: int, cred_type: str, cred_value: str) -> Optional[float]:
+        """
+        Ako je isti sken vec vidjen u prozoru vraca preostale sekunde (duplikat, rok se NE produzava).
+        U suprotnom belezi sken i vraca None.
+        """
+        key = (gate_id, cred_value)
+        now = self._clock()
+
+        with self._lock:
+            self._expire(now)
+
+            window = self._index.get(key)
+            if window is not None:
+                remaining = self._lanes[window][key] - now
+                if remaining > 0:
+                    self._hits += 1
+                    return remaining
+                self._remove(key)
+
+            self._misses += 1
+            window = self.window_for(gate_id, cred_type)
+            if window <= 0:
+                return None
+
+            lane = self._lanes.get(window)
+            if lane is None:
+                lane = self._lanes[window] = OrderedDict()
+            lane[key] = now + window
+            self._index[key] = window
+
+            if len(self._index) > self.max_entries:
+                self._evict_one()
+            return None
+
+    def forget(self, gate_id: int, cred_value: str):
+        """Brise unos (npr. kad operater zeli da odmah ponovi sken)."""
+        with self._lock:
+            self._remove((gate_id, cred_value))
+
+    def reset(self):
+        with self._lock:
+            self._lanes.clear()
+            self._index.clear()
+            self._hits = self._misses = self._expired = self._evicted = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "evicted": self._evicted,
+                "default_window_seconds": self.default_window,
+                "windows": [
+                    {"gate_id": gate_id, "cred_type": cred_type, "seconds": seconds}
+                    for (gate_id, cred_type), seconds in self._windows.items()
+                ],
+            }
+
+    # --- Interno (pozivati pod lock-om) ---
+
+    def _expire(self, now: float):
+        for window, lane in list(self._lanes.items()):
+            while lane:
+                key, expires_at = next(iter(lane.items()))
+                if expires_at > now:
+                    break
+                lane.popitem(last=False)
+                del self._index[key]
+                self._expired += 1
+            if not lane:
+                del self._lanes[window]
+
+    def _remove(self, key):
+        window = self._index.pop(key, None)
+        if window is None:
+            return
+        lane = self._lanes[window]
+        del lane[key]
+        if not lane:
+            del self._lanes[window]
+
+    def _evict_one(self):
+        # Izbacuje unos koji bi najpre istekao (pocetak trake sa najranijim rokom)
+        window = min(self._lanes, key=lambda w: next(iter(self._lanes[w].values())))
+        key, _ = self._lanes[window].popitem(last=False)
+        del self._index[key]
+        if not self._lanes[window]:
+            del self._lanes[window]
+        self._evicted += 1
+
+
+def parse_window_spec(spec: str):
+    """
+    Parsira DEBOUNCE_WINDOWS, npr. "20,LPR=5,gate3=10,gate3:RFID=2".
+    Vraca listu (seconds, gate_id, cred_type); samostalan broj je podrazumevani prozor.
+    """
+    result = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" not in part:
+            result.append((float(part), None, None))
+            continue
+        target, seconds = part.split("=", 1)
+        gate_id, cred_type = None, None
+        for token in target.strip().split(":"):
+            token = token.strip()
+            if token.lower().startswith("gate"):
+                gate_id = int(token[4:])
+            else:
+                cred_type = token.upper()
+        result.append((float(seconds), gate_id, cred_type))
+    return result
+
+
+# Globalna instanca (deli je Logic Engine i system API)
+SCAN_DEBOUNCE = ScanDebouncer()
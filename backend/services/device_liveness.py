@@ -0,0 +1,109 @@
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger("device_liveness")
+
+# Uredjaj je OFFLINE ako se ne javi (HEARTBEAT ili sken) duze od ovoga
+DEVICE_TIMEOUT_SECONDS = 60.0
+SWEEP_INTERVAL_SECONDS = 5.0
+
+STATUS_ONLINE = "ONLINE"
+STATUS_OFFLINE = "OFFLINE"
+
+
+class DeviceLivenessRegistry:
+    """
+    In-memory registar "zivih" uredjaja (po IP adresi).
+
+    - touch() se zove na svaki HEARTBEAT i sken: O(1), bez baze.
+    - is_online() / count_online() citaju dashboard i gate endpoint-i.
+    - on_transition callback (device_status event) se poziva SAMO na promenu
+      stanja (OFFLINE -> ONLINE i obrnuto), ne na svaki heartbeat.
+    """
+
+    def __init__(self, timeout_seconds: float = DEVICE_TIMEOUT_SECONDS,
+                 on_transition: Optional[Callable[[str, str, str], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.timeout_seconds = timeout_seconds
+        self.on_transition = on_transition
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._last_seen = {}      # ip -> monotonic
+        self._last_seen_at = {}   # ip -> datetime (za prikaz)
+        self._online = set()
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, interval: float = SWEEP_INTERVAL_SECONDS):
+        """Pokrece sweeper koji uredjaje bez javljanja prebacuje u OFFLINE."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sweep_loop, args=(interval,), daemon=True, name="liveness-sweeper")
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def touch(self, ip: str):
+        now = self._clock()
+        with self._lock:
+            self._last_seen[ip] = now
+            self._last_seen_at[ip] = datetime.now()
+            became_online = ip not in self._online
+            if became_online:
+                self._online.add(ip)
+
+        if became_online:
+            self._notify(ip, STATUS_ONLINE)
+
+    def is_online(self, ip: str) -> bool:
+        last = self._last_seen.get(ip)
+        return last is not None and (self._clock() - last) < self.timeout_seconds
+
+    def count_online(self, ips: Iterable[str]) -> int:
+        return sum(1 for ip in ips if self.is_online(ip))
+
+    def last_seen(self, ip: str) -> Optional[datetime]:
+        return self._last_seen_at.get(ip)
+
+    def sweep(self):
+        """Oznacava istekle uredjaje kao OFFLINE i javlja tranzicije."""
+        now = self._clock()
+        expired = []
+        with self._lock:
+            for ip in list(self._online):
+                if now - self._last_seen[ip] >= self.timeout_seconds:
+                    self._online.discard(ip)
+                    expired.append(ip)
+
+        for ip in expired:
+            self._notify(ip, STATUS_OFFLINE)
+
+    def reset(self):
+        with self._lock:
+            self._last_seen.clear()
+            self._last_seen_at.clear()
+            self._online.clear()
+
+    def _notify(self, ip: str, status: str):
+        logger.info(f"Device {ip} is now {status}")
+        if self.on_transition:
+            last = self._last_seen_at.get(ip)
+            try:
+                self.on_transition(ip, status, last.isoformat() if last else None)
+            except Exception as e:
+                logger.error(f"device_status callback failed for {ip}: {e}")
+
+    def _sweep_loop(self, interval: float):
+        while not self._stop_event.wait(interval):
+            self.sweep()
+
+
+# Globalna instanca (Forwarder je puni, API rute citaju)
+DEVICE_LIVENESS = DeviceLivenessRegistry()
@@ -0,0 +1,89 @@
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from models import Device
+
+logger = logging.getLogger("device_registry")
+
+
+@dataclass(frozen=True)
+class DeviceRoute:
+    """Nepromenljiv snapshot uredjaja - bezbedno se deli izmedju thread-ova."""
+    device_id: int
+    gate_id: Optional[int]
+    ip_address: str
+    port: Optional[int]            # komandni port kontrolera
+    ingress_port: Optional[int]    # listener na koji uredjaj salje skenove
+    device_type: Optional[str]
+    name: Optional[str]
+
+
+class DeviceRoutingTable:
+    """
+    Procesna tabela rutiranja: IP (i opciono ingress port) -> uredjaj -> gejt.
+
+    Puni se pri startu iz Device tabele, a CRUD rute (api/routes_devices.py) je
+    osvezavaju posle commit-a. Lookup je cist dict pristup - bez DB upita po skenu.
+    Novi snapshot se gradi sa strane i menja jednom dodelom reference (atomicno).
+    """
+
+    def __init__(self):
+        self._snapshot = None      # (by_ip, by_ip_ingress_port) ili None dok nije ucitano
+        self._reload_lock = threading.Lock()
+        self.version = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def reload(self):
+        """Gradi novi snapshot iz baze. Mora u App Context-u."""
+        with self._reload_lock:
+            by_ip = {}
+            by_ip_port = {}
+            for d in Device.query.order_by(Device.id).all():
+                route = DeviceRoute(
+                    device_id=d.id,
+                    gate_id=d.gate_id,
+                    ip_address=d.ip_address,
+                    port=d.port,
+                    ingress_port=d.ingress_port,
+                    device_type=d.device_type,
+                    name=d.name,
+                )
+                # Isto kao stari filter_by(ip_address=ip).first(): prvi (najmanji ID) pobedjuje
+                by_ip.setdefault(d.ip_address, route)
+                if d.ingress_port is not None:
+                    by_ip_port.setdefault((d.ip_address, d.ingress_port), route)
+
+            self._snapshot = (by_ip, by_ip_port)
+            self.version += 1
+            logger.info(f"Device routing table loaded: {len(by_ip)} IPs (v{self.version})")
+
+    def invalidate(self):
+        """Odbacuje snapshot; sledeci lookup ga ponovo ucitava."""
+        self._snapshot = None
+
+    def lookup(self, ip: str, port: Optional[int] = None) -> Optional[DeviceRoute]:
+        """
+        Vraca rutu za IP. Ako je zadat lokalni port listener-a i postoji uredjaj sa tim
+        (ip, ingress_port), on ima prednost.
+        Ocekuje App Context samo ako tabela jos nije ucitana.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.reload()
+            snapshot = self._snapshot
+
+        by_ip, by_ip_port = snapshot
+        if port is not None:
+            route = by_ip_port.get((ip, port))
+            if route is not None:
+                return route
+        return by_ip.get(ip)
+
+
+# Globalna instanca (deli je Forwarder i API rute)
+DEVICE_ROUTES = DeviceRoutingTable()
@@ -0,0 +1,161 @@
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Hashable
+
+logger = logging.getLogger("dispatcher")
+
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_PENDING = 2000        # Ukupno skenova u svim redovima
+DEFAULT_SUBMIT_TIMEOUT = 2.0      # Koliko connection thread ceka kad su redovi puni
+
+
+class GateDispatcher:
+    """
+    Per-gate FIFO redovi + fiksni pool worker-a.
+
+    - Skenovi za ISTI gejt se obradjuju striktno po redosledu prijema
+      (gejt je u obradi kod najvise jednog worker-a u datom trenutku).
+    - Broj paralelnih odluka (= DB konekcija) je ogranicen brojem worker-a.
+    - Kad baza uspori, redovi rastu; iznad max_pending submit blokira (backpressure),
+      a posle submit_timeout sken se odbacuje i broji.
+    """
+
+    def __init__(self, handler: Callable, workers: int = DEFAULT_WORKERS,
+                 max_pending: int = DEFAULT_MAX_PENDING, submit_timeout: float = DEFAULT_SUBMIT_TIMEOUT):
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+
+        self._cond = threading.Condition()
+        self._queues = {}            # gate_key -> deque(items)
+        self._ready = deque()        # gejtovi koji imaju posla i nisu kod worker-a
+        self._busy = set()           # gejtovi koje trenutno obradjuje neki worker
+        self._pending = 0
+        self._stopping = False
+        self._threads = []
+
+        # Metrike
+        self._submitted = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._backpressure_waits = 0
+        self._backpressure_wait_seconds = 0.0
+        self._max_pending_seen = 0
+        self._queue_wait_total = 0.0
+        self._handler_time_total = 0.0
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, daemon=True, name=f"gate-worker-{i}")
+            t.start()
+            self._threads.append(t)
+        logger.info(f" GateDispatcher started with {self.workers} workers")
+
+    def stop(self, timeout: float = 2.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def submit(self, gate_key: Hashable, *args) -> bool:
+        """Stavlja posao u FIFO red gejta. Vraca False ako je odbijen zbog pretrpanosti."""
+        with self._cond:
+            if self._pending >= self.max_pending:
+                self._backpressure_waits += 1
+                started = time.monotonic()
+                deadline = started + self.submit_timeout
+                while self._pending >= self.max_pending and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._backpressure_wait_seconds += time.monotonic() - started
+
+                if self._pending >= self.max_pending or self._stopping:
+                    self._rejected += 1
+                    logger.warning(f"Dispatcher saturated ({self._pending} pending), dropping scan for gate {gate_key}")
+                    return False
+
+            queue = self._queues.get(gate_key)
+            if queue is None:
+                queue = self._queues[gate_key] = deque()
+            queue.append((time.monotonic(), args))
+
+            self._pending += 1
+            self._submitted += 1
+            if self._pending > self._max_pending_seen:
+                self._max_pending_seen = self._pending
+
+            # Gejt ide u ready red samo ako ga niko ne obradjuje i nije vec tamo
+            if gate_key not in self._busy and len(queue) == 1:
+                self._ready.append(gate_key)
+                self._cond.notify()
+            return True
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopping:
+                    self._cond.wait()
+                if self._stopping and not self._ready:
+                    return
+                gate_key = self._ready.popleft()
+                self._busy.add(gate_key)
+                enqueued_at, args = self._queues[gate_key].popleft()
+                self._queue_wait_total += time.monotonic() - enqueued_at
+
+            started = time.monotonic()
+            try:
+                self.handler(gate_key, *args)
+                ok = True
+            except Exception as e:
+                ok = False
+                logger.error(f"Dispatcher handler failed for gate {gate_key}: {e}")
+            handler_time = time.monotonic() - started
+
+            with self._cond:
+                self._pending -= 1
+                self._handler_time_total += handler_time
+                if ok:
+                    self._processed += 1
+                else:
+                    self._failed += 1
+                self._busy.discard(gate_key)
+
+                queue = self._queues[gate_key]
+                if queue:
+                    # Gejt ide na kraj ready reda (fer raspodela izmedju gejtova)
+                    self._ready.append(gate_key)
+                else:
+                    del self._queues[gate_key]
+                # Budimo i worker-e i eventualne submit-ere koji cekaju na mesto
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            done = self._processed + self._failed
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "max_pending_seen": self._max_pending_seen,
+                "queue_depth_by_gate": {str(k): len(q) for k, q in self._queues.items() if q},
+                "busy_gates": len(self._busy),
+                "submitted": self._submitted,
+                "processed": self._processed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "backpressure_waits": self._backpressure_waits,
+                "backpressure_wait_ms": round(self._backpressure_wait_seconds * 1000, 1),
+                "avg_queue_wait_ms": round(self._queue_wait_total / done * 1000, 2) if done else 0.0,
+                "avg_decision_ms": round(self._handler_time_total / done * 1000, 2) if done else 0.0,
+                # Sume za racunanje proseka u intervalu (replay_traffic.py radi razliku dva snimka)
+                "queue_wait_ms_total": round(self._queue_wait_total * 1000, 1),
+                "decision_ms_total": round(self._handler_time_total * 1000, 1),
+            }
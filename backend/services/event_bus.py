@@ -0,0 +1,154 @@
+import threading
+import time
+import logging
+from collections import deque
+from typing import Iterable
+
+from services.realtime_rooms import emit_to_rooms
+
+logger = logging.getLogger("event_bus")
+
+DEFAULT_CAPACITY = 1000
+DEFAULT_HIGH_WATER = 0.8     # deo kapaciteta posle kog pocinje uzorkovanje
+DEFAULT_SAMPLE_EVERY = 10
+
+# Politika po tipu eventa kad emiter ne stize (vidi RealtimeEventBus)
+POLICY_KEEP = "keep"         # retki eventi sa stanjem - ne uzorkuju se
+POLICY_SAMPLE = "sample"     # eventi po skenu - iznad high-water prolazi svaki N-ti
+
+EVENT_POLICIES = {
+    "access_log": POLICY_SAMPLE,
+    "occupancy_update": POLICY_SAMPLE,
+    "occupancy_batch": POLICY_KEEP,     # vec spojen po tick-u, nosi poslednje stanje zona
+    "device_status": POLICY_KEEP,       # samo promene ONLINE/OFFLINE
+    "dashboard_delta": POLICY_KEEP,     # propustena delta = klijent mora na resync
+}
+
+
+class RealtimeEventBus:
+    """
+    Ograniceni in-process red za Socket.IO evente.
+
+    Logic Engine samo doda (event, payload, sobe) u red - O(1), bez serijalizacije
+    i bez mreze. Jedan emiter thread prazni red i salje evente u sobe
+    (services/realtime_rooms.py), pa spor dashboard nikad ne drzi rampu.
+
+    Politika pod opterecenjem:
+      - do high-water (80% kapaciteta) sve ide u red;
+      - iznad high-water "sample" eventi (access_log, occupancy_update) prolaze
+        samo svaki sample_every-ti po tipu eventa, ostali se broje kao sampled_out;
+      - "keep" eventi (device_status, occupancy_batch) se ne uzorkuju;
+      - pun red: novi event se odbacuje (drop-newest) i broji kao dropped.
+    Nepoznati eventi se tretiraju kao "sample".
+    """
+
+    def __init__(self, socketio, capacity: int = DEFAULT_CAPACITY, high_water: float = DEFAULT_HIGH_WATER,
+                 sample_every: int = DEFAULT_SAMPLE_EVERY):
+        self.socketio = socketio
+        self.capacity = capacity
+        self.high_water = max(1, int(capacity * high_water))
+        self.sample_every = max(1, sample_every)
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self._max_depth = 0
+        self._sample_counters = {}   # event -> broj skenova iznad high-water
+        self._events = {}            # event -> [objavljeno, poslato, uzorkovanjem preskoceno, odbaceno]
+        self._send_time_total = 0.0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="event-emitter")
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Zaustavlja emiter; ono sto je ostalo u redu se salje pre izlaska (do timeout-a)."""
+        self._stop_event.set()
+        with self._not_empty:
+            self._not_empty.notify()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def publish(self, event: str, payload, rooms: Iterable[str] = (), include_all: bool = True) -> bool:
+        """Stavlja event u red. Vraca False ako je odbacen ili preskocen po politici."""
+        with self._not_empty:
+            counters = self._counters(event)
+            counters[0] += 1
+            depth = len(self._queue)
+            if depth >= self.capacity:
+                counters[3] += 1
+                return False
+            if depth >= self.high_water and EVENT_POLICIES.get(event, POLICY_SAMPLE) == POLICY_SAMPLE:
+                seen = self._sample_counters.get(event, 0)
+                self._sample_counters[event] = seen + 1
+                if seen % self.sample_every:
+                    counters[2] += 1
+                    return False
+            self._queue.append((event, payload, tuple(rooms), include_all))
+            self._max_depth = max(self._max_depth, depth + 1)
+            self._not_empty.notify()
+            return True
+
+    def drain(self) -> int:
+        """Salje sve sto je u redu na pozivajucem thread-u (testovi / gasenje bez emitera)."""
+        sent = 0
+        while self._send_next(block=False):
+            sent += 1
+        return sent
+
+    def stats(self) -> dict:
+        with self._lock:
+            sent = sum(c[1] for c in self._events.values())
+            return {
+                "capacity": self.capacity,
+                "high_water": self.high_water,
+                "sample_every": self.sample_every,
+                "depth": len(self._queue),
+                "max_depth": self._max_depth,
+                "avg_send_ms": round(self._send_time_total / sent * 1000, 3) if sent else 0.0,
+                "events": {
+                    event: {"published": c[0], "sent": c[1], "sampled_out": c[2], "dropped": c[3]}
+                    for event, c in sorted(self._events.items())
+                },
+            }
+
+    def _counters(self, event):
+        counters = self._events.get(event)
+        if counters is None:
+            counters = self._events[event] = [0, 0, 0, 0]
+        return counters
+
+    def _send_next(self, block: bool) -> bool:
+        with self._not_empty:
+            if block and not self._queue:
+                self._not_empty.wait(timeout=0.5)
+            if not self._queue:
+                return False
+            event, payload, rooms, include_all = self._queue.popleft()
+            if not self._queue:
+                # Red je ispraznjen - sledece preopterecenje krece uzorkovanje iz pocetka
+                self._sample_counters = {}
+
+        # Serijalizacija i slanje (greske Socket.IO-a loguje emit_to_rooms)
+        started = time.perf_counter()
+        emit_to_rooms(self.socketio, event, payload, rooms, include_all=include_all)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._counters(event)[1] += 1
+            self._send_time_total += elapsed
+        return True
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._send_next(block=True)
+            except Exception as e:
+                logger.error(f"Event emitter failed: {e}")
+        self.drain()
@@ -0,0 +1,171 @@
+import asyncio
+import functools
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from services.forwarder_tcp import (
+    ForwarderIngressServer, ConnectionReader, LISTEN_BACKLOG, RECV_BUFFER_SIZE, LISTENER_STATUS
+)
+from services.framing import FRAMING_NEWLINE
+from services.binary_protocol import PROTOCOL_BINARY
+from services.dispatcher import DEFAULT_WORKERS
+
+logger = logging.getLogger("forwarder")
+
+# Koliko batch-eva (parsiranje + rutiranje do gejta) moze da tece paralelno
+DEFAULT_DECISION_WORKERS = 16
+
+
+class AsyncForwarderIngressServer(ForwarderIngressServer):
+    """
+    Asyncio varijanta Forwarder-a.
+    Jedan event loop opsluzuje SVE sokete uredjaja, parsiranje/rutiranje ide u ograniceni
+    ThreadPoolExecutor, a odluke (handle_scan + send_open_command) u GateDispatcher.
+    Nema vise jednog OS thread-a po konekciji.
+    """
+
+    def __init__(self, host, port, flask_app, socketio, max_workers=DEFAULT_DECISION_WORKERS,
+                 backlog=LISTEN_BACKLOG, framing=FRAMING_NEWLINE, decision_workers=DEFAULT_WORKERS, listeners=None,
+                 capture=None, occupancy=None, committer=None, log_writer=None, sessions=None,
+                 broadcaster=None, events=None, dashboard=None):
+        super().__init__(host, port, flask_app, socketio, framing=framing, decision_workers=decision_workers,
+                         listeners=listeners, capture=capture, occupancy=occupancy, committer=committer,
+                         log_writer=log_writer, sessions=sessions, broadcaster=broadcaster,
+                         events=events, dashboard=dashboard)
+        self.max_workers = max_workers
+        self.backlog = backlog
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="decision")
+        self._loop = None
+        self._servers = []            # (ListenerSpec, asyncio.Server)
+        self._ready = threading.Event()
+
+    def start(self):
+        """Pokrece event loop u background thread-u i ceka da listener bude spreman"""
+        self.load_routing_table()
+        self.start_occupancy_engine()
+        self.start_group_commit()
+        self.start_realtime()
+        self.start_liveness_tracking()
+        self.dispatcher.start()
+        self.controller_pool.start()
+        self.command_outbox.start()
+        t = threading.Thread(target=self._run_loop, daemon=True, name="forwarder-asyncio")
+        t.start()
+        self._ready.wait(timeout=5)
+        for listener, port in zip(self.listeners, self.bound_ports):
+            if port is not None:
+                logger.info(f" Forwarder (asyncio) listening on {self.host}:{port} ({self._describe(listener)})")
+        logger.info(f" Forwarder (asyncio) running with {self.max_workers} ingress workers")
+
+    def stop(self):
+        """Gasi listener-e i executor (koristi se u testovima i pri gasenju aplikacije)"""
+        self._stop_event.set()
+        if self._loop:
+            for _, server in self._servers:
+                self._loop.call_soon_threadsafe(server.close)
+        self._executor.shutdown(wait=False)
+        self.stop_services()
+
+    @property
+    def bound_ports(self):
+        """Stvarni portovi po listener-u, istim redom kao self.listeners (None ako bind nije uspeo)"""
+        bound = {id(listener): server for listener, server in self._servers}
+        ports = []
+        for listener in self.listeners:
+            server = bound.get(id(listener))
+            ports.append(server.sockets[0].getsockname()[1] if server and server.sockets else None)
+        return ports
+
+    @property
+    def bound_port(self):
+        """Stvarni port prvog (glavnog DATA) listener-a - bitno kad je zadat port=0"""
+        return self.bound_ports[0] if self._servers else None
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._serve())
+        except Exception as e:
+            logger.error(f"Critical Forwarder Error (asyncio): {e}")
+        finally:
+            self._ready.set()
+            loop.close()
+
+    async def _serve(self):
+        for listener in self.listeners:
+            try:
+                server = await asyncio.start_server(
+                    functools.partial(self._handle_client, listener), self.host, listener.port, backlog=self.backlog
+                )
+                self._servers.append((listener, server))
+            except OSError as e:
+                # Jedan zauzet port ne sme da obori ostale listener-e
+                logger.error(f"Critical Forwarder Error on port {listener.port}: {e}")
+        self._ready.set()
+
+        if not self._servers:
+            return
+        try:
+            await asyncio.gather(*(server.serve_forever() for _, server in self._servers))
+        except asyncio.CancelledError:
+            pass
+
+    async def _handle_client(self, listener, reader, writer):
+        ip = writer.get_extra_info('peername')[0]
+        if listener.kind == LISTENER_STATUS:
+            await self._handle_status_client(ip, reader, writer)
+            return
+
+        loop = asyncio.get_running_loop()
+        conn_reader = ConnectionReader(self.framing)
+        conn_id = self.capture.open_connection() if self.capture else None
+
+        try:
+            while not self._stop_event.is_set():
+                data = await reader.read(RECV_BUFFER_SIZE)
+                if not data:
+                    protocol, items = conn_reader.protocol, conn_reader.flush()
+                else:
+                    if conn_id:
+                        self.capture.record(conn_id, ip, listener.port, data)
+                    protocol, items = conn_reader.feed(data)
+
+                # Batch ide u executor; cekamo ga da bi poruke sa iste konekcije ostale u redosledu
+                if items and protocol == PROTOCOL_BINARY:
+                    reply = await loop.run_in_executor(self._executor, self.process_frames, ip, items, listener)
+                    if reply:
+                        writer.write(reply)
+                        await writer.drain()
+                elif items:
+                    await loop.run_in_executor(self._executor, self.process_batch, ip, items, listener)
+
+                if not data:
+                    break
+
+        except ConnectionResetError:
+            pass
+        except Exception as e:
+            logger.error(f"Error handling client {ip}: {e}")
+        finally:
+            if conn_id:
+                self.capture.record_close(conn_id, ip, listener.port)
+            writer.close()
+
+    async def _handle_status_client(self, ip, reader, writer):
+        """STATUS port: samo osvezavanje last_seen direktno u event loop-u (bez executor-a i baze)."""
+        try:
+            while not self._stop_event.is_set():
+                data = await reader.read(RECV_BUFFER_SIZE)
+                if not data:
+                    break
+                self._handle_heartbeat(ip)
+        except ConnectionResetError:
+            pass
+        except Exception as e:
+            logger.error(f"Error handling status client {ip}: {e}")
+        finally:
+            writer.close()
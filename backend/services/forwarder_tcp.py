@@ -4,10 +4,25 @@ import logging
 import json
 from datetime import datetime
 from dataclasses import dataclass
+from typing import Optional
 
 # Importujemo modele i novi servis
 from models import db, Device, Gate, CredentialType, ScanLog
 from services.parking_service import ParkingLogicService
+from services.framing import StreamFramer, FRAMING_NEWLINE
+from services.binary_protocol import (
+    BinaryFrameDecoder, detect_protocol, encode_ack, PROTOCOL_BINARY, PROTOCOL_TEXT, MAGIC,
+    FRAME_SCAN_BATCH, FRAME_HEARTBEAT, ACK_ACCEPTED, ACK_UNKNOWN_DEVICE, ACK_INVALID_TYPE, ACK_BUSY
+)
+from services.dispatcher import GateDispatcher, DEFAULT_WORKERS
+from services.controller_pool import ControllerConnectionPool, CONTROLLER_PORT
+from services.command_outbox import CommandOutbox
+from services.device_registry import DEVICE_ROUTES
+from services.rule_index import RULE_INDEX
+from services.device_liveness import DEVICE_LIVENESS
+from services.latency import SCAN_LATENCY, PIPELINE_INGRESS
+from services.realtime_rooms import emit_to_rooms, rooms_for
+from services.dashboard_state import DASHBOARD_STATE
 
 # Podesavanje logger-a
 logger = logging.getLogger("forwarder")
@@ -17,6 +32,15 @@ logger.setLevel(logging.INFO)
 DATA_STREAM_PORT = 7000
 STATUS_STREAM_PORT = 7001
 
+# Koliko konekcija kernel drzi u redu dok ih ne prihvatimo (jutarnji talas reconnect-a)
+LISTEN_BACKLOG = 128
+
+RECV_BUFFER_SIZE = 4096
+
+# Accept petlja proverava stop na ovoliko sekundi; stop() ceka thread-ove najvise STOP_JOIN_TIMEOUT
+ACCEPT_POLL_SECONDS = 0.5
+STOP_JOIN_TIMEOUT = 2.0
+
 # Mapiranje lokalnog porta na tip kredenšl-a
 # (Ovo zavisi od konfiguracije hardvera: koji čitač je na kom portu)
 ROLE_BY_LOCAL_PORT = {
@@ -25,6 +49,77 @@ ROLE_BY_LOCAL_PORT = {
     5555: "LPR",
 }
 
+# Poruke koje na DATA portu znace "ziv sam" (proverava se prefiks, ne ceo payload)
+HEARTBEAT_PREFIXES = ("HEARTBEAT", "KeepAlive")
+
+# Ishod ingress-a u histogramima latencije (/api/system/latency)
+ACK_OUTCOMES = {
+    ACK_ACCEPTED: "ACCEPTED",
+    ACK_UNKNOWN_DEVICE: "UNKNOWN_DEVICE",
+    ACK_INVALID_TYPE: "INVALID_TYPE",
+    ACK_BUSY: "BUSY",
+}
+
+LISTENER_DATA = "DATA"       # Skenovi -> Logic Engine
+LISTENER_STATUS = "STATUS"   # Heartbeat/status -> samo Liveness registar (bez baze i App Context-a)
+
+@dataclass(frozen=True)
+class ListenerSpec:
+    port: int
+    kind: str = LISTENER_DATA
+    cred_type: Optional[str] = None   # Za "typed" data port: hardver salje raw kod bez "TYPE:" prefiksa
+
+def build_listeners(data_port=DATA_STREAM_PORT, status_port=STATUS_STREAM_PORT, typed_ports=None):
+    """
+    Pravi listu listener-a: glavni DATA port ("TYPE:VALUE"), STATUS port
+    i po jedan DATA port za svaki citac iz typed_ports ({port: "RFID"}).
+    """
+    listeners = [ListenerSpec(data_port, LISTENER_DATA)]
+    if status_port is not None:
+        listeners.append(ListenerSpec(status_port, LISTENER_STATUS))
+    for port, cred_type in (typed_ports or {}).items():
+        listeners.append(ListenerSpec(port, LISTENER_DATA, cred_type))
+    return listeners
+
+class ConnectionReader:
+    """
+    Stanje jedne DATA konekcije: pregovaranje protokola + framer/dekoder.
+    Prvi bajtovi odlucuju: MAGIC ("PKB1") -> binarni frejmovi, sve ostalo -> tekst.
+    """
+
+    def __init__(self, framing=FRAMING_NEWLINE):
+        self.protocol = None
+        self._head = bytearray()
+        self._framer = StreamFramer(framing)
+        self._decoder = None
+
+    def feed(self, data):
+        """Vraca (protocol, items): tekst -> lista poruka, binarno -> lista BinaryFrame."""
+        if self.protocol is None:
+            self._head += data
+            self.protocol = detect_protocol(self._head)
+            if self.protocol is None:
+                return PROTOCOL_TEXT, []
+            data = bytes(self._head)
+            self._head.clear()
+            if self.protocol == PROTOCOL_BINARY:
+                self._decoder = BinaryFrameDecoder()
+                data = data[len(MAGIC):]
+
+        if self.protocol == PROTOCOL_BINARY:
+            return PROTOCOL_BINARY, self._decoder.feed(data)
+        return PROTOCOL_TEXT, self._framer.feed(data)
+
+    def flush(self):
+        """Kraj konekcije: ostatak teksta je poslednja poruka (stari firmware bez '\\n')."""
+        if self.protocol is None and self._head:
+            self.protocol = PROTOCOL_TEXT
+            self._framer.feed(bytes(self._head))
+            self._head.clear()
+        if self.protocol == PROTOCOL_TEXT:
+            return self._framer.flush()
+        return []
+
 @dataclass(frozen=True)
 class ForwarderMessage:
     device_ip: str
@@ -38,70 +133,248 @@ class ForwarderIngressServer:
     Radi u zasebnom thread-u i ne blokira Flask.
     """
 
-    def __init__(self, host, port, flask_app, socketio):
+    def __init__(self, host, port, flask_app, socketio, framing=FRAMING_NEWLINE, decision_workers=DEFAULT_WORKERS,
+                 listeners=None, capture=None, occupancy=None, committer=None, log_writer=None,
+                 sessions=None, broadcaster=None, events=None, dashboard=None):
         self.host = host
         self.port = port
+        # Bez eksplicitne liste slusamo samo jedan DATA port (staro ponasanje)
+        self.listeners = listeners or [ListenerSpec(port, LISTENER_DATA)]
+        self.framing = framing    # "newline" ili "length" (4B big-endian prefiks)
         self.app = flask_app      # Treba nam za DB Context
         self.socketio = socketio  # Treba nam za Real-time evente
+        self.capture = capture    # Opcioni TrafficCaptureWriter (snimanje raw saobracaja za replay)
+        self.dashboard = dashboard  # Opcioni DashboardStream (dashboard_delta po tick-u)
         
         # Inicijalizujemo Logic Engine
         # Napomena: Logic Service ce koristiti app context unutar svojih metoda
-        self.parking_logic = ParkingLogicService(socketio)
+        # occupancy (OccupancyEngine) = popunjenost u memoriji sa write-behind upisom u bazu
+        # committer (GroupCommitter) = istovremene odluke dele jedan DB commit
+        # log_writer (ScanLogWriter) = ScanLog se upisuje asinhrono, u batch-evima
+        # sessions (ActiveSessionIndex) = user_id -> aktivna sesija/zona u memoriji (APB bez upita)
+        # broadcaster (OccupancyBroadcaster) = occupancy_update spojeni u jedan batch po tick-u
+        # events (RealtimeEventBus) = Socket.IO eventi idu kroz ograniceni red i emiter thread
+        self.parking_logic = ParkingLogicService(socketio, occupancy=occupancy, committer=committer,
+                                                 log_writer=log_writer, sessions=sessions,
+                                                 broadcaster=broadcaster, events=events)
+
+        # Odluke idu u per-gate FIFO redove koje prazni fiksni pool worker-a
+        # (redosled po gejtu je ocuvan, a broj DB konekcija ogranicen)
+        self.dispatcher = GateDispatcher(self._decide, workers=decision_workers)
+
+        # Trajne konekcije ka kontrolerima rampi (CMD:OPEN bez novog TCP handshake-a);
+        # link ka uredjaju koji je obrisan iz registra se uklanja iz pool-a
+        self.controller_pool = ControllerConnectionPool(
+            is_known=lambda ip: not DEVICE_ROUTES.is_loaded or DEVICE_ROUTES.lookup(ip) is not None)
+
+        # Odluka samo upise CMD:OPEN u outbox; slanje, retry i upis ishoda idu van decision thread-a
+        self.command_outbox = CommandOutbox(self.send_open_command, on_result=self._record_command_result)
         
         self._stop_event = threading.Event()
+        self._listen_socks = []       # (ListenerSpec, socket, bindovani port)
+        self._accept_threads = []
+        self._clients = {}            # socket uredjaja -> thread koji ga obradjuje
+        self._clients_lock = threading.Lock()
+
+    def load_routing_table(self):
+        """Ucitava IP -> gejt tabelu, indeks pravila i indeks aktivnih sesija pre prvog skena."""
+        try:
+            with self.app.app_context():
+                DEVICE_ROUTES.reload()
+                RULE_INDEX.reload()
+                if self.parking_logic.sessions:
+                    self.parking_logic.sessions.load()
+                DASHBOARD_STATE.load()
+        except Exception as e:
+            logger.error(f"Failed to load device routing table: {e}")
+
+    def start_occupancy_engine(self):
+        """Oporavak brojaca iz aktivnih sesija + write-behind flusher (samo ako je engine ukljucen)."""
+        if not self.parking_logic.occupancy:
+            return
+        try:
+            self.parking_logic.occupancy.start(self.app)
+        except Exception as e:
+            logger.error(f"Failed to start occupancy engine: {e}")
+
+    def start_group_commit(self):
+        if self.parking_logic.committer:
+            self.parking_logic.committer.start()
+        if self.parking_logic.log_writer:
+            self.parking_logic.log_writer.start()
+
+    def start_realtime(self):
+        if self.parking_logic.events:
+            self.parking_logic.events.start()
+        if self.parking_logic.broadcaster:
+            self.parking_logic.broadcaster.start()
+        if self.dashboard:
+            self.dashboard.start()
+
+    def start_liveness_tracking(self):
+        """device_status se emituje samo kad uredjaj promeni stanje (ONLINE/OFFLINE)."""
+        DEVICE_LIVENESS.on_transition = self._emit_device_status
+        DEVICE_LIVENESS.start()
 
     def start(self):
-        """Pokrece TCP listener u background thread-u"""
-        t = threading.Thread(target=self._run_server, daemon=True)
-        t.start()
-        logger.info(f" Forwarder TCP Server listening on {self.host}:{self.port}")
+        """Binduje listener-e i pokrece accept petlje u background thread-ovima"""
+        self.load_routing_table()
+        self.start_occupancy_engine()
+        self.start_group_commit()
+        self.start_realtime()
+        self.start_liveness_tracking()
+        self.dispatcher.start()
+        self.controller_pool.start()
+        self.command_outbox.start()
+        for listener in self.listeners:
+            sock = self._bind(listener)
+            if sock is None:
+                continue
+            t = threading.Thread(target=self._run_server, args=(listener, sock), daemon=True,
+                                 name=f"forwarder-accept-{listener.port}")
+            self._accept_threads.append(t)
+            t.start()
+            logger.info(f" Forwarder TCP Server listening on {self.host}:{sock.getsockname()[1]} ({self._describe(listener)})")
+
+        return self.bound_ports[0] if self._listen_socks else None
 
-    def _run_server(self):
+    def stop(self):
+        """Gasi listener-e, zatvara konekcije uredjaja i ceka njihove thread-ove (testovi, gasenje aplikacije)"""
+        self._stop_event.set()
+        for t in self._accept_threads:
+            t.join(timeout=STOP_JOIN_TIMEOUT)
+        for _, sock, _ in self._listen_socks:
+            sock.close()
+
+        with self._clients_lock:
+            clients = list(self._clients.items())
+        for client_sock, _ in clients:
+            try:
+                # recv() u thread-u obrade vraca b"" - poslednja poruka se obradi i thread izlazi
+                client_sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for _, t in clients:
+            t.join(timeout=STOP_JOIN_TIMEOUT)
+
+        self.stop_services()
+
+    def stop_services(self):
+        """Gasi pozadinske servise Forwarder-a (zajednicko za threaded i asyncio mod)"""
+        if self.capture:
+            self.capture.close()
+        self.dispatcher.stop()
+        self.command_outbox.stop()
+        self.controller_pool.stop()
+        if self.parking_logic.committer:
+            self.parking_logic.committer.stop()
+        if self.parking_logic.log_writer:
+            self.parking_logic.log_writer.stop()
+        if self.parking_logic.occupancy:
+            self.parking_logic.occupancy.stop()
+        if self.parking_logic.broadcaster:
+            self.parking_logic.broadcaster.stop()
+        if self.dashboard:
+            self.dashboard.stop()
+        if self.parking_logic.events:
+            self.parking_logic.events.stop()
+
+    @property
+    def bound_ports(self):
+        """Stvarni portovi po listener-u, istim redom kao self.listeners (None ako bind nije uspeo)"""
+        bound = {id(listener): port for listener, _, port in self._listen_socks}
+        return [bound.get(id(listener)) for listener in self.listeners]
+
+    @property
+    def bound_port(self):
+        """Stvarni port prvog (glavnog DATA) listener-a - bitno kad je zadat port=0"""
+        return self.bound_ports[0]
+
+    @staticmethod
+    def _describe(listener):
+        if listener.kind == LISTENER_STATUS:
+            return "status"
+        return f"data, raw {listener.cred_type}" if listener.cred_type else "data"
+
+    def _bind(self, listener):
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        
         try:
-            sock.bind((self.host, self.port))
-            sock.listen(5)
-            
+            sock.bind((self.host, listener.port))
+            sock.listen(LISTEN_BACKLOG)
+        except OSError as e:
+            # Jedan zauzet port ne sme da obori ostale listener-e
+            logger.error(f"Critical Forwarder Error on port {listener.port}: {e}")
+            sock.close()
+            return None
+        # accept() sa timeout-om, da petlja vidi stop; prihvaceni soketi ostaju blokirajuci
+        sock.settimeout(ACCEPT_POLL_SECONDS)
+        self._listen_socks.append((listener, sock, sock.getsockname()[1]))
+        return sock
+
+    def _run_server(self, listener, sock):
+        try:
             while not self._stop_event.is_set():
-                client_sock, addr = sock.accept()
+                try:
+                    client_sock, addr = sock.accept()
+                except socket.timeout:
+                    continue
                 # Svaki klijent (uredjaj) dobija svoj thread za obradu
                 client_handler = threading.Thread(
-                    target=self.handle_client_connection,
-                    args=(client_sock, addr)
+                    target=self._serve_client,
+                    args=(client_sock, addr, listener)
                 )
+                with self._clients_lock:
+                    self._clients[client_sock] = client_handler
                 client_handler.start()
-                
+
         except Exception as e:
-            logger.error(f"Critical Forwarder Error: {e}")
+            if not self._stop_event.is_set():
+                logger.error(f"Critical Forwarder Error on port {listener.port}: {e}")
         finally:
             sock.close()
 
-    def handle_client_connection(self, client_sock, addr):
+    def _serve_client(self, client_sock, addr, listener):
+        try:
+            self.handle_client_connection(client_sock, addr, listener)
+        finally:
+            with self._clients_lock:
+                self._clients.pop(client_sock, None)
+
+    def handle_client_connection(self, client_sock, addr, listener=None):
         ip, port = addr
+        listener = listener or self.listeners[0]
         # logger.debug(f"Device connected: {ip}")
 
+        if listener.kind == LISTENER_STATUS:
+            self._handle_status_connection(client_sock, ip)
+            return
+
+        # Jedan recv() moze da nosi vise skenova, a veliki LPR payload moze da stigne u delovima.
+        # Reader vraca samo kompletne poruke ("TYPE:PAYLOAD\n" ili PKB1 frejmove), pa ih obradjujemo kao batch.
+        reader = ConnectionReader(self.framing)
+        conn_id = self.capture.open_connection() if self.capture else None
+
         with client_sock:
             while True:
                 try:
-                    data = client_sock.recv(1024)
+                    data = client_sock.recv(RECV_BUFFER_SIZE)
                     if not data:
+                        # Stari firmware salje jednu poruku bez '\n' i zatvara konekciju
+                        self.process_batch(ip, reader.flush(), listener)
                         break
-                    
-                    message_str = data.decode('utf-8').strip()
-                    if not message_str:
+
+                    if conn_id:
+                        self.capture.record(conn_id, ip, listener.port, data)
+                    protocol, items = reader.feed(data)
+                    if not items:
                         continue
-                    
-                    # Parsiramo poruku (Ocekujemo format ili raw string)
-                    # Pretpostavka: Hardver salje podatke na port na koji je zakacen
-                    # Ali ovde slusamo na jednom portu, pa cemo simulirati 'local_port' logiku
-                    # ili koristiti raw payload.
-                    
-                    # Za potrebe V3.0, pretpostavljamo da uredjaj salje:
-                    # "TYPE:PAYLOAD" (npr "RFID:E20030..." ili "HEARTBEAT")
-                    
-                    self.process_message(ip, message_str)
+                    if protocol == PROTOCOL_BINARY:
+                        reply = self.process_frames(ip, items, listener)
+                        if reply:
+                            client_sock.sendall(reply)
+                    else:
+                        self.process_batch(ip, items, listener)
 
                 except ConnectionResetError:
                     break
@@ -109,6 +382,53 @@ class ForwarderIngressServer:
                     logger.error(f"Error handling client {ip}: {e}")
                     break
 
+        if conn_id:
+            self.capture.record_close(conn_id, ip, listener.port)
+
+    def _handle_status_connection(self, client_sock, ip):
+        """
+        Jeftina putanja za STATUS port: svaki primljeni chunk samo osvezava last_seen.
+        Nema parsiranja, baze ni App Context-a.
+        """
+        with client_sock:
+            while True:
+                try:
+                    data = client_sock.recv(RECV_BUFFER_SIZE)
+                    if not data:
+                        break
+                    self._handle_heartbeat(ip)
+                except ConnectionResetError:
+                    break
+                except Exception as e:
+                    logger.error(f"Error handling status client {ip}: {e}")
+                    break
+
+    def process_batch(self, ip, messages, listener=None):
+        """
+        Obradjuje sve kompletne poruke iz jednog citanja.
+        HEARTBEAT-ovi ne traze bazu; skenovi dele jedan App Context.
+        Na "typed" portu tip kredencijala dolazi iz porta, a payload je raw kod.
+        """
+        cred_type = listener.cred_type if listener else None
+        local_port = listener.port if listener else None
+
+        scans = []
+        for raw_message in messages:
+            if cred_type is None and self._is_heartbeat(raw_message):
+                self._handle_heartbeat(ip)
+            else:
+                scans.append(raw_message)
+
+        if not scans:
+            return
+
+        with self.app.app_context():
+            for raw_message in scans:
+                try:
+                    self._process_scan(ip, raw_message, cred_type, local_port)
+                except Exception as e:
+                    logger.error(f"Error processing message from {ip}: {e}")
+
     def process_message(self, ip, raw_message):
         """
         Glavna logika obrade poruke.
@@ -116,28 +436,53 @@ class ForwarderIngressServer:
         """
         
         # 1. HEARTBEAT (Tehnicki Event)
-        if "HEARTBEAT" in raw_message or "KeepAlive" in raw_message:
-            self.socketio.emit('device_status', {
-                'device_ip': ip,
-                'status': 'ONLINE',
-                'last_seen': datetime.now().isoformat()
-            })
+        if self._is_heartbeat(raw_message):
+            self._handle_heartbeat(ip)
             return
 
         # 2. POSLOVNA LOGIKA (Mora u App Context)
         with self.app.app_context():
-            # A. Identifikacija Gejta na osnovu IP-a
-            device = Device.query.filter_by(ip_address=ip).first()
-            
-            if not device:
-                logger.warning(f"Message from UNKNOWN device IP: {ip}")
-                return
+            self._process_scan(ip, raw_message)
 
-            gate_id = device.gate_id
-            
-            # B. Parsiranje Payloada
-            # Primer formata: "RFID:E2801160600002046654C463"
-            try:
+    @staticmethod
+    def _is_heartbeat(raw_message):
+        return raw_message.startswith(HEARTBEAT_PREFIXES)
+
+    def _handle_heartbeat(self, ip):
+        # Samo osvezava last_seen; event ide tek na promenu stanja
+        DEVICE_LIVENESS.touch(ip)
+
+    def _emit_device_status(self, ip, status, last_seen):
+        # Sweeper nema App Context - gejt uredjaja samo iz vec ucitane tabele rutiranja
+        route = DEVICE_ROUTES.lookup(ip) if DEVICE_ROUTES.is_loaded else None
+        DASHBOARD_STATE.update_device(ip, status, last_seen)
+        self._publish('device_status', {
+            'device_ip': ip,
+            'status': status,
+            'last_seen': last_seen
+        }, rooms_for(gates=(route.gate_id,) if route else ()))
+
+    def _publish(self, event, payload, rooms):
+        events = self.parking_logic.events
+        if events:
+            events.publish(event, payload, rooms)
+        else:
+            emit_to_rooms(self.socketio, event, payload, rooms)
+
+    def _process_scan(self, ip, raw_message, cred_type=None, local_port=None):
+        """
+        Obrada jednog tekstualnog skena. Ocekuje da je App Context vec aktivan
+        (potreban je samo ako tabela rutiranja jos nije ucitana).
+        """
+        timer = SCAN_LATENCY.start(PIPELINE_INGRESS)
+        # Parsiranje Payloada
+        # Primer formata: "RFID:E2801160600002046654C463"
+        # Typed port: tip znamo iz porta, ceo payload je vrednost (QR moze da sadrzi ':')
+        if cred_type:
+            return self._submit_scan(ip, cred_type, raw_message.strip(), local_port)
+
+        try:
+            with timer.stage("parse"):
                 if ":" in raw_message:
                     scan_type_str, scan_value = raw_message.split(":", 1)
                 else:
@@ -148,53 +493,131 @@ class ForwarderIngressServer:
                 scan_type_str = scan_type_str.upper().strip()
                 scan_value = scan_value.strip()
 
-                # Mapiranje stringa u Enum (Validacija unosa)
-                if scan_type_str not in ["RFID", "LPR", "QR", "PIN"]:
-                     # Ako hardver salje nesto cudno, ignorisi ili loguj kao gresku
-                     logger.warning(f"Unknown scan type: {scan_type_str}")
-                     return
+        except ValueError:
+            SCAN_LATENCY.finish(timer, None, ACK_OUTCOMES[ACK_INVALID_TYPE])
+            return ACK_INVALID_TYPE
 
-            except ValueError:
-                return
+        return self._submit_scan(ip, scan_type_str, scan_value, local_port)
 
-            # C. Pozivanje Logic Engine-a
+    def _submit_scan(self, ip, scan_type_str, scan_value, local_port=None):
+        """
+        Zajednicki deo za tekstualni i binarni protokol:
+        IP -> gejt, validacija tipa i prosledjivanje u red gejta. Vraca ACK_* status.
+        """
+        # Nastavlja tajmer iz _process_scan (faza "parse"); binarni put pocinje ovde
+        timer = SCAN_LATENCY.resume(PIPELINE_INGRESS)
+        gate_id = None
+        status = ACK_BUSY
+        try:
+            # A. Identifikacija Gejta na osnovu IP-a (in-memory tabela, bez DB upita)
+            with timer.stage("route"):
+                device = DEVICE_ROUTES.lookup(ip, local_port)
+            
+            if not device:
+                logger.warning(f"Message from UNKNOWN device IP: {ip}")
+                status = ACK_UNKNOWN_DEVICE
+                return status
+            gate_id = device.gate_id
+
+            # Svaki sken je i dokaz da je uredjaj ziv
+            DEVICE_LIVENESS.touch(ip)
+
+            # B. Mapiranje stringa u Enum (Validacija unosa)
+            if scan_type_str not in ["RFID", "LPR", "QR", "PIN"]:
+                 # Ako hardver salje nesto cudno, ignorisi ili loguj kao gresku
+                 logger.warning(f"Unknown scan type: {scan_type_str}")
+                 status = ACK_INVALID_TYPE
+                 return status
+
+            # C. Prosledjivanje u red gejta (odluku donosi worker iz pool-a)
+            with timer.stage("enqueue"):
+                accepted = self.dispatcher.submit(device.gate_id, ip, scan_type_str, scan_value)
+            status = ACK_ACCEPTED if accepted else ACK_BUSY
+            return status
+        finally:
+            SCAN_LATENCY.finish(timer, gate_id, ACK_OUTCOMES[status])
+
+    def process_frames(self, ip, frames, listener=None):
+        """
+        Obrada PKB1 binarnih frejmova. Vraca bajtove odgovora:
+        jedan ACK frejm (sequence, status) po SCAN_BATCH frejmu.
+        """
+        local_port = listener.port if listener else None
+        reply = []
+        scan_frames = []
+        for frame in frames:
+            if frame.frame_type == FRAME_HEARTBEAT:
+                self._handle_heartbeat(ip)
+            elif frame.frame_type == FRAME_SCAN_BATCH:
+                scan_frames.append(frame)
+
+        if not scan_frames:
+            return b""
+
+        with self.app.app_context():
+            for frame in scan_frames:
+                acks = []
+                for record in frame.records:
+                    if record.cred_type is None:
+                        status = ACK_INVALID_TYPE
+                    else:
+                        try:
+                            status = self._submit_scan(ip, record.cred_type, record.value, local_port)
+                        except Exception as e:
+                            logger.error(f"Error processing binary record from {ip}: {e}")
+                            status = ACK_BUSY
+                    acks.append((record.sequence, status))
+                reply.append(encode_ack(acks))
+        return b"".join(reply)
+
+    def _decide(self, gate_id, ip, scan_type_str, scan_value):
+        """Izvrsava se na dispatcher worker-u, po redosledu za dati gejt."""
+        with self.app.app_context():
+            # Pozivanje Logic Engine-a
             # Ovo vraca dict { "allow": bool, "reason": str ... }
             decision = self.parking_logic.handle_scan(gate_id, scan_type_str, scan_value)
             
-            # D. Reakcija (Feedback loop ka hardveru)
+            # Reakcija (Feedback loop ka hardveru)
             if decision.get("allow"):
-                logger.info(f" OPENING GATE {gate_id} for {scan_value}")
-                self.send_open_command(ip)
+                # Ishod skena je vec u "scan_decision" zapisu Logic Engine-a
+                logger.debug(f" OPENING GATE {gate_id} for {scan_value}")
+                self.command_outbox.enqueue(ip, CONTROLLER_PORT, gate_id=gate_id,
+                                            scan_log_id=decision.get("scan_log_id"),
+                                            scan_event_id=decision.get("scan_event_id"))
             else:
-                logger.info(f" ACCESS DENIED at {gate_id}: {decision.get('reason')}")
+                logger.debug(f" ACCESS DENIED at {gate_id}: {decision.get('reason')}")
                 # Opciono: Posalji poruku na displej rampe
                 # self.send_display_message(ip, "Access Denied")
 
-    def send_open_command(self, ip, port=5005):
+    def send_open_command(self, ip, port=CONTROLLER_PORT):
         """
         Šalje raw TCP signal kontroleru da otvori relej.
+        Ide preko trajne (tople) konekcije iz ControllerConnectionPool-a - bez connect-a po otvaranju.
         Vraća (success: bool, message: str)
         """
-        try:
-            logger.info(f"Connecting to hardware controller at {ip}:{port}...")
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(2.0) # Timeout 2 sekunde
-                s.connect((ip, port))
-                s.sendall(b"CMD:OPEN\n")
-                
-                # Čekamo potvrdu od hardvera (opciono, ali dobro za debug)
-                response = s.recv(1024).decode().strip()
-                logger.info(f"Hardware confirmed: {response}")
-                return True, response
-                
-        except ConnectionRefusedError:
-            err_msg = f"Connection Refused at {ip}:{port}. Is the device online?"
-            logger.error(err_msg)
-            return False, err_msg
-        except Exception as e:
-            err_msg = f"Socket Error: {str(e)}"
-            logger.error(err_msg)
-            return False, err_msg
+        return self.controller_pool.send_command(ip, port, b"CMD:OPEN\n")
+
+    def _record_command_result(self, command, status, message):
+        """Outbox callback: upisuje ishod CMD:OPEN u ScanLog red koji je odobrio prolaz."""
+        log_writer = self.parking_logic.log_writer
+        if log_writer and command.scan_event_id and not command.scan_log_id:
+            # Red je mozda jos u queue-u writer-a - ack ide istim putem, posle INSERT-a
+            log_writer.record_ack(command.scan_event_id, status, message, command.attempts)
+            return
+        if not command.scan_log_id:
+            return
+        with self.app.app_context():
+            try:
+                ScanLog.query.filter_by(id=command.scan_log_id).update({
+                    "hw_ack_status": status,
+                    "hw_ack_message": (message or "")[:255],
+                    "hw_ack_attempts": command.attempts,
+                    "hw_ack_at": datetime.now()
+                })
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to record HW ack for ScanLog {command.scan_log_id}: {e}")
 
     def open_gate_manual(self, gate_id):
         """
@@ -229,16 +652,26 @@ class ForwarderIngressServer:
                 db.session.add(new_log)
                 db.session.commit()
                 
+                DASHBOARD_STATE.add_log({
+                    "id": new_log.id,
+                    "scan_time": new_log.created_at.isoformat() if new_log.created_at else None,
+                    "gate_id": gate.id,
+                    "gate_name": gate.name,
+                    "status": "ALLOWED",
+                    "reason": "MANUAL_OPEN_DASHBOARD",
+                    "user": "Unknown",
+                })
+
                 # Emituj event da se Dashboard odmah osvježi (bez refresha stranice)
                 # Serijalizacija loga bi trebala biti u utils, ali ovdje cemo poslati osnovno
-                self.socketio.emit('access_log', {
+                self._publish('access_log', {
                     "id": new_log.id,
                     "gate_name": gate.name,
                     "scan_type": "PIN",
                     "payload": "MANUAL_OVERRIDE",
                     "allowed": True,
                     "timestamp": datetime.now().strftime("%H:%M:%S")
-                })
+                }, rooms_for(zones=(gate.zone_to_id, gate.zone_from_id), gates=(gate.id,)))
                 
                 return True, f"Gate opened via {device.ip_address}. HW: {message}"
             
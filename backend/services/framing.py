@@ -0,0 +1,104 @@
+import struct
+import logging
+from typing import List
+
+logger = logging.getLogger("forwarder")
+
+# Podrzani nacini uokviravanja poruka na TCP stream-u
+FRAMING_NEWLINE = "newline"   # "RFID:E2801160...\n"
+FRAMING_LENGTH = "length"     # 4 bajta big-endian duzina + payload
+
+LENGTH_HEADER = struct.Struct("!I")
+
+# Zastita od uredjaja koji salje smece bez delimitera
+MAX_FRAME_BYTES = 64 * 1024
+
+
+class StreamFramer:
+    """
+    Buffer koji od proizvoljnih TCP chunk-ova pravi cele poruke.
+    Jedan recv() moze da nosi vise skenova (TCP coalescing), a jedna poruka
+    moze da stigne u vise delova - framer vraca samo KOMPLETNE poruke.
+    """
+
+    def __init__(self, mode: str = FRAMING_NEWLINE, max_frame_bytes: int = MAX_FRAME_BYTES):
+        if mode not in (FRAMING_NEWLINE, FRAMING_LENGTH):
+            raise ValueError(f"Unknown framing mode: {mode}")
+        self.mode = mode
+        self.max_frame_bytes = max_frame_bytes
+        self._buffer = bytearray()
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._buffer)
+
+    def feed(self, data: bytes) -> List[str]:
+        """Dodaje bajtove u buffer i vraca sve kompletne poruke (dekodirane, bez praznih)."""
+        self._buffer += data
+        if self.mode == FRAMING_LENGTH:
+            frames = self._split_length_prefixed()
+        else:
+            frames = self._split_newline()
+        return self._decode(frames)
+
+    def flush(self) -> List[str]:
+        """
+        Poziva se kad uredjaj zatvori konekciju.
+        Stari firmware salje "TYPE:VALUE" bez '\\n' i odmah zatvara soket - to je i dalje jedna poruka.
+        """
+        tail = bytes(self._buffer)
+        self._buffer.clear()
+        if self.mode == FRAMING_LENGTH:
+            if tail:
+                logger.warning(f"Dropping {len(tail)} bytes of incomplete length-prefixed frame")
+            return []
+        return self._decode([tail])
+
+    def _split_newline(self) -> List[bytes]:
+        frames = []
+        start = 0
+        while True:
+            idx = self._buffer.find(b"\n", start)
+            if idx == -1:
+                break
+            frames.append(bytes(self._buffer[start:idx]))
+            start = idx + 1
+        if start:
+            del self._buffer[:start]
+
+        if len(self._buffer) > self.max_frame_bytes:
+            logger.warning(f"Frame exceeds {self.max_frame_bytes} bytes without delimiter, discarding buffer")
+            self._buffer.clear()
+        return frames
+
+    def _split_length_prefixed(self) -> List[bytes]:
+        frames = []
+        view = memoryview(self._buffer)
+        offset = 0
+        header_size = LENGTH_HEADER.size
+        try:
+            while len(view) - offset >= header_size:
+                (length,) = LENGTH_HEADER.unpack_from(view, offset)
+                if length > self.max_frame_bytes:
+                    logger.warning(f"Length-prefixed frame too large ({length} bytes), discarding buffer")
+                    offset = len(view)
+                    break
+                end = offset + header_size + length
+                if end > len(view):
+                    break
+                frames.append(bytes(view[offset + header_size:end]))
+                offset = end
+        finally:
+            view.release()
+        if offset:
+            del self._buffer[:offset]
+        return frames
+
+    @staticmethod
+    def _decode(frames: List[bytes]) -> List[str]:
+        messages = []
+        for frame in frames:
+            text = frame.decode("utf-8", errors="replace").strip()
+            if text:
+                messages.append(text)
+        return messages
@@ -0,0 +1,177 @@
+import threading
+import queue
+import time
+import logging
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from models import db
+
+logger = logging.getLogger("group_commit")
+
+DEFAULT_WINDOW_MS = 3.0
+DEFAULT_MAX_BATCH = 64
+DEFAULT_ACK_TIMEOUT = 5.0
+
+
+@dataclass
+class CommitUnit:
+    fn: Callable[[Any], Any]     # fn(session) -> rezultat (npr. ID upisanog ScanLog-a)
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class GroupCommitter:
+    """
+    Group commit za upise odluka.
+
+    Decision worker-i ne rade svoj commit, vec predaju "unit" (funkciju koja samo
+    dodaje/menja redove) i cekaju potvrdu. Jedan committer thread skuplja sve unit-e
+    koji stignu u prozoru od window_ms (ili do max_batch), izvrsi ih u JEDNOJ
+    transakciji i tek posle commit-a (durable) javi rezultat svakom pozivaocu.
+    Ako batch padne, unit-i se ponavljaju pojedinacno - los unit ne obara tudje skenove.
+    """
+
+    def __init__(self, app, window_ms: float = DEFAULT_WINDOW_MS, max_batch: int = DEFAULT_MAX_BATCH,
+                 ack_timeout: float = DEFAULT_ACK_TIMEOUT):
+        self.app = app
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.ack_timeout = ack_timeout
+
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._units = 0
+        self._fallbacks = 0
+        self._failed_units = 0
+        self._cancelled_units = 0
+        self._max_batch_seen = 0
+        self._commit_time_total = 0.0
+        self._ack_wait_total = 0.0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="group-commit")
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def submit(self, fn: Callable[[Any], Any]) -> Future:
+        unit = CommitUnit(fn)
+        self._queue.put(unit)
+        return unit.future
+
+    def execute(self, fn: Callable[[Any], Any]):
+        """
+        Predaje unit i blokira do durable commit-a. Vraca rezultat fn-a ili baca njegov izuzetak.
+        TimeoutError znaci da unit NIJE upisan i nikad nece biti (otkazan je dok je cekao u redu),
+        pa pozivalac sme da vrati brojace. Unit koji je vec usao u transakciju se ne otkazuje -
+        ceka se ishod tog commit-a.
+        """
+        future = self.submit(fn)
+        try:
+            return future.result(timeout=self.ack_timeout)
+        except FutureTimeout:
+            if future.cancel():
+                with self._stats_lock:
+                    self._cancelled_units += 1
+                raise
+            return future.result()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "window_ms": round(self.window * 1000, 2),
+                "max_batch": self.max_batch,
+                "pending": self._queue.qsize(),
+                "batches": self._batches,
+                "units": self._units,
+                "avg_batch_size": round(self._units / self._batches, 2) if self._batches else 0.0,
+                "max_batch_seen": self._max_batch_seen,
+                "fallbacks": self._fallbacks,
+                "failed_units": self._failed_units,
+                "cancelled_units": self._cancelled_units,
+                "avg_commit_ms": round(self._commit_time_total / self._batches * 1000, 2) if self._batches else 0.0,
+                "avg_ack_wait_ms": round(self._ack_wait_total / self._units * 1000, 2) if self._units else 0.0,
+            }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                logger.error(f"Group commit crashed: {e}")
+                for unit in batch:
+                    if not unit.future.done():
+                        unit.future.set_exception(e)
+
+    def _commit_batch(self, batch):
+        # Otkazani unit-i (pozivalac je odustao posle ack_timeout-a) se preskacu;
+        # ostali prelaze u RUNNING i od tog trenutka ne mogu da se otkazu
+        batch = [unit for unit in batch if unit.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.monotonic()
+        with self.app.app_context():
+            session = db.session
+            try:
+                results = [unit.fn(session) for unit in batch]
+                session.commit()
+                outcomes = [(unit, result, None) for unit, result in zip(batch, results)]
+            except Exception as e:
+                session.rollback()
+                logger.warning(f"Group commit of {len(batch)} units failed ({e}), retrying one by one")
+                with self._stats_lock:
+                    self._fallbacks += 1
+                outcomes = [self._commit_single(session, unit) for unit in batch]
+
+        finished = time.monotonic()
+        with self._stats_lock:
+            self._batches += 1
+            self._units += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._commit_time_total += finished - started
+            self._ack_wait_total += sum(finished - unit.submitted_at for unit in batch)
+            self._failed_units += sum(1 for _, _, error in outcomes if error is not None)
+
+        for unit, result, error in outcomes:
+            if error is not None:
+                unit.future.set_exception(error)
+            else:
+                unit.future.set_result(result)
+
+    @staticmethod
+    def _commit_single(session, unit):
+        try:
+            result = unit.fn(session)
+            session.commit()
+            return unit, result, None
+        except Exception as e:
+            session.rollback()
+            return unit, None, e
@@ -0,0 +1,193 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+PIPELINE_INGRESS = "ingress"      # connection thread: parsiranje, rutiranje, upis u red gejta
+PIPELINE_DECISION = "decision"    # dispatcher worker: handle_scan
+STAGE_TOTAL = "total"
+
+# Log-skala: od 1us do ~2 min, svaka granica 20% veca (greska percentila <= 20%)
+_BUCKET_GROWTH = 1.2
+_BUCKET_BOUNDS = []
+_bound = 1e-6
+while _bound < 120.0:
+    _BUCKET_BOUNDS.append(_bound)
+    _bound *= _BUCKET_GROWTH
+_BUCKET_BOUNDS = tuple(_BUCKET_BOUNDS)
+
+
+class LatencyHistogram:
+    """Histogram sa fiksnim log bucket-ima: O(log n) upis, spajanje sabiranjem bucket-a."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> float:
+        """Gornja granica bucket-a u kome je p-ti percentil (ne veca od izmerenog maksimuma)."""
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                bound = _BUCKET_BOUNDS[i] if i < len(_BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class ScanTimer:
+    """Merenje jednog skena: zbir vremena po fazi (faza moze da se ponovi, npr. _log_scan)."""
+
+    __slots__ = ("pipeline", "started", "stages")
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def stage(self, name: str) -> "_Stage":
+        return _Stage(self, name)
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "started")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timer is not None:
+            self.timer.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    """Kad merenje nije pokrenuto (npr. direktan poziv iz testa) - sve je no-op."""
+
+    __slots__ = ()
+
+    def add(self, stage, seconds):
+        pass
+
+    def stage(self, name):
+        return _Stage(None, name)
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class LatencyRegistry:
+    """
+    Histogrami latencije po (pipeline, faza, gejt, ishod).
+
+    Tajmer skena je thread-local (odluka se izvrsava na jednom worker-u od pocetka
+    do kraja), pa pomocne metode mere svoju fazu bez prosledjivanja tajmera.
+    Na kraju skena sve faze se upisuju jednim uzimanjem lock-a.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str, Optional[int], str], LatencyHistogram] = {}
+        self._local = threading.local()
+        self._since = time.time()
+
+    def start(self, pipeline: str) -> ScanTimer:
+        timer = ScanTimer(pipeline)
+        self._local.timer = timer
+        return timer
+
+    def current(self):
+        return getattr(self._local, "timer", None) or _NULL_TIMER
+
+    def resume(self, pipeline: str) -> ScanTimer:
+        """Tajmer koji je na ovom thread-u vec pokrenut za isti pipeline, ili novi."""
+        timer = getattr(self._local, "timer", None)
+        if timer is not None and timer.pipeline == pipeline:
+            return timer
+        return self.start(pipeline)
+
+    def finish(self, timer: ScanTimer, gate_id: Optional[int], outcome: str):
+        total = time.perf_counter() - timer.started
+        if getattr(self._local, "timer", None) is timer:
+            self._local.timer = None
+        with self._lock:
+            for stage, seconds in timer.stages.items():
+                self._histogram(timer.pipeline, stage, gate_id, outcome).record(seconds)
+            self._histogram(timer.pipeline, STAGE_TOTAL, gate_id, outcome).record(total)
+
+    def _histogram(self, pipeline, stage, gate_id, outcome) -> LatencyHistogram:
+        key = (pipeline, stage, gate_id, outcome)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram()
+        return histogram
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._since = time.time()
+
+    def snapshot(self, gate_id: Optional[int] = None, outcome: Optional[str] = None) -> dict:
+        """
+        {pipeline: {"stages": {faza: p50/p95/p99...},
+                    "by_gate": {gejt: {ishod: {faza: ...}}}}}
+        "stages" je zbir preko svih gejtova/ishoda (posle filtera).
+        """
+        with self._lock:
+            items = [(key, h) for key, h in self._histograms.items()
+                     if (gate_id is None or key[2] == gate_id) and (outcome is None or key[3] == outcome)]
+            merged = {}
+            result = {}
+            for (pipeline, stage, gate, out), histogram in items:
+                combined = merged.setdefault((pipeline, stage), LatencyHistogram())
+                combined.merge(histogram)
+                by_gate = result.setdefault(pipeline, {"stages": {}, "by_gate": {}})["by_gate"]
+                by_gate.setdefault(str(gate), {}).setdefault(out, {})[stage] = histogram.summary()
+            for (pipeline, stage), histogram in merged.items():
+                result[pipeline]["stages"][stage] = histogram.summary()
+            since = self._since
+        return {"since": since, "pipelines": result}
+
+
+# Globalna instanca (forwarder i Logic Engine upisuju, /api/system/latency cita)
+SCAN_LATENCY = LatencyRegistry()
@@ -0,0 +1,111 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+DEFAULT_STRIPES = 64
+
+KEY_ZONE = "zone"
+KEY_USER = "user"
+
+
+class _WaitStats:
+    __slots__ = ("acquisitions", "contended", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def add(self, waited: Optional[float]):
+        self.acquisitions += 1
+        if waited is not None:
+            self.contended += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def as_dict(self) -> dict:
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "avg_wait_ms": round(self.wait_total / self.contended * 1000, 3) if self.contended else 0.0,
+            "max_wait_ms": round(self.wait_max * 1000, 3),
+            "wait_ms_total": round(self.wait_total * 1000, 3),
+        }
+
+
+class StripedLockManager:
+    """
+    In-process lock-ovi za kriticne sekcije odluke, po zoni i po korisniku.
+
+    Kljuc (npr. ("zone", 3)) se mapira na jedan od N stripe lock-ova, pa nepovezane
+    zone rade paralelno, a skenovi koji se takmice za istu zonu se serijalizuju.
+    Za razliku od SELECT ... FOR UPDATE radi isto na SQLite-u i PostgreSQL-u
+    (u okviru jednog procesa). Stripe-ovi se uzimaju sortirano - nema deadlock-a.
+    Vreme cekanja se meri po zoni (da se vidi contention na root zoni) i ukupno za korisnike.
+    """
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self.stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._stats_lock = threading.Lock()
+        self._zone_stats = {}           # zone_id -> _WaitStats
+        self._user_stats = _WaitStats()  # korisnika ima previse za statistiku po kljucu
+
+    def stripe_for(self, key) -> int:
+        return hash(key) % self.stripes
+
+    @contextmanager
+    def hold(self, zones: Iterable[Optional[int]] = (), users: Iterable[Optional[int]] = ()):
+        """Drzi lock-ove za sve zadate zone i korisnike (None se preskace)."""
+        keys = [(KEY_ZONE, z) for z in zones if z is not None] + [(KEY_USER, u) for u in users if u is not None]
+        # Stripe -> prvi kljuc koji ga trazi (njemu se pripisuje cekanje)
+        by_stripe = {}
+        for key in keys:
+            by_stripe.setdefault(self.stripe_for(key), key)
+
+        acquired = []
+        waits = []
+        try:
+            for stripe in sorted(by_stripe):
+                lock = self._locks[stripe]
+                waited = None
+                if not lock.acquire(blocking=False):
+                    started = time.perf_counter()
+                    lock.acquire()
+                    waited = time.perf_counter() - started
+                acquired.append(lock)
+                waits.append((by_stripe[stripe], waited))
+            self._record(waits)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def _record(self, waits):
+        with self._stats_lock:
+            for (kind, key_id), waited in waits:
+                if kind == KEY_ZONE:
+                    stats = self._zone_stats.get(key_id)
+                    if stats is None:
+                        stats = self._zone_stats[key_id] = _WaitStats()
+                    stats.add(waited)
+                else:
+                    self._user_stats.add(waited)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._zone_stats = {}
+            self._user_stats = _WaitStats()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "stripes": self.stripes,
+                "zones": {zone_id: s.as_dict() for zone_id, s in sorted(self._zone_stats.items())},
+                "users": self._user_stats.as_dict(),
+            }
+
+
+SCAN_LOCKS = StripedLockManager()
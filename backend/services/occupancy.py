@@ -0,0 +1,434 @@
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import bindparam, func
+
+from models import db, Zone, Tenant, User, Gate, ParkingSession
+
+logger = logging.getLogger("occupancy")
+
+FLUSH_INTERVAL_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class OccupancyChange:
+    """Tacno primenjene promene (potrebne za revert ako DB transakcija padne)."""
+    zone_deltas: Tuple[Tuple[int, int], ...] = ()   # (zone_id, +1/-1) za svaku zonu na putanji
+    own_deltas: Tuple[Tuple[int, int], ...] = ()    # (zone_id, +1/-1) samo za ciljnu/izvornu zonu
+    tenant_id: Optional[int] = None
+    tenant_delta: int = 0
+
+    @property
+    def zone_ids(self) -> Tuple[int, ...]:
+        return tuple(zone_id for zone_id, _ in self.zone_deltas)
+
+
+class OccupancyEngine:
+    """
+    In-memory brojaci popunjenosti zona i Tenant.current_usage.
+
+    - admit() je atomski check-and-increment pod jednim lock-om: kapacitet vise ne
+      zahteva SELECT ... FOR UPDATE nad zonom (koji na SQLite-u ionako ne radi).
+    - Brojaci su zbirni po stablu zona: vozilo u "VIP & Directors" se broji i u svim
+      precima. Putanja do korena je unapred izracunata, pa ulaz/izlaz/tranzit menjaju
+      sve pretke u jednom prolazu, a kapacitet se proverava na celoj putanji.
+    - Promene se upisuju u bazu u batch-evima (write-behind) iz flusher thread-a.
+      Zone.occupancy u bazi ostaje broj vozila bas u toj zoni (isto kao u DB modu);
+      zbir po stablu postoji samo u memoriji.
+    - Na startu (recover) brojaci se racunaju iz aktivnih ParkingSession redova.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self.app = None
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()   # lazy recover sa vise gejtova istovremeno
+        self._zone_occupancy = {}     # zone_id -> int (zbir: zona + sve podzone)
+        self._zone_own = {}           # zone_id -> int (vozila cija je trenutna zona bas ova - ide u bazu)
+        self._zone_capacity = {}      # zone_id -> int
+        self._tenant_usage = {}       # tenant_id -> int
+        self._tenant_quota = {}       # tenant_id -> int
+        self._zone_parent = {}        # zone_id -> parent_zone_id
+        self._zone_name = {}          # zone_id -> ime (za occupancy_update evente)
+        self._zone_path = {}          # zone_id -> (zone_id, roditelj, ..., koren)
+        self._dirty_zones = set()
+        self._dirty_tenants = set()
+        self._loaded = False
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self._admitted = 0
+        self._rejected = 0
+        self._reverted = 0
+        self._flushes = 0
+        self._flush_errors = 0
+        self._last_flush_ms = None
+        self._last_flush_rows = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    # --- Zivotni ciklus ---
+
+    def start(self, app):
+        """Recover + flusher thread. Poziva Forwarder pri startu."""
+        self.app = app
+        with app.app_context():
+            self.recover()
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="occupancy-flusher")
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.flush()
+
+    def ensure_loaded(self):
+        """
+        Recover pre prvog skena ako engine nije startovan (start() to radi pri startu).
+        Tacno jednom: gejtovi koji istovremeno dobiju prvi sken cekaju isti recover,
+        umesto da kasniji pregazi brojace koje je raniji vec primio. Mora u App Context-u.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.recover()
+
+    def recover(self):
+        """
+        Gradi brojace iz baze: kapaciteti/kvote iz Zone/Tenant, a popunjenost iz
+        aktivnih sesija (sesija = jedno vozilo unutra). Mora u App Context-u.
+        Oporavljene vrednosti se odmah oznacavaju za upis (ispravlja zaostali drift).
+        """
+        zones = db.session.query(Zone.id, Zone.capacity, Zone.parent_zone_id, Zone.name).all()
+        capacities = {z_id: cap or 0 for z_id, cap, _, _ in zones}
+        parents = {z_id: parent_id for z_id, _, parent_id, _ in zones}
+        names = {z_id: name for z_id, _, _, name in zones}
+        paths = self._build_paths(parents)
+        quotas = {t_id: quota or 0 for t_id, quota in db.session.query(Tenant.id, Tenant.quota_limit).all()}
+
+        # Sesija se broji u svojoj zoni i u svim precima
+        occupancy = dict.fromkeys(capacities, 0)
+        own = dict.fromkeys(capacities, 0)
+        for zone_id, count in self._active_sessions_by_zone():
+            if zone_id in own:
+                own[zone_id] += count
+            for path_zone_id in paths.get(zone_id, ()):
+                occupancy[path_zone_id] += count
+
+        usage = dict.fromkeys(quotas, 0)
+        tenant_rows = db.session.query(User.tenant_id, func.count(ParkingSession.id)) \
+            .join(ParkingSession, ParkingSession.user_id == User.id) \
+            .filter(ParkingSession.exit_time.is_(None), User.tenant_id.isnot(None)) \
+            .group_by(User.tenant_id).all()
+        for tenant_id, count in tenant_rows:
+            if tenant_id in usage:
+                usage[tenant_id] = count
+
+        with self._lock:
+            self._zone_capacity = capacities
+            self._zone_parent = parents
+            self._zone_name = names
+            self._zone_path = paths
+            self._zone_occupancy = occupancy
+            self._zone_own = own
+            self._tenant_quota = quotas
+            self._tenant_usage = usage
+            self._dirty_zones = set(own)
+            self._dirty_tenants = set(usage)
+            self._loaded = True
+        logger.info(f"Occupancy recovered from sessions: {sum(own.values())} vehicles in {len(own)} zones")
+
+    @staticmethod
+    def _active_sessions_by_zone():
+        # Trenutna zona sesije; stare sesije bez zone_id se broje u ciljnoj zoni ulaznog gejta
+        zone_id = func.coalesce(ParkingSession.zone_id, Gate.zone_to_id)
+        return db.session.query(zone_id, func.count(ParkingSession.id)) \
+            .outerjoin(Gate, ParkingSession.entry_gate_id == Gate.id) \
+            .filter(ParkingSession.exit_time.is_(None)) \
+            .group_by(zone_id).all()
+
+    @staticmethod
+    def _build_paths(parents: dict) -> dict:
+        """zone_id -> putanja do korena (zona pa preci). Ciklus u podacima prekida putanju."""
+        paths = {}
+        for zone_id in parents:
+            path = [zone_id]
+            parent_id = parents.get(zone_id)
+            while parent_id is not None and parent_id in parents and parent_id not in path:
+                path.append(parent_id)
+                parent_id = parents.get(parent_id)
+            paths[zone_id] = tuple(path)
+        return paths
+
+    def reload_limits(self):
+        """
+        Osvezava kapacitete, kvote i stablo zona posle izmena zona (CRUD rute). Mora u App Context-u.
+        Promena roditelja menja zbirove - tada se brojaci ponovo racunaju iz sesija (recover).
+        """
+        if not self._loaded:
+            return
+        zones = db.session.query(Zone.id, Zone.capacity, Zone.parent_zone_id, Zone.name).all()
+        parents = {z_id: parent_id for z_id, _, parent_id, _ in zones}
+        if parents != {z_id: p for z_id, p in self._zone_parent.items() if z_id in parents}:
+            self.recover()
+            return
+        capacities = {z_id: cap or 0 for z_id, cap, _, _ in zones}
+        quotas = {t_id: quota or 0 for t_id, quota in db.session.query(Tenant.id, Tenant.quota_limit).all()}
+        with self._lock:
+            self._zone_capacity = capacities
+            self._zone_parent = parents
+            self._zone_name = {z_id: name for z_id, _, _, name in zones}
+            self._zone_path = self._build_paths(parents)
+            self._tenant_quota = quotas
+            for zone_id in capacities:
+                self._zone_occupancy.setdefault(zone_id, 0)
+                self._zone_own.setdefault(zone_id, 0)
+            for zone_id in list(self._zone_occupancy):
+                if zone_id not in capacities:
+                    del self._zone_occupancy[zone_id]
+                    self._zone_own.pop(zone_id, None)
+                    self._dirty_zones.discard(zone_id)
+            for tenant_id in quotas:
+                self._tenant_usage.setdefault(tenant_id, 0)
+
+    def track_zone(self, zone):
+        """Zona kreirana posle recover-a: uvodi je sa vrednostima iz baze."""
+        if zone.id in self._zone_capacity:
+            return
+        with self._lock:
+            self._zone_capacity.setdefault(zone.id, zone.capacity or 0)
+            # Nova zona nema podzone, pa su zbir i vrednost iz baze isti
+            self._zone_occupancy.setdefault(zone.id, zone.occupancy or 0)
+            self._zone_own.setdefault(zone.id, zone.occupancy or 0)
+            self._zone_parent.setdefault(zone.id, getattr(zone, "parent_zone_id", None))
+            self._zone_name.setdefault(zone.id, getattr(zone, "name", None))
+            # Nova zona nema potomke, pa se menja samo njena putanja
+            self._zone_path[zone.id] = self._build_paths(self._zone_parent)[zone.id]
+
+    def track_tenant(self, tenant_id: int):
+        """Tenant kreiran posle recover-a (kvota se cita jednom iz baze). Mora u App Context-u."""
+        if tenant_id in self._tenant_quota:
+            return
+        tenant = db.session.get(Tenant, tenant_id)
+        with self._lock:
+            self._tenant_quota.setdefault(tenant_id, tenant.quota_limit if tenant else 0)
+            self._tenant_usage.setdefault(tenant_id, tenant.current_usage if tenant else 0)
+
+    # --- Citanje ---
+
+    def zone_counters(self, zone_id: int) -> Tuple[int, int]:
+        """(occupancy, capacity)"""
+        return self._zone_occupancy.get(zone_id, 0), self._zone_capacity.get(zone_id, 0)
+
+    def tenant_counters(self, tenant_id: int) -> Tuple[int, int]:
+        """(current_usage, quota_limit)"""
+        return self._tenant_usage.get(tenant_id, 0), self._tenant_quota.get(tenant_id, 0)
+
+    def zone_name(self, zone_id: int) -> Optional[str]:
+        return self._zone_name.get(zone_id)
+
+    def zone_path(self, zone_id: Optional[int]) -> Tuple[int, ...]:
+        """(zona, roditelj, ..., koren); zona koju engine ne zna je sama svoja putanja."""
+        if zone_id is None:
+            return ()
+        return self._zone_path.get(zone_id, (zone_id,))
+
+    def _path_change(self, target_zone_id: Optional[int], source_zone_id: Optional[int]):
+        """(zone u koje se ulazi, zone koje se napustaju) - zajednicki preci se ne menjaju."""
+        target_path = self.zone_path(target_zone_id)
+        source_path = self.zone_path(source_zone_id)
+        entered = tuple(z for z in target_path if z not in source_path)
+        left = tuple(z for z in source_path if z not in target_path)
+        return entered, left
+
+    def first_full_zone(self, target_zone_id: Optional[int], source_zone_id: Optional[int] = None) -> Optional[int]:
+        """Prva zona na putanji (od cilja ka korenu) koja nema mesta za jos jedno vozilo."""
+        entered, _ = self._path_change(target_zone_id, source_zone_id)
+        for zone_id in entered:
+            if self._zone_occupancy.get(zone_id, 0) >= self._zone_capacity.get(zone_id, 0):
+                return zone_id
+        return None
+
+    def zone_occupancy(self, zone_id: int, default: int = 0) -> int:
+        """Za API: vrednost iz memorije ako je engine aktivan, inace ono sto je u bazi."""
+        if not self._loaded:
+            return default
+        return self._zone_occupancy.get(zone_id, default)
+
+    # --- Atomske promene ---
+
+    def admit(self, target_zone_id: Optional[int], source_zone_id: Optional[int], tenant_id: Optional[int],
+              check_zone: bool = True, check_tenant: bool = True) -> Tuple[bool, str, Optional[OccupancyChange]]:
+        """
+        Atomski: proveri kapacitet svih zona u koje se ulazi (cilj i preci koji nisu
+        zajednicki sa izvorom) i kvotu tenanta, pa primeni +1/-1 duz obe putanje.
+        Vraca (ok, reason, change); change se prosledjuje revert()-u ako commit sesije padne.
+        """
+        with self._lock:
+            entered, left = self._path_change(target_zone_id, source_zone_id)
+            if target_zone_id is not None:
+                if check_zone:
+                    for zone_id in entered:
+                        if self._zone_occupancy.get(zone_id, 0) >= self._zone_capacity.get(zone_id, 0):
+                            self._rejected += 1
+                            return False, "ZONE_FULL", None
+                if tenant_id is not None and check_tenant:
+                    if self._tenant_usage.get(tenant_id, 0) >= self._tenant_quota.get(tenant_id, 0):
+                        self._rejected += 1
+                        return False, "TENANT_QUOTA_EXCEEDED", None
+
+            change = self._apply(entered, left, target_zone_id, source_zone_id, tenant_id)
+            self._admitted += 1
+
+        return True, "OK", change
+
+    def release(self, zone_id: Optional[int], tenant_id: Optional[int]) -> OccupancyChange:
+        """
+        Vozilo napusta zonu bez skena (npr. brisanje korisnika koji je unutra):
+        isto kao izlaz, -1 duz putanje zone i za tenanta, pod istim lock-om kao admit().
+        """
+        with self._lock:
+            entered, left = self._path_change(None, zone_id)
+            return self._apply(entered, left, None, zone_id, tenant_id)
+
+    def _apply(self, entered, left, target_zone_id, source_zone_id, tenant_id) -> OccupancyChange:
+        """Primenjuje +1/-1 duz obe putanje. Poziva se pod self._lock."""
+        zone_deltas = []
+        own_deltas = []
+        tenant_delta = 0
+
+        # A. ULAZ U ZONU (i u pretke u kojima vozilo do sada nije bilo)
+        for zone_id in entered:
+            self._zone_occupancy[zone_id] = self._zone_occupancy.get(zone_id, 0) + 1
+            zone_deltas.append((zone_id, 1))
+        if target_zone_id is not None and tenant_id is not None:
+            self._tenant_usage[tenant_id] = self._tenant_usage.get(tenant_id, 0) + 1
+            tenant_delta += 1
+
+        # B. IZLAZ IZ ZONE (i iz predaka koji nisu na putanji cilja)
+        for zone_id in left:
+            if self._zone_occupancy.get(zone_id, 0) > 0:
+                self._zone_occupancy[zone_id] -= 1
+                zone_deltas.append((zone_id, -1))
+        if source_zone_id is not None and tenant_id is not None and self._tenant_usage.get(tenant_id, 0) > 0:
+            self._tenant_usage[tenant_id] -= 1
+            tenant_delta -= 1
+
+        # Baza: vozilo prelazi iz izvorne u ciljnu zonu (preci se ne upisuju)
+        if target_zone_id is not None:
+            self._zone_own[target_zone_id] = self._zone_own.get(target_zone_id, 0) + 1
+            own_deltas.append((target_zone_id, 1))
+        if source_zone_id is not None and self._zone_own.get(source_zone_id, 0) > 0:
+            self._zone_own[source_zone_id] -= 1
+            own_deltas.append((source_zone_id, -1))
+
+        self._dirty_zones.update(zone_id for zone_id, _ in own_deltas)
+        if tenant_delta and tenant_id is not None:
+            self._dirty_tenants.add(tenant_id)
+        return OccupancyChange(tuple(zone_deltas), tuple(own_deltas), tenant_id, tenant_delta)
+
+    def revert(self, change: OccupancyChange):
+        with self._lock:
+            for zone_id, delta in change.zone_deltas:
+                self._zone_occupancy[zone_id] -= delta
+            for zone_id, delta in change.own_deltas:
+                self._zone_own[zone_id] -= delta
+                self._dirty_zones.add(zone_id)
+            if change.tenant_delta:
+                self._tenant_usage[change.tenant_id] -= change.tenant_delta
+                self._dirty_tenants.add(change.tenant_id)
+            self._reverted += 1
+
+    # --- Write-behind ---
+
+    def flush(self) -> int:
+        """Upisuje promenjene brojace u bazu jednim executemany po tabeli. Vraca broj redova."""
+        if self.app is None:
+            return 0
+        with self._lock:
+            zones = [{"z_id": z_id, "z_occ": self._zone_own[z_id]}
+                     for z_id in self._dirty_zones if z_id in self._zone_own]
+            tenants = [{"t_id": t_id, "t_usage": self._tenant_usage[t_id]}
+                       for t_id in self._dirty_tenants if t_id in self._tenant_usage]
+            self._dirty_zones = set()
+            self._dirty_tenants = set()
+
+        if not zones and not tenants:
+            return 0
+
+        started = time.monotonic()
+        try:
+            with self.app.app_context():
+                if zones:
+                    db.session.execute(
+                        Zone.__table__.update().where(Zone.__table__.c.id == bindparam("z_id"))
+                        .values(occupancy=bindparam("z_occ")), zones)
+                if tenants:
+                    db.session.execute(
+                        Tenant.__table__.update().where(Tenant.__table__.c.id == bindparam("t_id"))
+                        .values(current_usage=bindparam("t_usage")), tenants)
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"Occupancy flush failed, will retry: {e}")
+            with self._lock:
+                self._dirty_zones.update(row["z_id"] for row in zones)
+                self._dirty_tenants.update(row["t_id"] for row in tenants)
+                self._flush_errors += 1
+            return 0
+
+        with self._lock:
+            self._flushes += 1
+            self._last_flush_ms = round((time.monotonic() - started) * 1000, 2)
+            self._last_flush_rows = len(zones) + len(tenants)
+        return len(zones) + len(tenants)
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def reset(self):
+        with self._lock:
+            self._zone_occupancy.clear()
+            self._zone_own.clear()
+            self._zone_capacity.clear()
+            self._tenant_usage.clear()
+            self._tenant_quota.clear()
+            self._zone_parent.clear()
+            self._zone_name.clear()
+            self._zone_path.clear()
+            self._dirty_zones.clear()
+            self._dirty_tenants.clear()
+            self._loaded = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "zones": len(self._zone_occupancy),
+                "vehicles_inside": sum(self._zone_own.values()),
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "reverted": self._reverted,
+                "dirty_zones": len(self._dirty_zones),
+                "dirty_tenants": len(self._dirty_tenants),
+                "flushes": self._flushes,
+                "flush_errors": self._flush_errors,
+                "last_flush_ms": self._last_flush_ms,
+                "last_flush_rows": self._last_flush_rows,
+            }
+
+
+# Globalna instanca (Logic Engine menja, API rute citaju)
+OCCUPANCY = OccupancyEngine()
@@ -0,0 +1,130 @@
+import threading
+import time
+import logging
+from typing import Callable, Optional, Tuple
+
+from services.realtime_rooms import emit_to_rooms, zone_room
+
+logger = logging.getLogger("occupancy_broadcaster")
+
+DEFAULT_TICK_MS = 250.0
+
+EVENT_OCCUPANCY_BATCH = "occupancy_batch"
+
+
+def occupancy_payload(zone_id, zone_name, occupancy, capacity) -> dict:
+    return {
+        "zone_id": zone_id,
+        "zone_name": zone_name,
+        "current": occupancy,
+        "capacity": capacity,
+        "percent": round((occupancy / capacity * 100), 1) if capacity > 0 else 0
+    }
+
+
+class OccupancyBroadcaster:
+    """
+    Koalescirano slanje popunjenosti zona ka dashboard-ima.
+
+    Decision thread samo upise poslednje stanje zone u "dirty" mapu (O(1), bez
+    serijalizacije i bez Socket.IO poziva). Jednom po tick-u pozadinski thread
+    zameni mapu praznom i posalje JEDAN occupancy_batch event sa poslednjom
+    vrednoscu svake promenjene zone - medjuvrednosti sa guzve na izlazu se gube.
+    """
+
+    def __init__(self, socketio, tick_ms: float = DEFAULT_TICK_MS,
+                 zone_path: Optional[Callable[[int], Tuple[int, ...]]] = None, events=None):
+        self.socketio = socketio
+        self.tick = tick_ms / 1000.0
+        # zona -> (zona, roditelj, ..., koren): pretplatnik nadzone vidi i podzone
+        self.zone_path = zone_path
+        # RealtimeEventBus: batch-eve salje isti emiter thread kao i ostale evente
+        self.events = events
+
+        self._lock = threading.Lock()
+        self._dirty = {}              # zone_id -> (ime, popunjenost, kapacitet)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._seq = 0
+
+        self._marks = 0
+        self._batches = 0
+        self._zones_sent = 0
+        self._max_batch_seen = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="occupancy-broadcast")
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        # Poslednje stanje ne sme da ostane neposlato
+        self.flush()
+
+    def mark(self, zone_id, zone_name, occupancy, capacity):
+        """Belezi najnovije stanje zone; salje se na sledecem tick-u."""
+        with self._lock:
+            self._dirty[zone_id] = (zone_name, occupancy, capacity)
+            self._marks += 1
+
+    def flush(self) -> int:
+        """
+        Salje sve prljave zone: ceo batch u sobu "all", a svakoj zone sobi
+        (sa pretplatnicima) batch samo sa njenim zonama. Vraca broj poslatih zona.
+        """
+        with self._lock:
+            if not self._dirty:
+                return 0
+            dirty, self._dirty = self._dirty, {}
+            self._seq += 1
+            seq = self._seq
+
+        payloads = {zone_id: occupancy_payload(zone_id, *state) for zone_id, state in dirty.items()}
+        self._send({"seq": seq, "zones": list(payloads.values())}, (), include_all=True)
+
+        by_room = {}
+        for zone_id, payload in payloads.items():
+            for path_zone in (self.zone_path(zone_id) if self.zone_path else (zone_id,)):
+                by_room.setdefault(zone_room(path_zone), []).append(payload)
+        for room, zones in by_room.items():
+            self._send({"seq": seq, "zones": zones}, (room,), include_all=False)
+
+        with self._lock:
+            self._batches += 1
+            self._zones_sent += len(dirty)
+            self._max_batch_seen = max(self._max_batch_seen, len(dirty))
+        return len(dirty)
+
+    def _send(self, batch, rooms, include_all):
+        if self.events:
+            self.events.publish(EVENT_OCCUPANCY_BATCH, batch, rooms, include_all=include_all)
+        else:
+            emit_to_rooms(self.socketio, EVENT_OCCUPANCY_BATCH, batch, rooms, include_all=include_all)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tick_ms": round(self.tick * 1000, 2),
+                "pending_zones": len(self._dirty),
+                "marks": self._marks,
+                "batches": self._batches,
+                "zones_sent": self._zones_sent,
+                # Koliko je update-a ustedjeno spajanjem u odnosu na emit po skenu
+                "coalesced": self._marks - self._zones_sent - len(self._dirty),
+                "max_batch_seen": self._max_batch_seen,
+            }
+
+    def _run(self):
+        next_tick = time.monotonic() + self.tick
+        while not self._stop_event.wait(max(0.0, next_tick - time.monotonic())):
+            # Posle zastoja ne sustizemo propustene tick-ove (ionako salju samo poslednje stanje)
+            next_tick = max(next_tick + self.tick, time.monotonic())
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Occupancy broadcaster tick failed: {e}")
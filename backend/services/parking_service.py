@@ -1,16 +1,31 @@
 from __future__ import annotations
+import time
+import logging
+import uuid
 from datetime import datetime
-from sqlalchemy import or_
 from sqlalchemy.orm import joinedload
-from typing import List, Tuple, Optional
+from typing import Tuple, Optional
 from flask_socketio import SocketIO
 from models import (
-    db, User, Credential, Gate, Zone, ParkingSession, 
-    ValidationRule, RuleType, RuleScope, ScanLog, Tenant, CredentialType
+    db, Credential, Gate, Zone, ParkingSession, 
+    RuleType, RuleScope, ScanLog, Tenant, CredentialType
 )
-
-SCAN_CACHE = {}
-CACHE_TIMEOUT_SECONDS = 20
+from services.debounce import SCAN_DEBOUNCE
+from services.credential_cache import CREDENTIAL_CACHE, CredentialSnapshot, UserSnapshot
+from services.rule_index import RULE_INDEX, CompiledRule
+from services.occupancy import OccupancyEngine
+from services.group_commit import GroupCommitter
+from services.scan_log_writer import ScanLogWriter
+from services.latency import SCAN_LATENCY, PIPELINE_DECISION, ScanTimer
+from services.lock_manager import StripedLockManager, SCAN_LOCKS
+from services.session_index import ActiveSessionIndex, ActiveSession, active_session_query
+from services.occupancy_broadcaster import OccupancyBroadcaster, occupancy_payload
+from services.realtime_rooms import emit_to_rooms, rooms_for
+from services.event_bus import RealtimeEventBus
+from services.async_logging import structured
+from services.dashboard_state import DASHBOARD_STATE
+
+logger = logging.getLogger("parking_service")
 
 class ParkingLogicService:
     """
@@ -18,80 +33,129 @@ class ParkingLogicService:
     Centralni servis za odluke o pristupu.
     """
 
-    def __init__(self, socketio: SocketIO):
+    def __init__(self, socketio: SocketIO, occupancy: Optional[OccupancyEngine] = None,
+                 committer: Optional[GroupCommitter] = None, log_writer: Optional[ScanLogWriter] = None,
+                 sessions: Optional[ActiveSessionIndex] = None,
+                 locks: Optional[StripedLockManager] = SCAN_LOCKS,
+                 broadcaster: Optional[OccupancyBroadcaster] = None,
+                 events: Optional[RealtimeEventBus] = None):
         self.socketio = socketio
+        # Sa OccupancyEngine-om popunjenost/kvote su u memoriji (atomski admit, write-behind);
+        # bez njega se koristi stari put (Zone redovi sa FOR UPDATE lock-om)
+        self.occupancy = occupancy
+        # Sa GroupCommitter-om istovremeni skenovi dele jedan commit (vidi services/group_commit.py)
+        self.committer = committer
+        # Sa ScanLogWriter-om audit log ide asinhrono (batch INSERT) - odluka ne ceka na upis loga
+        self.log_writer = log_writer
+        # Sa ActiveSessionIndex-om APB ne cita parking_sessions (indeks se menja posle commit-a)
+        self.sessions = sessions
+        # Striped lock-ovi po zoni/korisniku (umesto FOR UPDATE koji na SQLite-u ne radi nista)
+        self.locks = locks
+        # Sa OccupancyBroadcaster-om popunjenost ide jednim batch-om po tick-u, a ne emit po zoni po skenu
+        self.broadcaster = broadcaster
+        # Sa RealtimeEventBus-om odluka samo stavi event u red; salje ga emiter thread
+        self.events = events
 
     def handle_scan(self, gate_id: int, cred_type: str, cred_value: str) -> dict:
         """
         Glavna metoda koju poziva Forwarder.
+        Trajanje svake faze ide u histograme po gejtu i ishodu (vidi services/latency.py).
         """
-        now = datetime.now()
-
+        timer = SCAN_LATENCY.start(PIPELINE_DECISION)
+        result = {"allow": False, "reason": "SYSTEM_ERROR"}
+        try:
+            result = self._handle_scan(timer, gate_id, cred_type, cred_value)
+            return result
+        finally:
+            outcome = result.get("reason", "UNKNOWN")
+            SCAN_LATENCY.finish(timer, gate_id, outcome)
+            # Jedan strukturisan zapis po skenu (umesto vise print/info linija)
+            logger.info("Scan decided", extra=structured(
+                "scan_decision", gate_id=gate_id, cred_type=cred_type, outcome=outcome,
+                allow=bool(result.get("allow")), latency_ms=round((time.perf_counter() - timer.started) * 1000, 2),
+                scan_event_id=result.get("scan_event_id"),
+            ))
+
+    def _handle_scan(self, timer: ScanTimer, gate_id: int, cred_type: str, cred_value: str) -> dict:
         # --- 1. DEBOUNCE ZAŠTITA ---
-        scan_key = f"{gate_id}:{cred_value}"
-        
-        # Očisti stari keš
-        keys_to_delete = [k for k, v in SCAN_CACHE.items() if (now - v).total_seconds() > CACHE_TIMEOUT_SECONDS]
-        for k in keys_to_delete:
-            del SCAN_CACHE[k]
-
-        # Proveri duplikat
-        if scan_key in SCAN_CACHE:
-            last_seen = SCAN_CACHE[scan_key]
-            seconds_ago = (now - last_seen).total_seconds()
-            
-            if seconds_ago < CACHE_TIMEOUT_SECONDS:
-                print(f"DEBOUNCE: Ignorišem dupli sken '{cred_value}' (Preostalo: {int(CACHE_TIMEOUT_SECONDS - seconds_ago)}s)")
-                return {"allow": False, "reason": "DUPLICATE_SCAN_IGNORED"}
-
-        SCAN_CACHE[scan_key] = now
+        # O(1) provera + upis (prozor po gejtu / tipu kredencijala, vidi services/debounce.py)
+        with timer.stage("debounce"):
+            remaining = SCAN_DEBOUNCE.check_and_mark(gate_id, cred_type, cred_value)
+        if remaining is not None:
+            logger.debug("Duplicate scan ignored", extra=structured(
+                "debounce", gate_id=gate_id, cred_type=cred_type, remaining_s=int(remaining)))
+            return {"allow": False, "reason": "DUPLICATE_SCAN_IGNORED"}
         
         # --- 2. UČITAVANJE PODATAKA ---
-        gate = Gate.query.filter_by(id=gate_id).options(
-            joinedload(Gate.zone_from),
-            joinedload(Gate.zone_to)
-        ).first()
+        with timer.stage("gate_load"):
+            gate = Gate.query.filter_by(id=gate_id).options(
+                joinedload(Gate.zone_from),
+                joinedload(Gate.zone_to)
+            ).first()
 
         if not gate:
             return self._deny(None, None, cred_type, cred_value, "UNKNOWN_GATE")
         
-        target_zone = gate.zone_to
-        if target_zone:
-            # Ponovo učitavamo zonu sa LOCK-om. Ovo blokira sve ostale dok ne završimo.
-            target_zone = Zone.query.with_for_update().filter_by(id=target_zone.id).first()
-        
-        source_zone = gate.zone_from
-        if source_zone:
-             source_zone = Zone.query.with_for_update().filter_by(id=source_zone.id).first()
-        # 🔥🔥🔥 KRAJ FIX-A 🔥🔥🔥
-
-        credential = Credential.query.filter_by(
-            cred_type=cred_type, 
-            cred_value=cred_value, 
-            is_active=True
-        ).options(
-            joinedload(Credential.user).joinedload(User.role),
-            joinedload(Credential.user).joinedload(User.tenant)
-        ).first()
+        # Identitet iz kesa snapshot-a (topli sken ne ide u bazu, vidi services/credential_cache.py)
+        with timer.stage("credential"):
+            credential = CREDENTIAL_CACHE.resolve(cred_type, cred_value)
 
         if not credential:
             self._log_scan(gate, cred_type, cred_value, False, "UNKNOWN_CREDENTIAL")
             self._emit_access_log(gate, None, None, cred_value, False, "UNKNOWN_CREDENTIAL")
             return {"allow": False, "reason": "UNKNOWN_CREDENTIAL"}
 
+        # Kriticna sekcija: skenovi istog korisnika (APB) i, bez OccupancyEngine-a, iste zone
+        # (kapacitet) se serijalizuju; nepovezane zone i korisnici idu paralelno
+        if not self.locks:
+            return self._decide(timer, gate, credential, cred_type, cred_value)
+        zones = () if self.occupancy else (gate.zone_to_id, gate.zone_from_id)
+        lock_started = time.perf_counter()
+        with self.locks.hold(zones=zones, users=(credential.user.id,)):
+            timer.add("lock_wait", time.perf_counter() - lock_started)
+            return self._decide(timer, gate, credential, cred_type, cred_value)
+
+    def _decide(self, timer: ScanTimer, gate: Gate, credential: CredentialSnapshot, cred_type: str, cred_value: str) -> dict:
+        """Validacija i izvrsenje odluke (poziva se pod lock-ovima iz handle_scan)."""
         user = credential.user
         role = user.role
+        with timer.stage("zone_load"):
+            if self.occupancy:
+                # Brojaci su u memoriji - nema row lock-a nad (vrucim) zonama
+                self.occupancy.ensure_loaded()
+                for zone in (gate.zone_to, gate.zone_from):
+                    if zone:
+                        self.occupancy.track_zone(zone)
+            else:
+                # Zone ponovo citamo posle lock-a (populate_existing), jer je gejt ucitan pre njega.
+                # FOR UPDATE i dalje stiti vise procesa na PostgreSQL-u; na SQLite-u to radi lock manager.
+                if gate.zone_to:
+                    Zone.query.with_for_update().populate_existing().filter_by(id=gate.zone_to_id).first()
+                if gate.zone_from:
+                    Zone.query.with_for_update().populate_existing().filter_by(id=gate.zone_from_id).first()
+
+            # Tenant nije deo snapshot-a: current_usage se menja na svaki prolaz
+            # (sa OccupancyEngine-om brojac je u memoriji, pa red iz baze ne treba)
+            tenant = None
+            if user.tenant_id:
+                if self.occupancy:
+                    self.occupancy.track_tenant(user.tenant_id)
+                else:
+                    tenant = db.session.get(Tenant, user.tenant_id)
         target_zone = gate.zone_to
         source_zone = gate.zone_from
 
         # --- 3. VALIDACIJA PRAVILA ---
-        rules = self._fetch_applicable_rules(gate, target_zone, role)
+        with timer.stage("rule_fetch"):
+            rules = self._fetch_applicable_rules(gate, target_zone, role)
         
         # Pronađi aktivnu sesiju (Gde je korisnik SADA?)
         # Ovo je ključno za APB. Ako ima sesiju, unutra je.
-        active_session = ParkingSession.query.filter_by(user_id=user.id, exit_time=None).first()
+        with timer.stage("session_lookup"):
+            active_session = self._find_active_session(user.id)
 
-        is_allowed, reason = self._validate_rules(rules, user, gate, target_zone, source_zone, active_session)
+        with timer.stage("validate"):
+            is_allowed, reason = self._validate_rules(rules, user, tenant, gate, target_zone, source_zone, active_session)
         
         if not is_allowed:
             self._log_scan(gate, cred_type, cred_value, False, reason, user)
@@ -100,38 +164,42 @@ class ParkingLogicService:
 
         # --- 4. IZVRŠENJE ---
         try:
-            self._execute_access_transaction(user, credential, gate, target_zone, source_zone, active_session)
-            
-            self._log_scan(gate, cred_type, cred_value, True, "ACCESS_GRANTED", user)
+            scan_log_id = None
+            granted_log = self._scan_log_values(gate, cred_type, cred_value, True, "ACCESS_GRANTED", user)
+            if self.occupancy:
+                # Bez async writer-a ScanLog o odobrenju ide u istu transakciju kao i sesija
+                admitted, reason, scan_log_id = self._execute_with_occupancy(
+                    rules, user, credential, gate, target_zone, source_zone, active_session,
+                    None if self.log_writer else granted_log)
+                if not admitted:
+                    # Neko drugi je zauzeo poslednje mesto izmedju provere i upisa
+                    self._log_scan(gate, cred_type, cred_value, False, reason, user)
+                    self._emit_access_log(gate, user, credential, cred_value, False, reason)
+                    return {"allow": False, "reason": reason}
+            else:
+                self._execute_access_transaction(user, tenant, credential, gate, target_zone, source_zone, active_session)
+            if scan_log_id is None:
+                scan_log_id = self._write_scan_log(granted_log)
             self._emit_access_log(gate, user, credential, cred_value, True, "ACCESS_GRANTED")
             
             return {
                 "allow": True, 
                 "reason": "ACCESS_GRANTED", 
                 "user": f"{user.first_name} {user.last_name}",
-                "role": role.name
+                "role": role.name,
+                "scan_log_id": scan_log_id,  # Outbox kasnije upisuje HW ack u ovaj red
+                "scan_event_id": granted_log["event_id"]  # ... ili preko event_id ako je red jos u writer-u
             }
         except Exception as e:
             db.session.rollback()
-            print(f"CRITICAL ERROR in transaction: {str(e)}")
+            logger.error(f"CRITICAL ERROR in transaction: {e}", extra=structured("transaction_error", gate_id=gate.id))
             return {"allow": False, "reason": "SYSTEM_ERROR"}
 
-    def _fetch_applicable_rules(self, gate: Gate, zone: Zone, role) -> List[ValidationRule]:
-        """Skuplja sva pravila (Global, Zone, Gate, Role)."""
-        queries = []
-        queries.append(ValidationRule.scope == RuleScope.GLOBAL)
+    def _fetch_applicable_rules(self, gate: Gate, zone: Zone, role) -> Tuple[CompiledRule, ...]:
+        """Skuplja sva pravila (Global, Zone, Gate, Role) iz kompajliranog indeksa."""
+        return RULE_INDEX.rules_for(gate.id, zone.id if zone else None, role.id if role else None)
 
-        if zone:
-            queries.append((ValidationRule.scope == RuleScope.ZONE) & (ValidationRule.target_zone_id == zone.id))
-
-        queries.append((ValidationRule.scope == RuleScope.GATE) & (ValidationRule.target_gate_id == gate.id))
-
-        if role:
-            queries.append((ValidationRule.scope == RuleScope.ROLE) & (ValidationRule.target_role_id == role.id))
-
-        return ValidationRule.query.filter(or_(*queries), ValidationRule.is_enabled == True).all()
-
-    def _validate_rules(self, rules: List[ValidationRule], user: User, gate: Gate, target_zone: Zone, source_zone: Zone, active_session: ParkingSession) -> Tuple[bool, str]:
+    def _validate_rules(self, rules: Tuple[CompiledRule, ...], user: UserSnapshot, tenant: Optional[Tenant], gate: Gate, target_zone: Zone, source_zone: Zone, active_session: Optional[ActiveSession]) -> Tuple[bool, str]:
         """Proverava uslove."""
         
         if not user.is_active:
@@ -143,11 +211,12 @@ class ParkingLogicService:
             if rule.rule_type == RuleType.CHECK_CAPACITY:
                 if user.role.can_ignore_capacity: continue 
 
-                if target_zone and target_zone.occupancy >= target_zone.capacity:
+                if target_zone and self._zone_is_full(target_zone, source_zone):
                     return False, "ZONE_FULL"
                 
-                if user.tenant and rule.scope != RuleScope.ZONE:
-                    if user.tenant.current_usage >= user.tenant.quota_limit:
+                if user.tenant_id and rule.scope != RuleScope.ZONE:
+                    usage, quota = self._tenant_counters(user, tenant)
+                    if usage >= quota:
                         return False, "TENANT_QUOTA_EXCEEDED"
 
             # --- ANTIPASSBACK CHECK ---
@@ -184,65 +253,198 @@ class ParkingLogicService:
 
         return True, "OK"
 
-    def _execute_access_transaction(self, user: User, credential: Credential, gate: Gate, target_zone: Zone, source_zone: Zone, session: ParkingSession):
-        """Ažurira bazu."""
-        now = datetime.now()
+    def _zone_is_full(self, target_zone: Zone, source_zone: Optional[Zone]) -> bool:
+        if self.occupancy:
+            # Zbirni brojaci: proverava se cela putanja do korena (bez zajednickih predaka sa izvorom)
+            return self.occupancy.first_full_zone(target_zone.id, source_zone.id if source_zone else None) is not None
+        return target_zone.occupancy >= target_zone.capacity
+
+    def _tenant_counters(self, user: UserSnapshot, tenant: Optional[Tenant]) -> Tuple[int, int]:
+        if self.occupancy:
+            return self.occupancy.tenant_counters(user.tenant_id)
+        return (tenant.current_usage, tenant.quota_limit) if tenant else (0, 0)
+
+    @staticmethod
+    def _capacity_checks(rules: Tuple[CompiledRule, ...], user: UserSnapshot) -> Tuple[bool, bool]:
+        """Koje limite CHECK_CAPACITY pravila traze: (kapacitet zone, kvota tenanta)."""
+        if user.role.can_ignore_capacity:
+            return False, False
+        capacity_rules = [r for r in rules if r.rule_type == RuleType.CHECK_CAPACITY]
+        return bool(capacity_rules), any(r.scope != RuleScope.ZONE for r in capacity_rules)
+
+    def _find_active_session(self, user_id: int) -> Optional[ActiveSession]:
+        if self.sessions:
+            self.sessions.ensure_loaded()
+            return self.sessions.get(user_id)
+        row = active_session_query().filter(ParkingSession.user_id == user_id).first()
+        return ActiveSession(*row) if row else None
+
+    def _index_session(self, user_id: int, session: Optional[ActiveSession]):
+        """Poziva se tek posle commit-a - indeks sadrzi samo upisano stanje."""
+        if self.sessions:
+            self.sessions.set(user_id, session)
+
+    def _execute_with_occupancy(self, rules, user: UserSnapshot, credential: CredentialSnapshot, gate: Gate, target_zone: Zone, source_zone: Zone, session: Optional[ActiveSession], granted_log: Optional[dict]) -> Tuple[bool, str, Optional[int]]:
+        """
+        Kao _execute_access_transaction, ali brojaci idu kroz atomski OccupancyEngine.admit().
+        Sesija i ScanLog se upisuju jednim commit-om (deljenim sa drugim skenovima ako postoji committer).
+        Vraca (odobreno, razlog, scan_log_id); scan_log_id je None ako granted_log nije prosledjen.
+        """
+        check_zone, check_tenant = self._capacity_checks(rules, user)
+        admitted, reason, change = self.occupancy.admit(
+            target_zone.id if target_zone else None,
+            source_zone.id if source_zone else None,
+            user.tenant_id, check_zone, check_tenant
+        )
+        if not admitted:
+            return False, reason, None
+
+        apply_changes = self._session_changes(user, credential, gate, target_zone, source_zone, session)
 
+        def unit(db_session):
+            session_after = apply_changes(db_session)
+            return session_after, self._insert_scan_log(db_session, granted_log) if granted_log else None
+
+        try:
+            with SCAN_LATENCY.current().stage("transaction"):
+                if self.committer:
+                    # Blokira do durable commit-a - rampa se ne otvara pre potvrde upisa
+                    session_after, scan_log_id = self.committer.execute(unit)
+                else:
+                    session_after, scan_log_id = unit(db.session)
+                    db.session.commit()
+        except Exception:
+            self.occupancy.revert(change)
+            raise
+        self._index_session(user.id, session_after)
+
+        # Menjaju se i svi preci na putanji, ne samo cilj/izvor
+        for zone_id in change.zone_ids:
+            occupancy, capacity = self.occupancy.zone_counters(zone_id)
+            self._emit_occupancy(zone_id, self.occupancy.zone_name(zone_id), occupancy, capacity)
+        return True, "OK", scan_log_id
+
+    def _execute_access_transaction(self, user: UserSnapshot, tenant: Optional[Tenant], credential: CredentialSnapshot, gate: Gate, target_zone: Zone, source_zone: Zone, session: Optional[ActiveSession]):
+        """Ažurira bazu."""
         # A. ULAZ U ZONU
         if target_zone:
             target_zone.occupancy += 1
-            if user.tenant: user.tenant.current_usage += 1
-            
-            # Ako nema sesije (Ulaz u kompleks), kreiraj je
-            if not session and gate.zone_from_id is None:
-                new_session = ParkingSession(
-                    user_id=user.id,
-                    credential_id=credential.id,
-                    entry_gate_id=gate.id,
-                    entry_time=now
-                )
-                db.session.add(new_session)
-            
-            # Tranzit (Ažuriraj zonu)
-            elif session:
-                session.zone_id = target_zone.id
-
-            self._emit_occupancy_update(target_zone)
+            if tenant: tenant.current_usage += 1
 
         # B. IZLAZ IZ ZONE
         if source_zone:
             if source_zone.occupancy > 0: source_zone.occupancy -= 1
-            if user.tenant and user.tenant.current_usage > 0: user.tenant.current_usage -= 1
-            
-            self._emit_occupancy_update(source_zone)
-            
-            # KONAČNI IZLAZ (Zatvaranje sesije)
-            if gate.zone_to_id is None and session:
-                session.exit_time = now
-                session.exit_gate_id = gate.id
-                session.total_cost = 0 # TODO: Billing Logic here
+            if tenant and tenant.current_usage > 0: tenant.current_usage -= 1
 
-        credential.last_used_at = now
-        db.session.commit()
+        # Stanje za dashboard se uzima pre commit-a (posle commit-a su objekti expired), a salje posle
+        changed = [(z.id, z.name, z.occupancy, z.capacity) for z in (target_zone, source_zone) if z]
+
+        with SCAN_LATENCY.current().stage("transaction"):
+            session_after = self._session_changes(user, credential, gate, target_zone, source_zone, session)(db.session)
+            db.session.commit()
+        self._index_session(user.id, session_after)
+
+        for zone_id, zone_name, occupancy, capacity in changed:
+            self._emit_occupancy(zone_id, zone_name, occupancy, capacity)
+
+    def _session_changes(self, user: UserSnapshot, credential: CredentialSnapshot, gate: Gate, target_zone: Zone, source_zone: Zone, session: Optional[ActiveSession]):
+        """
+        Vraca fn(db_session) koja upisuje sesiju (ulaz/tranzit/izlaz) i last_used_at - bez commit-a.
+        Uzima samo ID-jeve, pa fn moze da se izvrsi i u sesiji committer thread-a.
+        fn vraca aktivnu sesiju korisnika POSLE ovog prolaza (None = izasao / nema sesije).
+        """
+        now = datetime.now()
+        user_id, credential_id, gate_id = user.id, credential.id, gate.id
+        target_zone_id = target_zone.id if target_zone else None
+        opens_session = bool(target_zone) and not session and gate.zone_from_id is None
+        # Tranzit (Ažuriraj zonu)
+        moves_session = bool(target_zone) and session is not None
+        # KONAČNI IZLAZ (Zatvaranje sesije)
+        closes_session = bool(source_zone) and gate.zone_to_id is None and session is not None
+
+        def apply(db_session) -> Optional[ActiveSession]:
+            session_after = session
+
+            # Ako nema sesije (Ulaz u kompleks), kreiraj je
+            if opens_session:
+                new_session = ParkingSession(
+                    user_id=user_id,
+                    credential_id=credential_id,
+                    entry_gate_id=gate_id,
+                    entry_time=now,
+                    zone_id=target_zone_id
+                )
+                db_session.add(new_session)
+                db_session.flush()
+                session_after = ActiveSession(new_session.id, user_id, target_zone_id)
+
+            elif moves_session:
+                db_session.query(ParkingSession).filter_by(id=session.id).update({"zone_id": target_zone_id})
+                session_after = ActiveSession(session.id, user_id, target_zone_id)
+
+            if closes_session:
+                db_session.query(ParkingSession).filter_by(id=session.id).update({
+                    "exit_time": now,
+                    "exit_gate_id": gate_id,
+                    "total_cost": 0  # TODO: Billing Logic here
+                })
+                session_after = None
+
+            # Snapshot je nepromenljiv - last_used_at ide direktnim UPDATE-om (bez SELECT-a)
+            db_session.query(Credential).filter_by(id=credential_id).update({"last_used_at": now})
+            return session_after
+
+        return apply
+
+    @staticmethod
+    def _scan_log_values(gate, cred_type, raw_payload, granted, reason, user=None) -> dict:
+        c_type_enum = CredentialType(cred_type) if isinstance(cred_type, str) else cred_type
+        return {
+            "event_id": uuid.uuid4().hex,
+            "gate_id": gate.id if gate else None,
+            "gate_name_snapshot": gate.name if gate else "UNKNOWN",
+            "scan_type": c_type_enum,
+            "raw_payload": raw_payload,
+            "is_access_granted": granted,
+            "denial_reason": reason,
+            "resolved_user_id": user.id if user else None,
+            "resolved_tenant_id": user.tenant_id if user and user.tenant_id else None
+        }
+
+    @staticmethod
+    def _insert_scan_log(db_session, values: dict) -> int:
+        log = ScanLog(**values)
+        db_session.add(log)
+        db_session.flush()
+        return log.id
 
     def _log_scan(self, gate, cred_type, raw_payload, granted, reason, user=None):
+        """Upisuje ScanLog i vraća njegov ID (None ako upis nije uspeo ili ide kroz async writer)."""
+        try:
+            values = self._scan_log_values(gate, cred_type, raw_payload, granted, reason, user)
+        except ValueError as e:
+            logger.error(f"ERROR logging scan: {e}")
+            return None
+        return self._write_scan_log(values)
+
+    def _write_scan_log(self, values: dict) -> Optional[int]:
+        with SCAN_LATENCY.current().stage("log_scan"):
+            return self._store_scan_log(values)
+
+    def _store_scan_log(self, values: dict) -> Optional[int]:
+        if self.log_writer:
+            self.log_writer.write(values)
+            return None
         try:
-            c_type_enum = CredentialType(cred_type) if isinstance(cred_type, str) else cred_type
-            log = ScanLog(
-                gate_id=gate.id if gate else None,
-                gate_name_snapshot=gate.name if gate else "UNKNOWN",
-                scan_type=c_type_enum,
-                raw_payload=raw_payload,
-                is_access_granted=granted,
-                denial_reason=reason,
-                resolved_user_id=user.id if user else None,
-                resolved_tenant_id=user.tenant_id if user and user.tenant_id else None
-            )
-            db.session.add(log)
+            if self.committer:
+                return self.committer.execute(lambda db_session: self._insert_scan_log(db_session, values))
+            log_id = self._insert_scan_log(db.session, values)
             db.session.commit()
+            return log_id
         except Exception as e:
-            print(f"ERROR logging scan: {e}")
+            logger.error(f"ERROR logging scan: {e}")
             db.session.rollback()
+            return None
 
     def _deny(self, user, gate_id, c_type, c_val, reason):
         return {"allow": False, "reason": reason}
@@ -259,17 +461,41 @@ class ParkingLogicService:
             "reason": reason,
             "is_entry": gate.zone_to_id is not None if gate else False
         }
-        print(f"📡 EMIT: {payload['user_name']} - {payload['status']}")
-        if self.socketio:
-            self.socketio.emit('access_log', payload, namespace='/')
-
-    def _emit_occupancy_update(self, zone):
-        payload = {
-            "zone_id": zone.id,
-            "zone_name": zone.name,
-            "current": zone.occupancy,
-            "capacity": zone.capacity,
-            "percent": round((zone.occupancy / zone.capacity * 100), 1) if zone.capacity > 0 else 0
-        }
-        if self.socketio:
-            self.socketio.emit('occupancy_update', payload, namespace='/')
\ No newline at end of file
+        logger.debug(f"EMIT: {payload['user_name']} - {payload['status']}")
+        DASHBOARD_STATE.add_log({
+            "id": None,   # ScanLog red moze jos biti u async writer-u
+            "scan_time": payload["time"],
+            "gate_id": payload["gate_id"],
+            "gate_name": payload["gate_name"],
+            "status": payload["status"],
+            "reason": reason,
+            "user": payload["user_name"],
+        })
+        rooms = rooms_for(
+            zones=self._zone_paths(gate.zone_to_id, gate.zone_from_id) if gate else (),
+            gates=(gate.id,) if gate else (),
+            tenants=(user.tenant_id,) if user else (),
+        )
+        self._publish('access_log', payload, rooms)
+
+    def _emit_occupancy(self, zone_id, zone_name, occupancy, capacity):
+        DASHBOARD_STATE.update_zone(zone_id, occupancy, capacity)
+        if self.broadcaster:
+            self.broadcaster.mark(zone_id, zone_name, occupancy, capacity)
+            return
+        payload = occupancy_payload(zone_id, zone_name, occupancy, capacity)
+        self._publish('occupancy_update', payload, rooms_for(zones=self._zone_paths(zone_id)))
+
+    def _publish(self, event, payload, rooms):
+        """Event u red emiter thread-a (O(1)); bez event bus-a se salje odmah, na ovom thread-u."""
+        with SCAN_LATENCY.current().stage("emit"):
+            if self.events:
+                self.events.publish(event, payload, rooms)
+            elif self.socketio:
+                emit_to_rooms(self.socketio, event, payload, rooms)
+
+    def _zone_paths(self, *zone_ids):
+        """Zone i (sa OccupancyEngine-om) svi njihovi preci - pretplatnik nadzone vidi i podzone."""
+        if not self.occupancy:
+            return zone_ids
+        return [z for zone_id in zone_ids for z in self.occupancy.zone_path(zone_id)]
\ No newline at end of file
@@ -0,0 +1,174 @@
+import threading
+import logging
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger("realtime_rooms")
+
+NAMESPACE = '/'
+
+# Soba za klijente koji zele sav saobracaj (operaterski dashboard)
+ROOM_ALL = "all"
+
+
+def zone_room(zone_id: int) -> str:
+    return f"zone:{zone_id}"
+
+
+def gate_room(gate_id: int) -> str:
+    return f"gate:{gate_id}"
+
+
+def tenant_room(tenant_id: int) -> str:
+    return f"tenant:{tenant_id}"
+
+
+def rooms_for(zones: Iterable[Optional[int]] = (), gates: Iterable[Optional[int]] = (),
+              tenants: Iterable[Optional[int]] = ()) -> List[str]:
+    """Imena soba za zadate zone/gejtove/tenante (None se preskace, duplikati se uklanjaju)."""
+    rooms = [zone_room(z) for z in zones if z is not None]
+    rooms += [gate_room(g) for g in gates if g is not None]
+    rooms += [tenant_room(t) for t in tenants if t is not None]
+    return list(dict.fromkeys(rooms))
+
+
+def parse_subscription(data) -> List[str]:
+    """
+    {"zones": [1, 2], "gates": [3], "tenants": [4], "all": false} -> imena soba.
+    Baca ValueError za neispravan zahtev (ID-jevi moraju biti celi brojevi).
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Subscription must be an object")
+    ids = {}
+    for key in ("zones", "gates", "tenants"):
+        values = data.get(key) or []
+        if not isinstance(values, list) or any(isinstance(v, bool) or not isinstance(v, int) for v in values):
+            raise ValueError(f"'{key}' must be a list of integer IDs")
+        ids[key] = values
+    rooms = rooms_for(ids["zones"], ids["gates"], ids["tenants"])
+    if data.get("all"):
+        rooms.insert(0, ROOM_ALL)
+    return rooms
+
+
+class RoomSubscriptions:
+    """
+    Ko je pretplacen na koju sobu (zona, gejt, tenant ili "all") i fan-out po sobi.
+
+    Clanstvo se vodi paralelno sa Socket.IO sobama, pa emit zna unapred koliko
+    klijenata ce dobiti event - u sobe bez clanova se uopste ne emituje
+    (nema serijalizacije za tenant-ov lobby ekran koji niko ne gleda).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._members = {}      # soba -> set(sid)
+        self._rooms_of = {}     # sid -> set(soba)
+        self._fanout = {}       # soba -> [eventi, isporuke]
+        self._events = {}       # event -> [emitovano, preskoceno (bez publike), isporuke]
+
+    def join(self, sid: str, rooms: Iterable[str]) -> List[str]:
+        with self._lock:
+            joined = self._rooms_of.setdefault(sid, set())
+            for room in rooms:
+                self._members.setdefault(room, set()).add(sid)
+                joined.add(room)
+            return sorted(joined)
+
+    def leave(self, sid: str, rooms: Iterable[str]) -> List[str]:
+        with self._lock:
+            joined = self._rooms_of.get(sid, set())
+            for room in rooms:
+                self._discard(room, sid)
+                joined.discard(room)
+            return sorted(joined)
+
+    def drop(self, sid: str):
+        """Klijent se diskonektovao - izlazi iz svih soba."""
+        with self._lock:
+            for room in self._rooms_of.pop(sid, ()):
+                self._discard(room, sid)
+
+    def _discard(self, room, sid):
+        members = self._members.get(room)
+        if members is not None:
+            members.discard(sid)
+            if not members:
+                del self._members[room]
+
+    def audience(self, event: str, rooms: Iterable[str]) -> List[str]:
+        """
+        Sobe (od zadatih) koje imaju bar jednog clana; usput belezi fan-out.
+        Isporuke su po klijentu: ko je u vise ciljanih soba dobija event jednom.
+        """
+        with self._lock:
+            targets = [room for room in rooms if self._members.get(room)]
+            recipients = set()
+            for room in targets:
+                members = self._members[room]
+                counter = self._fanout.setdefault(room, [0, 0])
+                counter[0] += 1
+                counter[1] += len(members)
+                recipients |= members
+            totals = self._events.setdefault(event, [0, 0, 0])
+            if targets:
+                totals[0] += 1
+                totals[2] += len(recipients)
+            else:
+                totals[1] += 1
+            return targets
+
+    def rooms_of(self, sid: str) -> List[str]:
+        with self._lock:
+            return sorted(self._rooms_of.get(sid, ()))
+
+    def reset(self):
+        with self._lock:
+            self._members = {}
+            self._rooms_of = {}
+            self._fanout = {}
+            self._events = {}
+
+    def reset_stats(self):
+        with self._lock:
+            self._fanout = {}
+            self._events = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._rooms_of),
+                "rooms": {
+                    room: {
+                        "members": len(self._members.get(room, ())),
+                        "events": self._fanout.get(room, (0, 0))[0],
+                        "deliveries": self._fanout.get(room, (0, 0))[1],
+                    }
+                    for room in sorted(set(self._members) | set(self._fanout))
+                },
+                "events": {
+                    event: {"emitted": emitted, "skipped_no_audience": skipped, "deliveries": deliveries}
+                    for event, (emitted, skipped, deliveries) in sorted(self._events.items())
+                },
+            }
+
+
+# Globalna instanca (Socket.IO handler-i upisuju clanstvo, emiteri i /api/system/rooms citaju)
+SUBSCRIPTIONS = RoomSubscriptions()
+
+
+def emit_to_rooms(socketio, event: str, payload, rooms: Iterable[str] = (), include_all: bool = True) -> int:
+    """
+    Salje event samo u sobe koje imaju clanove (+ "all" ako include_all).
+    Vraca broj soba u koje je poslato (0 = niko ne slusa, emit preskocen).
+    """
+    if not socketio:
+        return 0
+    wanted = [ROOM_ALL, *rooms] if include_all else list(rooms)
+    targets = SUBSCRIPTIONS.audience(event, wanted)
+    if not targets:
+        return 0
+    try:
+        socketio.emit(event, payload, to=targets, namespace=NAMESPACE)
+    except Exception as e:
+        logger.warning(f"Emit of {event} failed: {e}")
+    return len(targets)
@@ -0,0 +1,114 @@
+import json
+import threading
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from models import ValidationRule, RuleScope, RuleType
+
+logger = logging.getLogger("rule_index")
+
+EMPTY_PARAMS = MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """Nepromenljiva kopija ValidationRule reda; custom_params je vec parsiran JSON."""
+    id: int
+    scope: RuleScope
+    rule_type: RuleType
+    target_zone_id: Optional[int]
+    target_gate_id: Optional[int]
+    target_role_id: Optional[int]
+    params: Mapping
+
+
+def compile_rule(rule: ValidationRule) -> CompiledRule:
+    params = EMPTY_PARAMS
+    if rule.custom_params:
+        try:
+            params = MappingProxyType(json.loads(rule.custom_params))
+        except (ValueError, TypeError) as e:
+            logger.error(f"Rule {rule.id}: invalid custom_params JSON ({e}), using defaults")
+    return CompiledRule(
+        id=rule.id,
+        scope=rule.scope,
+        rule_type=rule.rule_type,
+        target_zone_id=rule.target_zone_id,
+        target_gate_id=rule.target_gate_id,
+        target_role_id=rule.target_role_id,
+        params=params,
+    )
+
+
+class RuleIndex:
+    """
+    Kompajlirani indeks ukljucenih pravila.
+
+    Pri reload-u pravila se jednom procitaju i razvrstaju po scope-u (GLOBAL/ZONE/GATE/ROLE).
+    Lista za (gejt, ciljna zona, rola) se spaja jednom i pamti, pa je svaki sledeci lookup
+    dict pristup - bez upita i bez parsiranja JSON-a po skenu.
+    Rute koje menjaju pravila (ili brisu zone/gejtove, pa kaskadno i pravila) zovu reload().
+    """
+
+    def __init__(self):
+        self._snapshot = None      # (global, by_zone, by_gate, by_role, memo) ili None dok nije ucitano
+        self._reload_lock = threading.Lock()
+        self.version = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def reload(self):
+        """Gradi novi indeks iz baze. Mora u App Context-u."""
+        with self._reload_lock:
+            global_rules = []
+            by_zone, by_gate, by_role = {}, {}, {}
+            rules = ValidationRule.query.filter(ValidationRule.is_enabled == True).order_by(ValidationRule.id).all()
+            for rule in rules:
+                compiled = compile_rule(rule)
+                if rule.scope == RuleScope.GLOBAL:
+                    global_rules.append(compiled)
+                elif rule.scope == RuleScope.ZONE:
+                    by_zone.setdefault(rule.target_zone_id, []).append(compiled)
+                elif rule.scope == RuleScope.GATE:
+                    by_gate.setdefault(rule.target_gate_id, []).append(compiled)
+                elif rule.scope == RuleScope.ROLE:
+                    by_role.setdefault(rule.target_role_id, []).append(compiled)
+
+            self._snapshot = (tuple(global_rules), by_zone, by_gate, by_role, {})
+            self.version += 1
+            logger.info(f"Rule index compiled: {len(rules)} enabled rules (v{self.version})")
+
+    def invalidate(self):
+        """Odbacuje indeks; sledeci lookup ga ponovo gradi."""
+        self._snapshot = None
+
+    def rules_for(self, gate_id: int, zone_id: Optional[int], role_id: Optional[int]) -> Tuple[CompiledRule, ...]:
+        """
+        Pravila koja vaze za (gejt, ciljna zona, rola), sortirana po ID-u.
+        Ocekuje App Context samo ako indeks jos nije ucitan.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.reload()
+            snapshot = self._snapshot
+
+        global_rules, by_zone, by_gate, by_role, memo = snapshot
+        key = (gate_id, zone_id, role_id)
+        rules = memo.get(key)
+        if rules is None:
+            merged = list(global_rules)
+            if zone_id is not None:
+                merged += by_zone.get(zone_id, ())
+            merged += by_gate.get(gate_id, ())
+            if role_id is not None:
+                merged += by_role.get(role_id, ())
+            rules = memo[key] = tuple(sorted(merged, key=lambda r: r.id))
+        return rules
+
+
+# Globalna instanca (Logic Engine cita, rute za pravila/infrastrukturu osvezavaju)
+RULE_INDEX = RuleIndex()
@@ -0,0 +1,338 @@
+import os
+import json
+import threading
+import queue
+import time
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ScanLog, CredentialType
+
+logger = logging.getLogger("scan_log_writer")
+
+DEFAULT_FLUSH_INTERVAL_MS = 200
+DEFAULT_MAX_BATCH = 500
+DEFAULT_CAPACITY = 10000
+
+OP_INSERT = "insert"
+OP_ACK = "ack"
+
+_DATETIME_FIELDS = ("created_at", "hw_ack_at")
+
+
+def _encode(op: str, values: dict) -> str:
+    """Jedna linija spill fajla (JSON): enum i datetime idu kao string."""
+    row = dict(values)
+    if isinstance(row.get("scan_type"), CredentialType):
+        row["scan_type"] = row["scan_type"].value
+    for name in _DATETIME_FIELDS:
+        if isinstance(row.get(name), datetime):
+            row[name] = row[name].isoformat()
+    return json.dumps({"op": op, "values": row})
+
+
+def _decode(line: str):
+    item = json.loads(line)
+    row = item["values"]
+    if row.get("scan_type") is not None:
+        row["scan_type"] = CredentialType(row["scan_type"])
+    for name in _DATETIME_FIELDS:
+        if row.get(name):
+            row[name] = datetime.fromisoformat(row[name])
+    return item["op"], row
+
+
+class ScanLogWriter:
+    """
+    Asinhroni, batch upis ScanLog reda (append-only audit).
+
+    Odluka samo stavi red u ograniceni queue i ide dalje. Writer thread na svakih
+    flush_interval_ms (ili max_batch redova) upisuje sve jednim executemany INSERT-om,
+    a HW ack-ove (hw_ack_*) istim batch-em kao UPDATE po event_id.
+    Ako baza nije dostupna (ili je queue pun) redovi se dopisuju u spill fajl
+    (JSON lines) i upisuju na pocetku prvog sledeceg uspesnog flush-a; spill linije
+    se brisu tek kad su upisane. Ako batch padne, ponavlja se red po red (kao GroupCommitter)
+    pa los red (npr. duplikat event_id) bude odbacen umesto da zaglavi ceo batch u spill-u.
+    """
+
+    def __init__(self, app, flush_interval_ms: float = DEFAULT_FLUSH_INTERVAL_MS,
+                 max_batch: int = DEFAULT_MAX_BATCH, capacity: int = DEFAULT_CAPACITY,
+                 spill_path: Optional[str] = None):
+        self.app = app
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max_batch
+        self.capacity = capacity
+        self.spill_path = spill_path
+
+        self._queue = queue.Queue(maxsize=capacity)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._flush_lock = threading.Lock()   # flush iz thread-a i flush_now() se ne preklapaju
+        self._spill_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._enqueued = 0
+        self._written = 0
+        self._acks = 0
+        self._flushes = 0
+        self._flush_errors = 0
+        self._rejected = 0
+        self._overflowed = 0
+        self._spilled = 0
+        self._replayed = 0
+        self._flush_time_total = 0.0
+        self._last_flush_ms = None
+        self._max_flush_ms = 0.0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scan-log-writer")
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        # Sta god je ostalo u queue-u ide u bazu (ili u spill)
+        self.flush_now()
+
+    # --- API za decision / outbox thread-ove (neblokirajuce) ---
+
+    def write(self, values: dict):
+        """Stavlja ScanLog red u queue. created_at se belezi sada, ne u trenutku upisa."""
+        row = dict(values)
+        row.setdefault("created_at", datetime.now())
+        self._put(OP_INSERT, row)
+
+    def record_ack(self, event_id: str, status: str, message: str, attempts: int):
+        """Ishod CMD:OPEN za red koji mozda jos nije ni upisan (korelacija preko event_id)."""
+        self._put(OP_ACK, {
+            "event_id": event_id,
+            "hw_ack_status": status,
+            "hw_ack_message": (message or "")[:255],
+            "hw_ack_attempts": attempts,
+            "hw_ack_at": datetime.now(),
+        })
+
+    def _put(self, op: str, values: dict):
+        try:
+            self._queue.put_nowait((op, values))
+            with self._stats_lock:
+                self._enqueued += 1
+        except queue.Full:
+            # Writer ne stize - red ide direktno u spill umesto da se izgubi
+            with self._stats_lock:
+                self._overflowed += 1
+            if not self._spill([(op, values)]):
+                logger.error(f"ScanLog queue full and no spill file, dropping {op}")
+
+    # --- Writer thread ---
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._has_spill():
+                    self.flush_now()
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            with self._flush_lock:
+                self._flush(batch)
+
+    def flush_now(self) -> int:
+        """Sinhrono prazni queue (koristi se pri gasenju i u testovima). Vraca broj upisanih stavki."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch and not self._has_spill():
+                    return written
+                written += self._flush(batch)
+                if not batch:
+                    return written
+
+    def _flush(self, batch) -> int:
+        # Spill ide ispred novog batch-a, pa insert uvek prethodi ack-u za isti red
+        spilled, spill_lines = self._read_spill()
+        items = spilled + batch
+        if not items:
+            return 0
+
+        started = time.monotonic()
+        with self.app.app_context():
+            try:
+                inserts, acks = self._execute(items)
+                db.session.commit()
+                committed, pending = list(range(len(items))), []
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"ScanLog flush of {len(items)} items failed ({e}), retrying one by one")
+                with self._stats_lock:
+                    self._flush_errors += 1
+                committed, pending = self._flush_single(items)
+                inserts = sum(1 for i in committed if items[i][0] == OP_INSERT)
+                acks = len(committed) - inserts
+
+        # Procitane spill linije su sada upisane, odbacene ili medju pending - menjaju se u fajlu
+        if self._rewrite_spill(spill_lines, [items[i] for i in pending]):
+            with self._stats_lock:
+                self._spilled += sum(1 for i in pending if i >= len(spilled))
+        elif pending:
+            logger.error(f"No spill file configured, {len(pending)} ScanLog items lost")
+        if not committed:
+            return 0
+
+        elapsed = time.monotonic() - started
+        with self._stats_lock:
+            self._flushes += 1
+            self._written += inserts
+            self._acks += acks
+            self._replayed += sum(1 for i in committed if i < len(spilled))
+            self._flush_time_total += elapsed
+            self._last_flush_ms = round(elapsed * 1000, 2)
+            self._max_flush_ms = max(self._max_flush_ms, self._last_flush_ms)
+        return len(committed)
+
+    def _flush_single(self, items):
+        """
+        Upis red po red posle neuspelog batch-a (mora u App Context-u).
+
+        IntegrityError (npr. duplikat event_id) znaci da red nikad nece proci - odbacuje
+        se, a ostali se upisuju. Svaka druga greska (baza ne radi) prekida pokusaj:
+        taj i svi sledeci redovi idu u spill. Vraca (indeksi upisanih, indeksi za spill).
+        """
+        committed = []
+        for i, item in enumerate(items):
+            try:
+                self._execute([item])
+                db.session.commit()
+                committed.append(i)
+            except IntegrityError as e:
+                db.session.rollback()
+                logger.error(f"Rejecting ScanLog {item[0]} for event {item[1].get('event_id')}: {e}")
+                with self._stats_lock:
+                    self._rejected += 1
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"ScanLog write failed, spilling {len(items) - i} items to disk: {e}")
+                return committed, list(range(i, len(items)))
+        return committed, []
+
+    @staticmethod
+    def _execute(items):
+        """Jedan executemany INSERT i jedan executemany UPDATE (bez commit-a). Vraca (insert-i, ack-ovi)."""
+        inserts = [values for op, values in items if op == OP_INSERT]
+        acks = [{"b_event_id": values["event_id"], "b_status": values["hw_ack_status"],
+                 "b_message": values["hw_ack_message"], "b_attempts": values["hw_ack_attempts"],
+                 "b_at": values["hw_ack_at"]} for op, values in items if op == OP_ACK]
+        table = ScanLog.__table__
+        if inserts:
+            db.session.execute(table.insert(), inserts)
+        if acks:
+            db.session.execute(
+                table.update().where(table.c.event_id == bindparam("b_event_id")).values(
+                    hw_ack_status=bindparam("b_status"),
+                    hw_ack_message=bindparam("b_message"),
+                    hw_ack_attempts=bindparam("b_attempts"),
+                    hw_ack_at=bindparam("b_at"),
+                ), acks)
+        return len(inserts), len(acks)
+
+    # --- Spill fajl ---
+
+    def _has_spill(self) -> bool:
+        return bool(self.spill_path) and os.path.exists(self.spill_path) and os.path.getsize(self.spill_path) > 0
+
+    def _spill(self, items) -> bool:
+        if not self.spill_path:
+            return False
+        with self._spill_lock:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for op, values in items:
+                    f.write(_encode(op, values) + "\n")
+        with self._stats_lock:
+            self._spilled += len(items)
+        return True
+
+    def _read_spill(self):
+        """
+        Cita spill fajl bez praznjenja (poziva se samo iz flush-a, pod _flush_lock).
+        Vraca (stavke, broj procitanih linija) - linije se brisu tek posle upisa (_rewrite_spill).
+        """
+        if not self._has_spill():
+            return [], 0
+        with self._spill_lock:
+            with open(self.spill_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        items = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(_decode(line))
+            except (ValueError, KeyError) as e:
+                logger.error(f"Skipping corrupt ScanLog spill line: {e}")
+        return items, len(lines)
+
+    def _rewrite_spill(self, consumed: int, pending) -> bool:
+        """
+        Prvih `consumed` linija (procitanih u ovom flush-u) menja neupisanim stavkama.
+        Linije koje je u meduvremenu dopisao _put (pun queue) ostaju iza njih, istim redosledom.
+        """
+        if not self.spill_path:
+            return False
+        if not consumed and not pending:
+            return True
+        with self._spill_lock:
+            rest = []
+            if os.path.exists(self.spill_path):
+                with open(self.spill_path, "r", encoding="utf-8") as f:
+                    rest = f.readlines()[consumed:]
+            with open(self.spill_path, "w", encoding="utf-8") as f:
+                for op, values in pending:
+                    f.write(_encode(op, values) + "\n")
+                f.writelines(rest)
+        return True
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "capacity": self.capacity,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "acks": self._acks,
+                "flushes": self._flushes,
+                "flush_errors": self._flush_errors,
+                "rejected": self._rejected,
+                "avg_flush_ms": round(self._flush_time_total / self._flushes * 1000, 2) if self._flushes else 0.0,
+                "last_flush_ms": self._last_flush_ms,
+                "max_flush_ms": self._max_flush_ms,
+                "overflowed": self._overflowed,
+                "spilled": self._spilled,
+                "replayed": self._replayed,
+                "spill_pending": self._has_spill(),
+            }
@@ -0,0 +1,123 @@
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import func
+
+from models import db, Gate, ParkingSession
+
+logger = logging.getLogger("session_index")
+
+
+@dataclass(frozen=True)
+class ActiveSession:
+    """Aktivna (otvorena) sesija korisnika i zona u kojoj se trenutno nalazi."""
+    id: int
+    user_id: int
+    zone_id: Optional[int]
+
+
+def active_session_query():
+    """
+    (id, user_id, zone_id) otvorenih sesija. Sesije upisane pre zone_id kolone
+    nemaju zonu - za njih uzimamo ciljnu zonu ulaznog gejta.
+    """
+    return db.session.query(
+        ParkingSession.id, ParkingSession.user_id,
+        func.coalesce(ParkingSession.zone_id, Gate.zone_to_id)
+    ).outerjoin(Gate, ParkingSession.entry_gate_id == Gate.id) \
+        .filter(ParkingSession.exit_time.is_(None))
+
+
+class ActiveSessionIndex:
+    """
+    user_id -> ActiveSession u memoriji (APB bez upita nad parking_sessions).
+
+    Ucitava se jednom iz baze (load), a posle toga ga menja samo odluka i to tek
+    POSLE uspesnog commit-a (set) - indeks nikad ne vidi stanje koje nije upisano.
+    set() koji stigne dok load() cita bazu se ponovo primenjuje na novi snapshot,
+    pa ucitavanje ne brise ulaz/izlaz koji je worker upravo zabelezio.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.RLock()  # ensure_loaded -> load
+        self._by_user = {}
+        self._loaded = False
+        self._pending = None          # user_id -> sesija, set() pozivi tokom load()-a
+
+        self._lookups = 0
+        self._updates = 0
+        self._loads = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def ensure_loaded(self):
+        """Lazy load za prvi sken - tacno jednom i kad vise worker-a krene istovremeno. Mora u App Context-u."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.load()
+
+    def load(self):
+        """Gradi indeks iz otvorenih sesija. Mora u App Context-u."""
+        with self._load_lock:
+            with self._lock:
+                self._pending = {}
+            try:
+                by_user = {user_id: ActiveSession(session_id, user_id, zone_id)
+                           for session_id, user_id, zone_id in active_session_query().all()}
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for user_id, session in self._pending.items():
+                    if session is None:
+                        by_user.pop(user_id, None)
+                    else:
+                        by_user[user_id] = session
+                self._pending = None
+                self._by_user = by_user
+                self._loaded = True
+                self._loads += 1
+        logger.info(f"Active session index loaded: {len(by_user)} open sessions")
+
+    def get(self, user_id: int) -> Optional[ActiveSession]:
+        with self._lock:
+            self._lookups += 1
+            return self._by_user.get(user_id)
+
+    def set(self, user_id: int, session: Optional[ActiveSession]):
+        """Stanje korisnika posle commit-a (None = nema otvorene sesije)."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending[user_id] = session
+            if session is None:
+                self._by_user.pop(user_id, None)
+            else:
+                self._by_user[user_id] = session
+            self._updates += 1
+
+    def invalidate(self):
+        """Sesije menjane mimo odluke (npr. brisanje korisnika) - sledeci sken ponovo ucitava."""
+        with self._lock:
+            self._by_user = {}
+            self._loaded = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "active_sessions": len(self._by_user),
+                "lookups": self._lookups,
+                "updates": self._updates,
+                "loads": self._loads,
+            }
+
+
+SESSION_INDEX = ActiveSessionIndex()
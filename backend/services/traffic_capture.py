@@ -0,0 +1,150 @@
+"""
+Snimanje dolaznog TCP saobracaja Forwarder-a u kompaktan append-only fajl.
+
+Fajl pocinje sa CAPTURE_MAGIC, a zatim idu zapisi (big-endian):
+    f64 ts          - vreme prijema (epoch sekunde)
+    u32 conn_id     - redni broj konekcije, jedinstven u celom fajlu (novi start nastavlja brojanje)
+    u16 local_port  - port listener-a na koji je stiglo (7000, typed portovi...)
+    u8  event       - EVENT_DATA (chunk kako ga je vratio recv) ili EVENT_CLOSE
+    u8  ip_len
+    u32 data_len
+    ... ip (ASCII), data (raw bajtovi)
+
+Replay alat (replay_traffic.py) cita fajl preko read_capture().
+"""
+import itertools
+import os
+import struct
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from typing import Iterator
+
+logger = logging.getLogger("forwarder")
+
+CAPTURE_MAGIC = b"PKCAP1\n"
+
+EVENT_DATA = 0
+EVENT_CLOSE = 1
+
+CAPTURE_RECORD = struct.Struct("!dIHBBI")
+
+FLUSH_INTERVAL_SECONDS = 1.0   # Najvise ovoliko saobracaja gubimo ako proces padne
+
+
+@dataclass(frozen=True)
+class CaptureRecord:
+    ts: float
+    conn_id: int
+    local_port: int
+    event: int
+    ip: str
+    data: bytes
+
+
+class TrafficCaptureWriter:
+    """
+    Thread-safe pisac capture fajla (koriste ga i threaded i asyncio Forwarder).
+    Upis je jedan write() baferisanog fajla pod lock-om, a flush ide najvise jednom
+    u FLUSH_INTERVAL_SECONDS, pa snimanje ne usporava ingress.
+    Greska pri upisu gasi snimanje, ne Forwarder.
+
+    Postojeci fajl se nastavlja: conn_id krece od najveceg snimljenog + 1 (replay
+    grupise po (ip, conn_id), pa se konekcije razlicitih startova ne smeju spojiti),
+    a nepotpun poslednji zapis se odseca da novi zapisi ne bi bili procitani kao njegov ostatak.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        last_conn_id = self._prepare_existing(path)
+        self._conn_ids = itertools.count(last_conn_id + 1)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(CAPTURE_MAGIC)
+        self._last_flush = time.monotonic()
+        self.records_written = 0
+        self.bytes_written = 0
+        logger.info(f"Recording ingress traffic to {path}")
+
+    @staticmethod
+    def _prepare_existing(path: str) -> int:
+        """Najveci conn_id u postojecem fajlu (0 ako ga nema); odseca nepotpun poslednji zapis."""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return 0
+        last_conn_id = 0
+        with open(path, "r+b") as f:
+            if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+                raise ValueError(f"{path} is not a ParkingOS capture file")
+            size = os.fstat(f.fileno()).st_size
+            end = f.tell()
+            while True:
+                header = f.read(CAPTURE_RECORD.size)
+                if len(header) < CAPTURE_RECORD.size:
+                    break
+                _, conn_id, _, _, ip_len, data_len = CAPTURE_RECORD.unpack(header)
+                if end + CAPTURE_RECORD.size + ip_len + data_len > size:
+                    break
+                end = f.seek(ip_len + data_len, os.SEEK_CUR)
+                last_conn_id = max(last_conn_id, conn_id)
+            if end < size:
+                logger.warning(f"Dropping truncated record at the end of {path}")
+                f.truncate(end)
+        return last_conn_id
+
+    def open_connection(self) -> int:
+        return next(self._conn_ids)
+
+    def record(self, conn_id: int, ip: str, local_port: int, data: bytes):
+        self._write(conn_id, ip, local_port, EVENT_DATA, data)
+
+    def record_close(self, conn_id: int, ip: str, local_port: int):
+        self._write(conn_id, ip, local_port, EVENT_CLOSE, b"")
+
+    def flush(self):
+        with self._lock:
+            if self._file:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _write(self, conn_id, ip, local_port, event, data):
+        raw_ip = ip.encode("ascii")
+        entry = CAPTURE_RECORD.pack(time.time(), conn_id, local_port or 0, event, len(raw_ip), len(data)) + raw_ip + data
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._file.write(entry)
+            except OSError as e:
+                logger.error(f"Traffic capture disabled, write to {self.path} failed: {e}")
+                self._file = None
+                return
+            self.records_written += 1
+            self.bytes_written += len(entry)
+            now = time.monotonic()
+            if now - self._last_flush >= FLUSH_INTERVAL_SECONDS:
+                self._file.flush()
+                self._last_flush = now
+
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    """Cita zapise redom; nepotpun poslednji zapis (proces ubijen usred upisa) se preskace."""
+    with open(path, "rb") as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a ParkingOS capture file")
+        while True:
+            header = f.read(CAPTURE_RECORD.size)
+            if len(header) < CAPTURE_RECORD.size:
+                return
+            ts, conn_id, local_port, event, ip_len, data_len = CAPTURE_RECORD.unpack(header)
+            body = f.read(ip_len + data_len)
+            if len(body) < ip_len + data_len:
+                logger.warning(f"Truncated record at the end of {path}")
+                return
+            yield CaptureRecord(ts, conn_id, local_port, event, body[:ip_len].decode("ascii"), body[ip_len:])
@@ -0,0 +1,89 @@
+# backend/tests/conftest.py
+import atexit
+import shutil
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Test run ne sme da pise pravi logs/parking_os.log ni instance/parking_v3.db:
+# app.py pri importu otvara log i pravi app, a skript testovi zovu create_app() bez baze
+_TEST_DIR = tempfile.mkdtemp(prefix="parkingos-tests-")
+atexit.register(shutil.rmtree, _TEST_DIR, ignore_errors=True)
+os.environ['LOG_DIR'] = os.path.join(_TEST_DIR, 'logs')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_TEST_DIR, 'parking_test.db')
+
+from app import create_app
+from models import db, User, Zone, Gate, Credential, Role
+from services.debounce import SCAN_DEBOUNCE
+from services.credential_cache import CREDENTIAL_CACHE
+from services.rule_index import RULE_INDEX
+from services.latency import SCAN_LATENCY
+from services.dashboard_state import DASHBOARD_STATE
+
+
+def _reset_singletons():
+    SCAN_DEBOUNCE.reset()
+    CREDENTIAL_CACHE.reset()
+    RULE_INDEX.invalidate()
+    SCAN_LATENCY.reset()
+    DASHBOARD_STATE.reset()
+
+
+@pytest.fixture
+def database_url():
+    """Test fajl moze da ga pregazi (npr. fajl baza za testove sa vise thread-ova)."""
+    return 'sqlite:///:memory:'
+
+
+@pytest.fixture
+def app_and_socketio(database_url, monkeypatch):
+    """create_app nad praznom bazom, u App Context-u; globalni kesevi se prazne pre i posle testa."""
+    monkeypatch.setenv('DATABASE_URL', database_url)
+    app, socketio = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all()
+        _reset_singletons()
+        yield app, socketio
+        db.session.remove()
+        db.drop_all()
+    _reset_singletons()
+
+
+@pytest.fixture
+def app(app_and_socketio):
+    return app_and_socketio[0]
+
+
+@pytest.fixture
+def scenario(app):
+    """
+    Fabrika osnovnog scenarija: rola Guest, zona Garaza, ulazni gejt Ulaz u nju
+    i `users` korisnika (U 0, U 1, ...) sa RFID karticama CARD-0, CARD-1, ...
+    """
+
+    def make(users=1, capacity=10, parent_zone_id=None, tenant_id=None, gate_name="Ulaz"):
+        role = Role(name="Guest")
+        zone = Zone(name="Garaza", capacity=capacity, occupancy=0, parent_zone_id=parent_zone_id)
+        db.session.add_all([role, zone])
+        db.session.commit()
+        gate = Gate(name=gate_name, zone_to_id=zone.id)
+        db.session.add(gate)
+        created = []
+        for i in range(users):
+            user = User(first_name="U", last_name=str(i), role_id=role.id, tenant_id=tenant_id)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Credential(user_id=user.id, cred_type="RFID", cred_value=f"CARD-{i}"))
+            created.append(user)
+        db.session.commit()
+        return SimpleNamespace(role=role, zone=zone, gate=gate, users=created,
+                               cards=[f"CARD-{i}" for i in range(users)])
+
+    return make
@@ -0,0 +1,79 @@
+# backend/tests/test_async_logging.py
+import sys
+import os
+import logging
+import queue
+from logging.handlers import QueueListener
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.async_logging import (
+    RateLimitFilter, StructuredFormatter, DroppingQueueHandler, structured, LOG_FORMAT
+)
+from services.parking_service import ParkingLogicService
+
+
+def _record(msg="poruka", lineno=10, **extra):
+    record = logging.LogRecord("test", logging.INFO, "f.py", lineno, msg, None, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_rate_limit_per_message_type():
+    now = [0.0]
+    limiter = RateLimitFilter(rate=2, window=1.0, overrides={"scan_decision": 3}, clock=lambda: now[0])
+
+    assert [limiter.filter(_record(lineno=10)) for _ in range(4)] == [True, True, False, False]
+    # Drugo mesto poziva je drugi tip poruke
+    assert limiter.filter(_record(lineno=11))
+    assert [limiter.filter(_record(**structured("scan_decision"))) for _ in range(4)] == [True, True, True, False]
+
+    now[0] = 1.5
+    record = _record(lineno=10)
+    assert limiter.filter(record)
+    assert record.suppressed == 2
+    assert limiter.suppressed_total == 3
+
+
+def test_structured_formatter_appends_fields():
+    record = _record("Scan decided", **structured("scan_decision", gate_id=3, outcome="ACCESS_GRANTED",
+                                                  user="Pera Peric"))
+    record.suppressed = 4
+    line = StructuredFormatter(LOG_FORMAT).format(record)
+    assert line.endswith('Scan decided | event=scan_decision gate_id=3 outcome=ACCESS_GRANTED '
+                         'user="Pera Peric" (+4 similar suppressed)')
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger("test_async_logging.full")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.warning("prva")
+        logger.warning("druga")
+    finally:
+        logger.removeHandler(handler)
+    assert handler.dropped == 1
+
+    # Listener prazni red na svom thread-u
+    sink = logging.handlers.BufferingHandler(10)
+    listener = QueueListener(handler.queue, sink)
+    listener.start()
+    listener.stop()
+    assert [r.getMessage() for r in sink.buffer] == ["prva"]
+
+
+def test_handle_scan_writes_one_structured_record(scenario, caplog):
+    gate = scenario().gate
+
+    service = ParkingLogicService(None)
+    with caplog.at_level(logging.INFO, logger="parking_service"):
+        service.handle_scan(gate.id, "RFID", "CARD-0")
+        service.handle_scan(gate.id, "RFID", "CARD-0")
+
+    decisions = [r for r in caplog.records if getattr(r, "event", None) == "scan_decision"]
+    assert [r.fields["outcome"] for r in decisions] == ["ACCESS_GRANTED", "DUPLICATE_SCAN_IGNORED"]
+    assert decisions[0].fields["allow"] is True and decisions[0].fields["gate_id"] == gate.id
+    assert decisions[0].fields["latency_ms"] >= 0
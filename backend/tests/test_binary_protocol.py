@@ -0,0 +1,145 @@
+# backend/tests/test_binary_protocol.py
+import socket
+import struct
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from services.binary_protocol import (
+    BinaryFrameDecoder, detect_protocol, encode_scan_batch, encode_heartbeat, encode_ack, decode_ack,
+    MAGIC, PROTOCOL_BINARY, PROTOCOL_TEXT, FRAME_SCAN_BATCH, FRAME_HEARTBEAT, FRAME_ACK,
+    ACK_ACCEPTED, ACK_INVALID_TYPE, ACK_UNKNOWN_DEVICE, LENGTH_FIELD, FRAME_HEADER, SCAN_RECORD
+)
+from services.forwarder_tcp import ConnectionReader
+from services.forwarder_async import AsyncForwarderIngressServer
+
+
+def test_detect_protocol():
+    assert detect_protocol(b"") is None
+    assert detect_protocol(b"PK") is None
+    assert detect_protocol(MAGIC + b"\x00") == PROTOCOL_BINARY
+    assert detect_protocol(b"RFID:1") == PROTOCOL_TEXT
+    assert detect_protocol(b"P") is None
+    assert detect_protocol(b"PIN:") == PROTOCOL_TEXT
+
+
+def test_roundtrip_scan_batch():
+    frame = encode_scan_batch([("LPR", "BG123AA", 1, 1700000000000), ("QR", "a:b:c", 2, 0)])
+    frames = BinaryFrameDecoder().feed(frame)
+
+    assert len(frames) == 1
+    assert frames[0].frame_type == FRAME_SCAN_BATCH
+    assert [(r.cred_type, r.value, r.sequence, r.device_ts) for r in frames[0].records] == [
+        ("LPR", "BG123AA", 1, 1700000000000), ("QR", "a:b:c", 2, 0)
+    ]
+
+
+def test_split_reads_and_coalesced_frames():
+    stream = encode_scan_batch([("RFID", "TAG_1", 10, 0)]) + encode_heartbeat() + \
+        encode_scan_batch([("PIN", "1234", 11, 0)])
+    decoder = BinaryFrameDecoder()
+
+    frames = []
+    for i in range(len(stream)):
+        frames.extend(decoder.feed(stream[i:i + 1]))
+
+    assert [f.frame_type for f in frames] == [FRAME_SCAN_BATCH, FRAME_HEARTBEAT, FRAME_SCAN_BATCH]
+    assert decoder.pending_bytes == 0
+
+
+def test_unknown_type_code_is_kept_as_none():
+    body = FRAME_HEADER.pack(FRAME_SCAN_BATCH, 1) + SCAN_RECORD.pack(9, 5, 0, 1) + b"X"
+    frames = BinaryFrameDecoder().feed(LENGTH_FIELD.pack(len(body)) + body)
+
+    assert frames[0].records[0].cred_type is None
+    assert frames[0].records[0].sequence == 5
+
+
+def test_oversized_frame_is_discarded():
+    decoder = BinaryFrameDecoder(max_frame_bytes=64)
+    assert decoder.feed(struct.pack("!I", 10_000) + b"junk") == []
+    assert decoder.pending_bytes == 0
+
+
+def test_ack_roundtrip():
+    frame = encode_ack([(1, ACK_ACCEPTED), (2, ACK_INVALID_TYPE)])
+    assert decode_ack(frame) == [(1, 0), (2, 2)]
+    # Uredjaj (i replay alat) prepoznaje ACK preko istog dekodera frejmova
+    assert FRAME_HEADER.unpack_from(frame, LENGTH_FIELD.size) == (FRAME_ACK, 2)
+    assert [f.frame_type for f in BinaryFrameDecoder().feed(frame)] == [FRAME_ACK]
+
+
+def test_connection_reader_negotiates_protocol():
+    text = ConnectionReader()
+    assert text.feed(b"RF") == (PROTOCOL_TEXT, [])
+    assert text.feed(b"ID:1\nQR:2") == (PROTOCOL_TEXT, ["RFID:1"])
+    assert text.flush() == ["QR:2"]
+
+    binary = ConnectionReader()
+    payload = MAGIC + encode_scan_batch([("RFID", "A", 1, 0)])
+    assert binary.feed(payload[:2]) == (PROTOCOL_TEXT, [])
+    protocol, frames = binary.feed(payload[2:])
+    assert protocol == PROTOCOL_BINARY
+    assert frames[0].records[0].value == "A"
+
+
+class AckingForwarder(AsyncForwarderIngressServer):
+    """Umesto rutiranja u bazu samo beleži zapise; 'UNKNOWN' vrednost glumi nepoznat uredjaj"""
+
+    def __init__(self):
+        super().__init__("127.0.0.1", 0, flask_app=Flask(__name__), socketio=None, max_workers=2)
+        self.submitted = []
+        self._lock = threading.Lock()
+
+    def _submit_scan(self, ip, scan_type_str, scan_value, local_port=None):
+        with self._lock:
+            self.submitted.append((scan_type_str, scan_value))
+        return ACK_UNKNOWN_DEVICE if scan_value == "UNKNOWN" else ACK_ACCEPTED
+
+
+def _read_ack(sock):
+    header = b""
+    while len(header) < LENGTH_FIELD.size:
+        header += sock.recv(LENGTH_FIELD.size - len(header))
+    (length,) = LENGTH_FIELD.unpack(header)
+    body = b""
+    while len(body) < length:
+        body += sock.recv(length - len(body))
+    return decode_ack(header + body)
+
+
+def test_binary_connection_gets_batched_acks():
+    server = AckingForwarder()
+    server.start()
+    try:
+        with socket.create_connection(("127.0.0.1", server.bound_port), timeout=2) as s:
+            s.sendall(MAGIC + encode_heartbeat())
+            s.sendall(encode_scan_batch([("LPR", "BG1", 1, 0), ("RFID", "UNKNOWN", 2, 0), ("QR", "X", 3, 0)]))
+            assert _read_ack(s) == [(1, ACK_ACCEPTED), (2, ACK_UNKNOWN_DEVICE), (3, ACK_ACCEPTED)]
+
+            s.sendall(encode_scan_batch([("PIN", "1234", 4, 0)]))
+            assert _read_ack(s) == [(4, ACK_ACCEPTED)]
+
+        assert server.submitted == [("LPR", "BG1"), ("RFID", "UNKNOWN"), ("QR", "X"), ("PIN", "1234")]
+    finally:
+        server.stop()
+
+
+def test_text_connection_still_works():
+    server = AckingForwarder()
+    server.start()
+    try:
+        with socket.create_connection(("127.0.0.1", server.bound_port), timeout=2) as s:
+            s.sendall(b"RFID:TAG_1\nqr : 42\n")
+
+        deadline = time.time() + 3
+        while time.time() < deadline and len(server.submitted) < 2:
+            time.sleep(0.02)
+        assert server.submitted == [("RFID", "TAG_1"), ("QR", "42")]
+    finally:
+        server.stop()
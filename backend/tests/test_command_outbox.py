@@ -0,0 +1,85 @@
+# backend/tests/test_command_outbox.py
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.command_outbox import CommandOutbox, ACK_STATUS_ACKED, ACK_STATUS_FAILED, ACK_STATUS_DROPPED
+
+
+class Recorder:
+    def __init__(self):
+        self.results = []
+        self.done = threading.Event()
+
+    def __call__(self, command, status, message):
+        self.results.append((command.scan_log_id, status, command.attempts, message))
+        self.done.set()
+
+
+def test_enqueue_does_not_wait_for_slow_controller():
+    recorder = Recorder()
+
+    def slow_sender(ip, port):
+        time.sleep(0.3)
+        return True, "ACK:OPEN"
+
+    outbox = CommandOutbox(slow_sender, on_result=recorder, workers=1)
+    outbox.start()
+    try:
+        started = time.monotonic()
+        assert outbox.enqueue("10.0.0.5", 5005, gate_id=1, scan_log_id=42)
+        assert time.monotonic() - started < 0.05
+
+        assert recorder.done.wait(2)
+        assert recorder.results == [(42, ACK_STATUS_ACKED, 1, "ACK:OPEN")]
+        assert outbox.stats()["acked"] == 1
+    finally:
+        outbox.stop()
+
+
+def test_retries_until_controller_answers():
+    recorder = Recorder()
+    calls = []
+
+    def flaky_sender(ip, port):
+        calls.append(ip)
+        if len(calls) < 3:
+            return False, "Connection Refused"
+        return True, "ACK:OPEN"
+
+    outbox = CommandOutbox(flaky_sender, on_result=recorder, workers=1, deadline_seconds=5)
+    outbox.start()
+    try:
+        outbox.enqueue("10.0.0.6", 5005, scan_log_id=7)
+        assert recorder.done.wait(3)
+        assert recorder.results[0][:3] == (7, ACK_STATUS_ACKED, 3)
+        assert outbox.stats()["retries"] == 2
+    finally:
+        outbox.stop()
+
+
+def test_gives_up_at_deadline():
+    recorder = Recorder()
+    outbox = CommandOutbox(lambda ip, port: (False, "offline"), on_result=recorder,
+                           workers=1, deadline_seconds=0.5)
+    outbox.start()
+    try:
+        outbox.enqueue("10.0.0.7", 5005, scan_log_id=9)
+        assert recorder.done.wait(3)
+        scan_log_id, status, attempts, message = recorder.results[0]
+        assert (scan_log_id, status, message) == (9, ACK_STATUS_FAILED, "offline")
+        assert attempts >= 2
+    finally:
+        outbox.stop()
+
+
+def test_full_outbox_drops_and_reports():
+    recorder = Recorder()
+    outbox = CommandOutbox(lambda ip, port: (True, "ACK"), on_result=recorder, workers=1, capacity=1)
+    # Worker-i nisu startovani, red se puni
+    assert outbox.enqueue("10.0.0.8", 5005, scan_log_id=1)
+    assert outbox.enqueue("10.0.0.8", 5005, scan_log_id=2) is False
+    assert recorder.results == [(2, ACK_STATUS_DROPPED, 0, "Outbox full")]
@@ -0,0 +1,224 @@
+# backend/tests/test_controller_pool.py
+import socket
+import threading
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.controller_pool import ControllerConnectionPool
+
+
+class FakeController:
+    """Mock kontroler rampe: odgovara 'ACK:OPEN' na svaku komandu."""
+
+    def __init__(self, persistent=True, newline=True):
+        self.persistent = persistent
+        self.newline = newline
+        self.accepts = 0
+        self.commands = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepts += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        buf = b""
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(1024)
+                except OSError:
+                    return
+                if not data:
+                    return
+                buf += data
+                while b"\n" in buf:
+                    _, buf = buf.split(b"\n", 1)
+                    self.commands += 1
+                    conn.sendall(b"ACK:OPEN\n" if self.newline else b"ACK:OPEN")
+                    if not self.persistent:
+                        return
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def pool():
+    p = ControllerConnectionPool(ack_timeout=1.0, health_interval=60)
+    p.start()
+    yield p
+    p.stop()
+
+
+def test_commands_reuse_one_warm_connection(pool):
+    controller = FakeController()
+    try:
+        for _ in range(5):
+            ok, msg = pool.send_command("127.0.0.1", controller.port)
+            assert ok and msg == "ACK:OPEN"
+
+        assert controller.accepts == 1
+        stats = pool.stats()[0]
+        assert stats["acks"] == 5
+        assert stats["connects"] == 1
+        assert stats["rtt_avg_ms"] is not None
+    finally:
+        controller.close()
+
+
+def test_pipelined_commands_from_many_threads(pool):
+    controller = FakeController()
+    results = []
+    lock = threading.Lock()
+
+    def fire():
+        ok, _ = pool.send_command("127.0.0.1", controller.port)
+        with lock:
+            results.append(ok)
+
+    try:
+        threads = [threading.Thread(target=fire) for _ in range(20)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        assert results == [True] * 20
+        assert controller.commands == 20
+        assert controller.accepts == 1
+    finally:
+        controller.close()
+
+
+def test_one_shot_controller_still_works(pool):
+    # Stari firmware: odgovor bez '\n' pa zatvaranje konekcije
+    controller = FakeController(persistent=False, newline=False)
+    try:
+        for _ in range(3):
+            ok, msg = pool.send_command("127.0.0.1", controller.port)
+            assert ok and msg == "ACK:OPEN"
+        assert controller.accepts == 3
+    finally:
+        controller.close()
+
+
+def test_offline_controller_reports_refused(pool):
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+
+    ok, msg = pool.send_command("127.0.0.1", port)
+    assert not ok
+    assert "Connection Refused" in msg
+    assert pool.stats()[0]["errors"] == 1
+
+
+class SilentController(FakeController):
+    """Prihvata konekciju ali ne odgovara ni na sta (npr. zaglavljen firmware, half-open link)."""
+
+    def _serve(self, conn):
+        with conn:
+            while conn.recv(1024):
+                self.commands += 1
+
+
+def test_no_probe_without_payload(pool):
+    controller = FakeController()
+    try:
+        assert pool.send_command("127.0.0.1", controller.port)[0]
+        pool.probe_interval = 0
+        pool.check_links()
+
+        assert pool.stats()[0]["probes"] == 0
+        assert controller.commands == 1
+        # Mrtav link otkriva TCP keepalive
+        sock = pool._links[("127.0.0.1", controller.port)].sock
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+    finally:
+        controller.close()
+
+
+def test_idle_link_gets_probe(pool):
+    controller = FakeController()
+    try:
+        assert pool.send_command("127.0.0.1", controller.port)[0]
+        pool.probe_payload = b"CMD:STATUS\n"
+        pool.probe_interval = 0
+        pool.check_links()
+
+        stats = pool.stats()[0]
+        assert stats["probes"] == 1 and stats["probe_failures"] == 0
+        assert stats["state"] == "CONNECTED"
+        # Probe ne ulazi u statistiku komandi
+        assert stats["commands"] == 1 and stats["acks"] == 1
+        assert controller.commands == 2 and controller.accepts == 1
+    finally:
+        controller.close()
+
+
+def test_unanswered_probe_closes_link(pool):
+    controller = SilentController()
+    try:
+        pool.ack_timeout = 0.2
+        assert not pool.send_command("127.0.0.1", controller.port)[0]
+        # Keeper podize link posle greske, ali na probe i dalje nema odgovora
+        pool.probe_payload = b"CMD:STATUS\n"
+        pool.probe_interval = 0
+        pool.check_links()
+        assert pool.stats()[0]["state"] == "CONNECTED"
+        pool.check_links()
+
+        stats = pool.stats()[0]
+        assert stats["probe_failures"] == 1
+        assert stats["state"] == "DISCONNECTED"
+    finally:
+        controller.close()
+
+
+def test_unused_link_is_dropped_not_reconnected(pool):
+    controller = FakeController()
+    try:
+        assert pool.send_command("127.0.0.1", controller.port)[0]
+        pool.max_unused = 0
+        pool.check_links()
+        assert pool.stats() == []
+
+        pool.check_links()
+        assert controller.accepts == 1
+
+        # Sledeca komanda otvara link ponovo
+        pool.max_unused = 600
+        assert pool.send_command("127.0.0.1", controller.port)[0]
+        assert controller.accepts == 2
+    finally:
+        controller.close()
+
+
+def test_link_to_removed_device_is_dropped(pool):
+    controller = FakeController()
+    known = {"127.0.0.1"}
+    pool.is_known = lambda ip: ip in known
+    try:
+        assert pool.send_command("127.0.0.1", controller.port)[0]
+        pool.check_links()
+        assert len(pool.stats()) == 1
+
+        known.clear()
+        pool.check_links()
+        assert pool.stats() == []
+    finally:
+        controller.close()
@@ -0,0 +1,123 @@
+# backend/tests/test_credential_cache.py
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, Role
+from services.credential_cache import (
+    CredentialCache, CredentialSnapshot, UserSnapshot, RoleSnapshot, CREDENTIAL_CACHE
+)
+
+
+def make_snapshot(value, user_id=1):
+    role = RoleSnapshot(1, "Guest", False, False, False, True)
+    return CredentialSnapshot(10, "RFID", value, UserSnapshot(user_id, "Pera", "Peric", True, None, role))
+
+
+class CountingLoader:
+    def __init__(self, known):
+        self.known = known
+        self.calls = 0
+
+    def __call__(self, cred_type, cred_value):
+        self.calls += 1
+        return self.known.get(cred_value)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_positive_and_negative_entries_are_cached():
+    clock = FakeClock()
+    loader = CountingLoader({"TAG": make_snapshot("TAG")})
+    cache = CredentialCache(loader=loader, negative_ttl=30, clock=clock)
+
+    assert cache.resolve("RFID", "TAG").user.first_name == "Pera"
+    assert cache.resolve("RFID", "TAG").cred_value == "TAG"
+    assert cache.resolve("RFID", "HACKER") is None
+    assert cache.resolve("RFID", "HACKER") is None
+    assert loader.calls == 2
+
+    clock.now = 31
+    assert cache.resolve("RFID", "HACKER") is None
+    assert loader.calls == 3
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["negative_hits"], stats["misses"]) == (1, 1, 3)
+
+
+def test_lru_bound_and_invalidation():
+    loader = CountingLoader({f"T{i}": make_snapshot(f"T{i}", user_id=i) for i in range(3)})
+    cache = CredentialCache(loader=loader, max_entries=2)
+
+    cache.resolve("RFID", "T0")
+    cache.resolve("RFID", "T1")
+    cache.resolve("RFID", "T0")        # T0 postaje najskoriji
+    cache.resolve("RFID", "T2")        # izbacuje T1
+    assert cache.stats()["evicted"] == 1
+
+    calls = loader.calls
+    cache.resolve("RFID", "T0")
+    assert loader.calls == calls
+
+    cache.invalidate_user(0)
+    cache.resolve("RFID", "T0")
+    assert loader.calls == calls + 1
+
+    cache.invalidate_values(["T2"])
+    cache.resolve("RFID", "T2")
+    assert loader.calls == calls + 2
+
+
+def test_invalidation_during_load_is_not_overwritten():
+    cache = None
+
+    def loader(cred_type, cred_value):
+        # Admin promeni korisnika dok upit traje
+        cache.invalidate_user(1)
+        return make_snapshot(cred_value)
+
+    cache = CredentialCache(loader=loader)
+    cache.resolve("RFID", "TAG")
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.fixture
+def client(app):
+    role = Role(name="Guest")
+    db.session.add(role)
+    db.session.commit()
+    return app.test_client(), role.id
+
+
+def test_crud_routes_invalidate_cache(client):
+    http, role_id = client
+
+    # Sken pre registracije -> negativan unos
+    assert CREDENTIAL_CACHE.resolve("RFID", "NEW-CARD") is None
+
+    resp = http.post('/api/users/', json={
+        "first_name": "Mika", "last_name": "Mikic", "role_id": role_id,
+        "credentials": [{"type": "RFID", "value": "NEW-CARD"}]
+    })
+    assert resp.status_code == 201
+    user_id = resp.get_json()["id"]
+    assert CREDENTIAL_CACHE.resolve("RFID", "NEW-CARD").user.id == user_id
+
+    http.put(f'/api/users/{user_id}', json={"first_name": "Zika",
+                                            "credentials": [{"type": "RFID", "value": "NEW-CARD"}]})
+    assert CREDENTIAL_CACHE.resolve("RFID", "NEW-CARD").user.first_name == "Zika"
+
+    http.put(f'/api/roles/{role_id}', json={"can_ignore_capacity": True})
+    assert CREDENTIAL_CACHE.resolve("RFID", "NEW-CARD").user.role.can_ignore_capacity is True
+
+    http.delete(f'/api/users/{user_id}')
+    assert CREDENTIAL_CACHE.resolve("RFID", "NEW-CARD") is None
@@ -0,0 +1,143 @@
+# backend/tests/test_dashboard_state.py
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, Zone, Device
+from services.dashboard_state import DASHBOARD_STATE, DashboardState, DashboardStream, EVENT_DASHBOARD_DELTA
+from services.occupancy import OccupancyEngine
+from services.parking_service import ParkingLogicService
+
+
+def _setup(scenario, users=3):
+    complex_zone = Zone(name="Kompleks", capacity=100, occupancy=0)
+    db.session.add(complex_zone)
+    db.session.commit()
+    setup = scenario(users=users, parent_zone_id=complex_zone.id)
+    db.session.add(Device(name="Citac", ip_address="10.0.0.5", port=80, device_type="RFID_READER",
+                          gate_id=setup.gate.id))
+    db.session.commit()
+    return setup.gate.id, complex_zone.id, setup.zone.id
+
+
+def test_delta_carries_only_latest_zone_state(app, scenario):
+    gate_id, complex_id, garage_id = _setup(scenario)
+    DASHBOARD_STATE.load()
+    base = DASHBOARD_STATE.version
+
+    service = ParkingLogicService(None, occupancy=OccupancyEngine())
+    for i in range(3):
+        assert service.handle_scan(gate_id, "RFID", f"CARD-{i}")["allow"]
+    DASHBOARD_STATE.update_device("10.0.0.5", "ONLINE", "2026-01-01T10:00:00")
+
+    delta = DASHBOARD_STATE.changes_since(base)
+    assert delta["type"] == "delta" and delta["from_version"] == base
+    assert delta["version"] == DASHBOARD_STATE.version > base
+    # 3 skena x 2 zone na putanji -> po jedan unos po zoni, sa poslednjom vrednoscu
+    assert {z["id"]: z["occupancy"] for z in delta["zones"]} == {complex_id: 3, garage_id: 3}
+    assert [d["status"] for d in delta["devices"]] == ["ONLINE"]
+    assert [log["status"] for log in delta["logs"]] == ["ALLOWED"] * 3
+
+    # Klijent koji je vec na poslednjoj verziji dobija praznu deltu
+    latest = DASHBOARD_STATE.changes_since(DASHBOARD_STATE.version)
+    assert latest["zones"] == [] and latest["logs"] == []
+
+    # Nepromenjena vrednost ne pravi novu verziju
+    version = DASHBOARD_STATE.version
+    DASHBOARD_STATE.update_zone(garage_id, 3, 10)
+    assert DASHBOARD_STATE.version == version
+
+
+def test_old_or_unknown_version_falls_back_to_snapshot(app, scenario):
+    _, _, garage_id = _setup(scenario, users=0)
+    state = DashboardState(history=3)
+    state.load()
+    base = state.version
+    for occupancy in range(1, 6):
+        state.update_zone(garage_id, occupancy)
+
+    assert state.changes_since(base) is None                # istorijat ima samo 3 promene
+    assert state.changes_since(state.version - 3)["zones"][0]["occupancy"] == 5
+    assert state.changes_since(state.version + 1) is None   # verzija "iz buducnosti"
+    assert state.read(base)["type"] == "snapshot"
+
+    # Izmena infrastrukture: verzija raste, a stare delte vise ne vaze
+    version = state.version
+    state.invalidate()
+    assert state.changes_since(version) is None
+    snapshot = state.read(version)
+    assert snapshot["type"] == "snapshot" and snapshot["version"] > version
+
+
+def test_http_snapshot_then_delta(app, scenario):
+    gate_id, _, garage_id = _setup(scenario)
+    client = app.test_client()
+
+    snapshot = client.get("/api/gates/dashboard/state").get_json()
+    assert snapshot["type"] == "snapshot"
+    assert {z["name"] for z in snapshot["zones"]} == {"Kompleks", "Garaza"}
+    assert snapshot["gates"][0]["zone_to_id"] == garage_id
+    assert snapshot["devices"][0]["status"] == "OFFLINE"
+
+    service = ParkingLogicService(None)
+    assert service.handle_scan(gate_id, "RFID", "CARD-0")["allow"]
+
+    delta = client.get(f"/api/gates/dashboard/state?since={snapshot['version']}").get_json()
+    assert delta["type"] == "delta"
+    assert [(z["id"], z["occupancy"]) for z in delta["zones"]] == [(garage_id, 1)]
+    assert len(delta["logs"]) == 1
+
+    # Nova zona menja strukturu - klijent dobija snapshot
+    client.post("/api/infra/zones", json={"name": "Lobby", "capacity": 5})
+    resync = client.get(f"/api/gates/dashboard/state?since={delta['version']}").get_json()
+    assert resync["type"] == "snapshot"
+    assert "Lobby" in {z["name"] for z in resync["zones"]}
+
+
+def test_stream_sends_deltas_and_resync(app, scenario):
+    _, _, garage_id = _setup(scenario, users=0)
+    DASHBOARD_STATE.load()
+    sent = []
+    stream = DashboardStream(lambda event, payload, rooms: sent.append((event, payload)))
+    stream._sent_version = DASHBOARD_STATE.version
+
+    assert not stream.flush()
+    DASHBOARD_STATE.update_zone(garage_id, 1)
+    DASHBOARD_STATE.update_zone(garage_id, 2)
+    assert stream.flush()
+    event, delta = sent[-1]
+    assert event == EVENT_DASHBOARD_DELTA and delta["type"] == "delta"
+    assert [z["occupancy"] for z in delta["zones"]] == [2]
+
+    DASHBOARD_STATE.invalidate()
+    assert stream.flush()
+    assert sent[-1][1] == {"type": "resync", "version": DASHBOARD_STATE.version}
+    assert stream.deltas_sent == 1 and stream.resyncs_sent == 1
+
+
+def test_concurrent_first_reads_load_once():
+    state = DashboardState()
+    loads = []
+
+    def slow_load():
+        time.sleep(0.05)
+        loads.append(1)
+        state._loaded = True
+
+    state.load = slow_load
+    barrier = threading.Barrier(8)
+
+    def first_read():
+        barrier.wait()
+        state.ensure_loaded()
+
+    threads = [threading.Thread(target=first_read) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loads == [1]
@@ -0,0 +1,104 @@
+# backend/tests/test_debounce.py
+import threading
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.debounce import ScanDebouncer, parse_window_spec
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_duplicate_inside_window_is_suppressed_without_extending_it():
+    clock = FakeClock()
+    debouncer = ScanDebouncer(default_window=20, clock=clock)
+
+    assert debouncer.check_and_mark(1, "RFID", "TAG") is None
+    clock.now += 5
+    assert debouncer.check_and_mark(1, "RFID", "TAG") == 15
+    # Isti kod na drugom gejtu nije duplikat
+    assert debouncer.check_and_mark(2, "RFID", "TAG") is None
+
+    clock.now += 15
+    assert debouncer.check_and_mark(1, "RFID", "TAG") is None
+
+    stats = debouncer.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+
+
+def test_window_resolution_per_gate_and_type():
+    clock = FakeClock()
+    debouncer = ScanDebouncer(default_window=20, clock=clock)
+    debouncer.set_window(5, cred_type="LPR")
+    debouncer.set_window(10, gate_id=3)
+    debouncer.set_window(2, gate_id=3, cred_type="LPR")
+    debouncer.set_window(0, gate_id=4)
+
+    assert debouncer.window_for(1, "RFID") == 20
+    assert debouncer.window_for(1, "LPR") == 5
+    assert debouncer.window_for(3, "RFID") == 10
+    assert debouncer.window_for(3, "LPR") == 2
+
+    debouncer.check_and_mark(1, "LPR", "BG1")
+    debouncer.check_and_mark(1, "RFID", "TAG")
+    clock.now += 6
+    assert debouncer.check_and_mark(1, "LPR", "BG1") is None
+    assert debouncer.check_and_mark(1, "RFID", "TAG") is not None
+
+    # Prozor 0 = debounce iskljucen za gejt
+    assert debouncer.check_and_mark(4, "RFID", "TAG") is None
+    assert debouncer.check_and_mark(4, "RFID", "TAG") is None
+
+
+def test_expired_entries_are_dropped_and_size_is_bounded():
+    clock = FakeClock()
+    debouncer = ScanDebouncer(default_window=10, max_entries=3, clock=clock)
+
+    for i in range(3):
+        debouncer.check_and_mark(1, "RFID", f"T{i}")
+    clock.now += 1
+    debouncer.check_and_mark(1, "RFID", "T3")
+
+    stats = debouncer.stats()
+    assert stats["entries"] == 3
+    assert stats["evicted"] == 1
+    # Izbacen je najstariji unos
+    assert debouncer.check_and_mark(1, "RFID", "T0") is None
+
+    clock.now += 20
+    debouncer.check_and_mark(1, "RFID", "NEW")
+    assert debouncer.stats()["entries"] == 1
+
+
+def test_concurrent_scans_let_exactly_one_through():
+    debouncer = ScanDebouncer(default_window=20)
+    passed = []
+    barrier = threading.Barrier(8)
+
+    def scan():
+        barrier.wait()
+        if debouncer.check_and_mark(1, "RFID", "TAG") is None:
+            passed.append(1)
+
+    threads = [threading.Thread(target=scan) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(passed) == 1
+
+
+def test_parse_window_spec():
+    assert parse_window_spec("20, LPR=5, gate3=10, gate3:rfid=2") == [
+        (20.0, None, None), (5.0, None, "LPR"), (10.0, 3, None), (2.0, 3, "RFID")
+    ]
+    assert parse_window_spec("") == []
@@ -0,0 +1,63 @@
+# backend/tests/test_device_liveness.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.device_liveness import DeviceLivenessRegistry, STATUS_ONLINE, STATUS_OFFLINE
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_registry(timeout=30):
+    clock = FakeClock()
+    events = []
+    registry = DeviceLivenessRegistry(
+        timeout_seconds=timeout,
+        on_transition=lambda ip, status, last_seen: events.append((ip, status)),
+        clock=clock
+    )
+    return registry, clock, events
+
+
+def test_heartbeats_emit_only_on_transition():
+    registry, clock, events = make_registry()
+
+    for _ in range(10):
+        registry.touch("10.0.0.10")
+        clock.now += 5
+        registry.sweep()
+
+    assert events == [("10.0.0.10", STATUS_ONLINE)]
+    assert registry.is_online("10.0.0.10")
+
+
+def test_device_goes_offline_after_timeout_and_back():
+    registry, clock, events = make_registry(timeout=30)
+    registry.touch("10.0.0.11")
+
+    clock.now += 29
+    registry.sweep()
+    assert registry.is_online("10.0.0.11")
+
+    clock.now += 2
+    assert not registry.is_online("10.0.0.11")
+    registry.sweep()
+    registry.sweep()
+    assert events == [("10.0.0.11", STATUS_ONLINE), ("10.0.0.11", STATUS_OFFLINE)]
+
+    registry.touch("10.0.0.11")
+    assert events[-1] == ("10.0.0.11", STATUS_ONLINE)
+
+
+def test_count_online_ignores_unknown_devices():
+    registry, clock, _ = make_registry()
+    registry.touch("10.0.0.1")
+    registry.touch("10.0.0.2")
+    assert registry.count_online(["10.0.0.1", "10.0.0.2", "10.0.0.3"]) == 2
@@ -0,0 +1,60 @@
+# backend/tests/test_device_routing.py
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, Gate, Device
+from services.device_registry import DEVICE_ROUTES
+
+
+@pytest.fixture
+def client(app):
+    gate_a = Gate(name="Ulaz A")
+    gate_b = Gate(name="Ulaz B")
+    db.session.add_all([gate_a, gate_b])
+    db.session.commit()
+    DEVICE_ROUTES.reload()
+    yield app.test_client(), gate_a.id, gate_b.id
+    DEVICE_ROUTES.invalidate()
+
+
+def test_crud_keeps_routing_table_in_sync(client):
+    http, gate_a, gate_b = client
+    assert DEVICE_ROUTES.lookup("10.0.0.50") is None
+
+    resp = http.post('/api/devices/', json={
+        "name": "Kamera A", "ip_address": "10.0.0.50", "port": 5005,
+        "device_type": "LPR_CAMERA", "gate_id": gate_a
+    })
+    assert resp.status_code == 201
+    device_id = resp.get_json()["id"]
+
+    route = DEVICE_ROUTES.lookup("10.0.0.50")
+    assert route.gate_id == gate_a and route.device_id == device_id
+
+    http.put(f'/api/devices/{device_id}', json={"ip_address": "10.0.0.51", "gate_id": gate_b, "ingress_port": 5555})
+    assert DEVICE_ROUTES.lookup("10.0.0.50") is None
+    route = DEVICE_ROUTES.lookup("10.0.0.51", 5555)
+    assert route.gate_id == gate_b and route.ingress_port == 5555 and route.port == 5005
+
+    http.delete(f'/api/devices/{device_id}')
+    assert DEVICE_ROUTES.lookup("10.0.0.51") is None
+
+
+def test_lookup_prefers_exact_ingress_port_match(client):
+    http, gate_a, gate_b = client
+    # Komandni port je za oba uredjaja podrazumevani 5005 - rutira se po ingress portu
+    db.session.add_all([
+        Device(name="RFID", ip_address="10.0.0.60", ingress_port=5050, device_type="CONTROLLER", gate_id=gate_a),
+        Device(name="LPR", ip_address="10.0.0.60", ingress_port=5555, device_type="LPR_CAMERA", gate_id=gate_b),
+    ])
+    db.session.commit()
+    DEVICE_ROUTES.reload()
+
+    assert DEVICE_ROUTES.lookup("10.0.0.60").gate_id == gate_a
+    assert DEVICE_ROUTES.lookup("10.0.0.60", 5555).gate_id == gate_b
+    assert DEVICE_ROUTES.lookup("10.0.0.60", 9999).gate_id == gate_a
+    assert DEVICE_ROUTES.lookup("10.0.0.60", 5005).gate_id == gate_a
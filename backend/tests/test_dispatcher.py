@@ -0,0 +1,93 @@
+# backend/tests/test_dispatcher.py
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.dispatcher import GateDispatcher
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_per_gate_order_and_bounded_concurrency():
+    seen = {}
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def handler(gate_id, seq):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.002)
+        with lock:
+            seen.setdefault(gate_id, []).append(seq)
+            active["now"] -= 1
+
+    dispatcher = GateDispatcher(handler, workers=3)
+    dispatcher.start()
+    try:
+        for seq in range(30):
+            for gate_id in (1, 2, 3, 4, 5):
+                assert dispatcher.submit(gate_id, seq)
+
+        assert wait_for(lambda: dispatcher.stats()["processed"] == 150)
+        for gate_id in (1, 2, 3, 4, 5):
+            assert seen[gate_id] == list(range(30))
+        assert active["peak"] <= 3
+        assert dispatcher.stats()["pending"] == 0
+    finally:
+        dispatcher.stop()
+
+
+def test_backpressure_rejects_when_saturated():
+    release = threading.Event()
+
+    def handler(gate_id, seq):
+        release.wait(2)
+
+    dispatcher = GateDispatcher(handler, workers=1, max_pending=2, submit_timeout=0.05)
+    dispatcher.start()
+    try:
+        assert dispatcher.submit(1, 0)
+        assert dispatcher.submit(1, 1)
+        # Redovi su puni, submit ceka pa odbija
+        assert dispatcher.submit(2, 2) is False
+
+        stats = dispatcher.stats()
+        assert stats["rejected"] == 1
+        assert stats["backpressure_waits"] == 1
+        assert stats["max_pending_seen"] == 2
+
+        release.set()
+        assert wait_for(lambda: dispatcher.stats()["processed"] == 2)
+    finally:
+        release.set()
+        dispatcher.stop()
+
+
+def test_handler_failure_does_not_block_gate():
+    calls = []
+
+    def handler(gate_id, seq):
+        calls.append(seq)
+        if seq == 0:
+            raise RuntimeError("DB down")
+
+    dispatcher = GateDispatcher(handler, workers=1)
+    dispatcher.start()
+    try:
+        dispatcher.submit(7, 0)
+        dispatcher.submit(7, 1)
+        assert wait_for(lambda: len(calls) == 2)
+        assert wait_for(lambda: dispatcher.stats()["failed"] == 1 and dispatcher.stats()["processed"] == 1)
+    finally:
+        dispatcher.stop()
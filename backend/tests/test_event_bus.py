@@ -0,0 +1,84 @@
+# backend/tests/test_event_bus.py
+import sys
+import os
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.event_bus import RealtimeEventBus
+from services.occupancy import OccupancyEngine
+from services.parking_service import ParkingLogicService
+from services.realtime_rooms import SUBSCRIPTIONS, ROOM_ALL
+
+
+class BlockingSocketIO:
+    """Spor dashboard: emit ceka dok test ne pusti."""
+
+    def __init__(self):
+        self.events = []
+        self.release = threading.Event()
+        self.entered = threading.Event()
+
+    def emit(self, event, payload, to=None, namespace=None):
+        self.entered.set()
+        self.release.wait(timeout=5)
+        self.events.append(event)
+
+
+@pytest.fixture(autouse=True)
+def dashboard():
+    SUBSCRIPTIONS.reset()
+    SUBSCRIPTIONS.join("dashboard", [ROOM_ALL])
+    yield
+    SUBSCRIPTIONS.reset()
+
+
+def test_overload_samples_scan_events_and_keeps_state_events():
+    socketio = BlockingSocketIO()
+    socketio.release.set()
+    bus = RealtimeEventBus(socketio, capacity=10, high_water=0.5, sample_every=3)
+
+    for _ in range(5):
+        assert bus.publish("access_log", {})
+    # Iznad high-water: prolazi svaki treci access_log, device_status uvek
+    kept = [bus.publish("access_log", {}) for _ in range(6)]
+    assert kept == [True, False, False, True, False, False]
+    assert bus.publish("device_status", {})
+    assert bus.publish("access_log", {})      # 7. iznad high-water -> prolazi (depth 9)
+    assert bus.publish("device_status", {})   # depth 10 = kapacitet
+    # Pun red: odbacuje se i ono sto se inace ne uzorkuje
+    assert not bus.publish("device_status", {})
+
+    stats = bus.stats()
+    assert stats["depth"] == 10
+    assert stats["events"]["access_log"] == {"published": 12, "sent": 0, "sampled_out": 4, "dropped": 0}
+    assert stats["events"]["device_status"]["dropped"] == 1
+
+    assert bus.drain() == 10
+    assert socketio.events.count("access_log") == 8
+    assert bus.stats()["events"]["device_status"]["sent"] == 2
+
+
+@pytest.mark.parametrize("use_engine", [True, False])
+def test_stalled_dashboard_does_not_block_decisions(scenario, use_engine):
+    gate = scenario(users=3).gate
+
+    socketio = BlockingSocketIO()
+    bus = RealtimeEventBus(socketio)
+    bus.start()
+    service = ParkingLogicService(socketio, occupancy=OccupancyEngine() if use_engine else None, events=bus)
+    try:
+        # Prvi emit zaglavi emiter thread; odluke i dalje prolaze
+        for i in range(3):
+            assert service.handle_scan(gate.id, "RFID", f"CARD-{i}")["allow"]
+        assert socketio.entered.wait(timeout=2)
+        assert socketio.events == []
+    finally:
+        socketio.release.set()
+        bus.stop()
+
+    assert socketio.events.count("access_log") == 3
+    assert socketio.events.count("occupancy_update") == 3
+    assert bus.stats()["depth"] == 0
@@ -0,0 +1,118 @@
+# backend/tests/test_forwarder_async.py
+import socket
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.forwarder_async import AsyncForwarderIngressServer
+from services.forwarder_tcp import ListenerSpec, LISTENER_DATA, LISTENER_STATUS
+from services.device_liveness import DEVICE_LIVENESS
+
+
+class RecordingForwarder(AsyncForwarderIngressServer):
+    """Umesto baze samo beleži šta je stiglo i iz kog thread-a"""
+
+    def __init__(self, **kwargs):
+        super().__init__("127.0.0.1", 0, flask_app=None, socketio=None, **kwargs)
+        self.received = []
+        self.listener_types = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def process_batch(self, ip, messages, listener=None):
+        with self._lock:
+            for raw_message in messages:
+                self.received.append((ip, raw_message))
+                self.listener_types.append(listener.cred_type if listener else None)
+            self.threads.add(threading.current_thread().name)
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_many_connections_share_bounded_executor():
+    server = RecordingForwarder(max_workers=2)
+    server.start()
+    try:
+        for i in range(20):
+            with socket.create_connection(("127.0.0.1", server.bound_port), timeout=2) as s:
+                s.sendall(f"RFID:TAG_{i}".encode())
+
+        assert wait_for(lambda: len(server.received) == 20)
+        assert {msg for _, msg in server.received} == {f"RFID:TAG_{i}" for i in range(20)}
+        assert all(ip == "127.0.0.1" for ip, _ in server.received)
+        # Odluke se izvrsavaju samo u decision pool-u (max 2 thread-a)
+        assert len(server.threads) <= 2
+        assert all(name.startswith("decision") for name in server.threads)
+    finally:
+        server.stop()
+
+
+def test_messages_on_one_connection_stay_ordered():
+    server = RecordingForwarder(max_workers=4)
+    server.start()
+    try:
+        with socket.create_connection(("127.0.0.1", server.bound_port), timeout=2) as s:
+            for i in range(5):
+                s.sendall(f"QR:{i}\n".encode())
+                time.sleep(0.05)
+
+        assert wait_for(lambda: len(server.received) == 5)
+        assert [msg for _, msg in server.received] == [f"QR:{i}" for i in range(5)]
+    finally:
+        server.stop()
+
+
+def test_coalesced_scans_are_split():
+    server = RecordingForwarder(max_workers=1)
+    server.start()
+    try:
+        with socket.create_connection(("127.0.0.1", server.bound_port), timeout=2) as s:
+            # Tri skena u jednom send-u (kao kad TCP spoji pakete) + poslednji bez '\n'
+            s.sendall(b"RFID:A\nLPR:BG-1\nQR:7\nRFID:B")
+
+        assert wait_for(lambda: len(server.received) == 4)
+        assert [msg for _, msg in server.received] == ["RFID:A", "LPR:BG-1", "QR:7", "RFID:B"]
+    finally:
+        server.stop()
+
+
+def test_multi_port_status_and_typed_listeners():
+    listeners = [
+        ListenerSpec(0, LISTENER_DATA),
+        ListenerSpec(0, LISTENER_STATUS),
+        ListenerSpec(0, LISTENER_DATA, "LPR"),
+    ]
+    server = RecordingForwarder(listeners=listeners)
+    DEVICE_LIVENESS.reset()
+    server.start()
+    try:
+        data_port, status_port, lpr_port = server.bound_ports
+        assert len({data_port, status_port, lpr_port}) == 3
+
+        # STATUS port: nista ne ide u obradu skenova, samo liveness
+        with socket.create_connection(("127.0.0.1", status_port), timeout=2) as s:
+            s.sendall(b"HEARTBEAT\n")
+        assert wait_for(lambda: DEVICE_LIVENESS.is_online("127.0.0.1"))
+
+        # LPR port: raw tablica bez prefiksa, tip dolazi iz porta
+        with socket.create_connection(("127.0.0.1", lpr_port), timeout=2) as s:
+            s.sendall(b"BG-123-AA\n")
+
+        assert wait_for(lambda: len(server.received) == 1)
+        assert server.received == [("127.0.0.1", "BG-123-AA")]
+        assert server.listener_types == ["LPR"]
+    finally:
+        server.stop()
+        DEVICE_LIVENESS.on_transition = None
+        DEVICE_LIVENESS.stop()
+        DEVICE_LIVENESS.reset()
@@ -0,0 +1,59 @@
+# backend/tests/test_forwarder_tcp.py
+import socket
+import threading
+import time
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.forwarder_tcp import ForwarderIngressServer, ListenerSpec, LISTENER_DATA, LISTENER_STATUS
+
+
+class RecordingForwarder(ForwarderIngressServer):
+    """Threaded Forwarder koji umesto baze samo beleži šta je stiglo"""
+
+    def __init__(self, **kwargs):
+        super().__init__("127.0.0.1", 0, flask_app=None, socketio=None, **kwargs)
+        self.received = []
+        self._lock = threading.Lock()
+
+    def process_batch(self, ip, messages, listener=None):
+        with self._lock:
+            self.received.extend(messages)
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_stop_closes_listeners_and_open_connections():
+    server = RecordingForwarder(listeners=[ListenerSpec(0, LISTENER_DATA), ListenerSpec(0, LISTENER_STATUS)])
+    port = server.start()
+    assert port and None not in server.bound_ports
+
+    # Uredjaj drzi konekciju otvorenu; poslednja poruka je bez '\n'
+    device = socket.create_connection(("127.0.0.1", port), timeout=2)
+    device.sendall(b"RFID:TAG_1\nRFID:TAG_2")
+    assert wait_for(lambda: server.received == ["RFID:TAG_1"])
+    assert wait_for(lambda: len(server._clients) == 1)
+
+    server.stop()
+    try:
+        assert not any(t.is_alive() for t in server._accept_threads)
+        assert server._clients == {}
+        # Konekcija je zatvorena sa nase strane, a nekompletna poruka obradjena pre izlaska
+        assert device.recv(16) == b""
+        assert server.received == ["RFID:TAG_1", "RFID:TAG_2"]
+    finally:
+        device.close()
+
+    with pytest.raises(OSError):
+        socket.create_connection(("127.0.0.1", port), timeout=1).close()
@@ -0,0 +1,59 @@
+# backend/tests/test_framing.py
+import struct
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.framing import StreamFramer, FRAMING_LENGTH
+
+
+def test_newline_coalesced_messages_split():
+    framer = StreamFramer()
+    assert framer.feed(b"RFID:A\nRFID:B\r\nQR:1\n") == ["RFID:A", "RFID:B", "QR:1"]
+    assert framer.pending_bytes == 0
+
+
+def test_newline_partial_message_reassembled():
+    framer = StreamFramer()
+    assert framer.feed(b"LPR:BG-12") == []
+    assert framer.feed(b"3-AA\nRFID:") == ["LPR:BG-123-AA"]
+    assert framer.feed(b"X\n") == ["RFID:X"]
+
+
+def test_newline_flush_returns_unterminated_tail():
+    framer = StreamFramer()
+    assert framer.feed(b"RFID:OLD_FIRMWARE") == []
+    assert framer.flush() == ["RFID:OLD_FIRMWARE"]
+    assert framer.flush() == []
+
+
+def test_empty_lines_skipped():
+    framer = StreamFramer()
+    assert framer.feed(b"\n\n  \nQR:5\n") == ["QR:5"]
+
+
+def test_oversized_frame_discarded():
+    framer = StreamFramer(max_frame_bytes=16)
+    assert framer.feed(b"X" * 32) == []
+    assert framer.pending_bytes == 0
+    assert framer.feed(b"QR:1\n") == ["QR:1"]
+
+
+def test_length_prefixed_split_across_reads():
+    framer = StreamFramer(FRAMING_LENGTH)
+    first = b"RFID:A"
+    second = b"LPR:" + b"9" * 300
+    stream = struct.pack("!I", len(first)) + first + struct.pack("!I", len(second)) + second
+
+    assert framer.feed(stream[:3]) == []
+    assert framer.feed(stream[3:20]) == ["RFID:A"]
+    assert framer.feed(stream[20:]) == [second.decode()]
+    assert framer.flush() == []
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        StreamFramer("xml")
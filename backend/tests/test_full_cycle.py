@@ -94,7 +94,7 @@ def run_full_cycle_simulation():
         print(f"\n{Colors.OKBLUE}[2] ATTEMPTING ENTRY...{Colors.ENDC}")
         # Reset cache-a
         import services.parking_service
-        services.parking_service.SCAN_CACHE = {}
+        services.parking_service.SCAN_DEBOUNCE.reset()
 
         result = service.handle_scan(entry_id, "RFID", cred_val)
         
@@ -120,7 +120,7 @@ def run_full_cycle_simulation():
         # --- 3. POKUŠAJ PREVARE (PASSBACK) ---
         print(f"\n{Colors.OKBLUE}[3] ATTEMPTING PASSBACK (Scanning Entry again)...{Colors.ENDC}")
         # Moramo očistiti keš da ne bi dobili DEBOUNCE
-        services.parking_service.SCAN_CACHE = {} 
+        services.parking_service.SCAN_DEBOUNCE.reset() 
 
         result = service.handle_scan(entry_id, "RFID", cred_val)
         
@@ -136,7 +136,7 @@ def run_full_cycle_simulation():
 
         # --- 5. IZLAZAK (EXIT) ---
         print(f"\n{Colors.OKBLUE}[5] ATTEMPTING EXIT...{Colors.ENDC}")
-        services.parking_service.SCAN_CACHE = {} 
+        services.parking_service.SCAN_DEBOUNCE.reset() 
         
         result = service.handle_scan(exit_id, "RFID", cred_val)
         
@@ -164,7 +164,7 @@ def run_full_cycle_simulation():
 
         # --- 6. POVRATAK (RE-ENTRY) ---
         print(f"\n{Colors.OKBLUE}[6] ATTEMPTING RE-ENTRY (Next Day)...{Colors.ENDC}")
-        services.parking_service.SCAN_CACHE = {} 
+        services.parking_service.SCAN_DEBOUNCE.reset() 
 
         result = service.handle_scan(entry_id, "RFID", cred_val)
         
@@ -0,0 +1,107 @@
+# backend/tests/test_group_commit.py
+import threading
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, ParkingSession, ScanLog, CredentialType
+from services.group_commit import GroupCommitter
+from services.occupancy import OccupancyEngine
+from services.parking_service import ParkingLogicService
+
+
+@pytest.fixture
+def committer(app):
+    committer = GroupCommitter(app, window_ms=50)
+    committer.start()
+    yield committer
+    committer.stop()
+
+
+def _log_unit(payload):
+    def unit(session):
+        log = ScanLog(gate_name_snapshot="Ulaz", scan_type=CredentialType.RFID, raw_payload=payload,
+                      is_access_granted=True)
+        session.add(log)
+        session.flush()
+        return log.id
+    return unit
+
+
+def test_concurrent_units_share_one_commit(app, committer):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker(i):
+        barrier.wait()
+        results.append(committer.execute(_log_unit(f"CARD-{i}")))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(results)) == 8
+    assert ScanLog.query.count() == 8
+    stats = committer.stats()
+    assert stats["units"] == 8
+    assert stats["batches"] < 8
+    assert stats["max_batch_seen"] > 1
+
+
+def test_failing_unit_does_not_drop_the_batch(app, committer):
+    def broken(session):
+        raise ValueError("los unit")
+
+    good = committer.submit(_log_unit("CARD-1"))
+    bad = committer.submit(broken)
+    other = committer.submit(_log_unit("CARD-2"))
+
+    assert good.result(timeout=2) and other.result(timeout=2)
+    with pytest.raises(ValueError):
+        bad.result(timeout=2)
+    assert ScanLog.query.count() == 2
+    assert committer.stats()["fallbacks"] == 1
+    assert committer.stats()["failed_units"] == 1
+
+
+def test_granted_scan_is_committed_through_committer(scenario, committer):
+    setup = scenario()
+    entry, user = setup.gate, setup.users[0]
+
+    engine = OccupancyEngine()
+    service = ParkingLogicService(None, occupancy=engine, committer=committer)
+    result = service.handle_scan(entry.id, "RFID", "CARD-0")
+
+    assert result["allow"]
+    # Sesija i ScanLog o odobrenju su upisani jednim unit-om
+    assert committer.stats()["units"] == 1
+    db.session.expire_all()
+    log = db.session.get(ScanLog, result["scan_log_id"])
+    assert log.is_access_granted
+    assert ParkingSession.query.filter_by(user_id=user.id, exit_time=None).count() == 1
+
+
+def test_timed_out_unit_is_cancelled_not_committed_later(scenario, app):
+    setup = scenario()
+    entry, zone = setup.gate, setup.zone
+
+    # Committer thread jos ne radi - unit ostaje u redu duze od ack_timeout-a
+    committer = GroupCommitter(app, window_ms=1, ack_timeout=0.05)
+    engine = OccupancyEngine()
+    service = ParkingLogicService(None, occupancy=engine, committer=committer)
+    assert service.handle_scan(entry.id, "RFID", "CARD-0")["reason"] == "SYSTEM_ERROR"
+    assert engine.zone_counters(zone.id)[0] == 0
+
+    committer.start()
+    try:
+        # Sledeci unit prolazi kroz isti red, pa je otkazani sigurno vec preskocen
+        committer.execute(lambda session: None)
+    finally:
+        committer.stop()
+    assert ParkingSession.query.count() == 0
+    assert committer.stats()["cancelled_units"] == 1
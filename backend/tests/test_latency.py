@@ -0,0 +1,66 @@
+# backend/tests/test_latency.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.latency import LatencyHistogram, LatencyRegistry, PIPELINE_DECISION
+from services.parking_service import ParkingLogicService
+
+
+def test_histogram_percentiles_are_bucketed():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["max_ms"] == 100.0
+    # Greska bucket-a je najvise 20%
+    assert 50 <= summary["p50_ms"] <= 60
+    assert 95 <= summary["p95_ms"] <= 100
+    assert 99 <= summary["p99_ms"] <= 100
+
+
+def test_registry_groups_by_gate_and_outcome():
+    registry = LatencyRegistry()
+    for gate_id, outcome in [(1, "ACCESS_GRANTED"), (1, "ACCESS_GRANTED"), (2, "CAPACITY_FULL")]:
+        timer = registry.start(PIPELINE_DECISION)
+        with timer.stage("validate"):
+            pass
+        registry.finish(timer, gate_id, outcome)
+
+    snapshot = registry.snapshot()["pipelines"][PIPELINE_DECISION]
+    assert snapshot["stages"]["validate"]["count"] == 3
+    assert snapshot["by_gate"]["1"]["ACCESS_GRANTED"]["total"]["count"] == 2
+
+    only_gate_2 = registry.snapshot(gate_id=2)["pipelines"][PIPELINE_DECISION]
+    assert list(only_gate_2["by_gate"]) == ["2"]
+    assert only_gate_2["stages"]["total"]["count"] == 1
+
+    registry.reset()
+    assert registry.snapshot()["pipelines"] == {}
+
+
+def test_handle_scan_records_stages_and_endpoint(scenario, app):
+    gate = scenario().gate
+
+    service = ParkingLogicService(None)
+    assert service.handle_scan(gate.id, "RFID", "CARD-0")["allow"]
+    assert service.handle_scan(gate.id, "RFID", "NEPOZNATA")["reason"] == "UNKNOWN_CREDENTIAL"
+
+    client = app.test_client()
+    decision = client.get(f"/api/system/latency?gate_id={gate.id}").get_json()["pipelines"][PIPELINE_DECISION]
+    granted = decision["by_gate"][str(gate.id)]["ACCESS_GRANTED"]
+    for stage in ("debounce", "gate_load", "credential", "zone_load", "rule_fetch",
+                  "session_lookup", "validate", "transaction", "total"):
+        assert granted[stage]["count"] == 1
+    # Nepoznata kartica se odbija posle provere kredencijala
+    unknown = decision["by_gate"][str(gate.id)]["UNKNOWN_CREDENTIAL"]
+    assert "validate" not in unknown and unknown["credential"]["count"] == 1
+
+    filtered = client.get("/api/system/latency?outcome=ACCESS_GRANTED").get_json()["pipelines"][PIPELINE_DECISION]
+    assert filtered["stages"]["total"]["count"] == 1
+
+    assert client.post("/api/system/latency/reset").status_code == 200
+    assert client.get("/api/system/latency").get_json()["pipelines"] == {}
@@ -31,7 +31,10 @@ def service(test_app):
     svc = ParkingLogicService(socketio)
     # Resetujemo globalni keš u servisu
     import services.parking_service
-    services.parking_service.SCAN_CACHE = {} 
+    services.parking_service.SCAN_DEBOUNCE.reset() 
+    # Tabele se brisu pre svakog testa, pa ID-evi i vrednosti kartica se ponavljaju
+    services.parking_service.CREDENTIAL_CACHE.reset()
+    services.parking_service.RULE_INDEX.invalidate()
     return svc
 
 @pytest.fixture
@@ -0,0 +1,258 @@
+# backend/tests/test_occupancy.py
+import threading
+import time
+import sys
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, User, Zone, Gate, Tenant, Credential, ParkingSession, Role, ValidationRule, RuleScope, RuleType
+from services.occupancy import OccupancyEngine, OCCUPANCY
+from services.parking_service import ParkingLogicService
+
+
+def test_admit_is_atomic_under_contention():
+    engine = OccupancyEngine()
+    engine.track_zone(SimpleNamespace(id=1, capacity=10, occupancy=0))
+
+    results = []
+    barrier = threading.Barrier(50)
+
+    def enter():
+        barrier.wait()
+        results.append(engine.admit(1, None, None)[0])
+
+    threads = [threading.Thread(target=enter) for _ in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 10
+    assert engine.zone_counters(1) == (10, 10)
+    assert engine.stats()["rejected"] == 40
+
+
+def test_lazy_recover_runs_once_for_concurrent_first_scans():
+    engine = OccupancyEngine()
+    recovered = []
+
+    def slow_recover():
+        time.sleep(0.05)
+        recovered.append(1)
+        engine._loaded = True
+
+    engine.recover = slow_recover
+    barrier = threading.Barrier(8)
+
+    def first_scan():
+        barrier.wait()
+        engine.ensure_loaded()
+
+    threads = [threading.Thread(target=first_scan) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert recovered == [1]
+
+
+def test_transit_exit_and_revert():
+    engine = OccupancyEngine()
+    engine.track_zone(SimpleNamespace(id=1, capacity=5, occupancy=1))
+    engine.track_zone(SimpleNamespace(id=2, capacity=1, occupancy=0))
+
+    ok, _, change = engine.admit(2, 1, None)
+    assert ok and engine.zone_counters(1)[0] == 0 and engine.zone_counters(2)[0] == 1
+
+    # Ciljna zona puna, ali provera kapaciteta je iskljucena (VIP)
+    assert engine.admit(2, None, None)[1] == "ZONE_FULL"
+    assert engine.admit(2, None, None, check_zone=False)[0]
+
+    engine.revert(change)
+    assert engine.zone_counters(1)[0] == 1 and engine.zone_counters(2)[0] == 1
+
+    # Izlaz iz prazne zone ne ide ispod nule, pa ni revert ne dodaje nista
+    ok, _, change = engine.admit(None, 1, None)
+    ok, _, change = engine.admit(None, 1, None)
+    assert engine.zone_counters(1)[0] == 0
+    engine.revert(change)
+    assert engine.zone_counters(1)[0] == 0
+
+
+def _setup(scenario, quota=5):
+    tenant = Tenant(name="Firma", quota_limit=quota, current_usage=0)
+    db.session.add(tenant)
+    db.session.commit()
+
+    setup = scenario(users=3, capacity=2, tenant_id=tenant.id)
+    exit_gate = Gate(name="Izlaz", zone_from_id=setup.zone.id)
+    db.session.add_all([
+        exit_gate,
+        ValidationRule(rule_type=RuleType.CHECK_CAPACITY, scope=RuleScope.GLOBAL),
+        ValidationRule(rule_type=RuleType.CHECK_ANTIPASSBACK, scope=RuleScope.GLOBAL),
+    ])
+    db.session.commit()
+    return setup.zone.id, tenant.id, setup.gate.id, exit_gate.id, setup.users
+
+
+def test_recover_counts_active_sessions(scenario):
+    zone_id, tenant_id, entry_id, _, users = _setup(scenario)
+    cred = Credential.query.filter_by(user_id=users[0].id).first()
+    db.session.add(ParkingSession(user_id=users[0].id, credential_id=cred.id, entry_gate_id=entry_id,
+                                  entry_time=datetime.now()))
+    # Zatvorena sesija se ne broji
+    db.session.add(ParkingSession(user_id=users[1].id, credential_id=cred.id, entry_gate_id=entry_id,
+                                  entry_time=datetime.now(), exit_time=datetime.now()))
+    db.session.commit()
+
+    engine = OccupancyEngine()
+    engine.recover()
+    assert engine.zone_counters(zone_id) == (1, 2)
+    assert engine.tenant_counters(tenant_id) == (1, 5)
+
+
+def test_scans_use_engine_and_flush_write_behind(app, scenario):
+    zone_id, tenant_id, entry_id, exit_id, _ = _setup(scenario)
+    engine = OccupancyEngine()
+    engine.app = app
+    service = ParkingLogicService(None, occupancy=engine)
+
+    assert service.handle_scan(entry_id, "RFID", "CARD-0")["allow"]
+    assert service.handle_scan(entry_id, "RFID", "CARD-1")["allow"]
+    assert service.handle_scan(entry_id, "RFID", "CARD-2")["reason"] == "ZONE_FULL"
+    assert engine.zone_counters(zone_id)[0] == 2
+
+    # Baza se ne menja na svaki sken, vec pri flush-u
+    assert db.session.get(Zone, zone_id).occupancy == 0
+    assert engine.flush() == 2
+    db.session.expire_all()
+    assert db.session.get(Zone, zone_id).occupancy == 2
+    assert db.session.get(Tenant, tenant_id).current_usage == 2
+
+    assert service.handle_scan(exit_id, "RFID", "CARD-0")["allow"]
+    assert engine.zone_counters(zone_id)[0] == 1
+    assert engine.tenant_counters(tenant_id)[0] == 1
+
+
+def _tree_engine():
+    """Aerodrom (3) -> Sluzbeni (2) -> VIP (1), plus Javna (5) direktno ispod Aerodroma."""
+    engine = OccupancyEngine()
+    engine.track_zone(SimpleNamespace(id=1, capacity=3, occupancy=0, parent_zone_id=None, name="Aerodrom"))
+    engine.track_zone(SimpleNamespace(id=2, capacity=2, occupancy=0, parent_zone_id=1, name="Sluzbeni"))
+    engine.track_zone(SimpleNamespace(id=3, capacity=1, occupancy=0, parent_zone_id=2, name="VIP"))
+    engine.track_zone(SimpleNamespace(id=4, capacity=5, occupancy=0, parent_zone_id=1, name="Javna"))
+    return engine
+
+
+def test_rollup_updates_every_ancestor():
+    engine = _tree_engine()
+    assert engine.zone_path(3) == (3, 2, 1)
+
+    ok, _, change = engine.admit(3, None, None)
+    assert ok and set(change.zone_ids) == {1, 2, 3}
+    assert [engine.zone_counters(z)[0] for z in (1, 2, 3, 4)] == [1, 1, 1, 0]
+
+    # Tranzit VIP -> Javna: zajednicki predak (Aerodrom) se ne menja
+    ok, _, change = engine.admit(4, 3, None)
+    assert dict(change.zone_deltas) == {4: 1, 3: -1, 2: -1}
+    # U bazu ide samo prelazak iz zone u zonu - zbir po stablu je samo u memoriji
+    assert dict(change.own_deltas) == {4: 1, 3: -1}
+    assert [engine.zone_counters(z)[0] for z in (1, 2, 3, 4)] == [1, 0, 0, 1]
+
+    engine.revert(change)
+    assert [engine.zone_counters(z)[0] for z in (1, 2, 3, 4)] == [1, 1, 1, 0]
+
+    # Izlaz iz VIP-a direktno napolje prazni celu putanju
+    engine.admit(None, 3, None)
+    assert [engine.zone_counters(z)[0] for z in (1, 2, 3, 4)] == [0, 0, 0, 0]
+
+
+def test_capacity_is_checked_on_the_whole_path():
+    engine = _tree_engine()
+    assert engine.admit(4, None, None)[0]
+    assert engine.admit(4, None, None)[0]
+    # Javna ima mesta (2/5), ali Aerodrom ce biti pun (3/3) posle sledeceg
+    assert engine.admit(2, None, None)[0]
+    assert engine.first_full_zone(4) == 1
+    assert engine.admit(4, None, None)[1] == "ZONE_FULL"
+    # Tranzit unutar punog korena je dozvoljen - vozilo ostaje u Aerodromu
+    assert engine.first_full_zone(4, 2) is None
+    assert engine.admit(4, 2, None)[0]
+
+
+def test_recover_rolls_up_and_dashboard_tree(app):
+    root = Zone(name="Aerodrom", capacity=10, occupancy=0)
+    db.session.add(root)
+    db.session.commit()
+    child = Zone(name="Sluzbeni", capacity=4, occupancy=0, parent_zone_id=root.id)
+    db.session.add(child)
+    db.session.commit()
+    role = Role(name="Guest")
+    db.session.add(role)
+    db.session.commit()
+    gate = Gate(name="Ulaz", zone_to_id=child.id)
+    user = User(first_name="U", last_name="0", role_id=role.id)
+    db.session.add_all([gate, user])
+    db.session.flush()
+    cred = Credential(user_id=user.id, cred_type="RFID", cred_value="CARD-0")
+    db.session.add(cred)
+    db.session.flush()
+    db.session.add(ParkingSession(user_id=user.id, credential_id=cred.id, entry_gate_id=gate.id,
+                                  entry_time=datetime.now(), zone_id=child.id))
+    db.session.commit()
+
+    engine = OccupancyEngine()
+    engine.recover()
+    assert engine.zone_counters(root.id)[0] == 1
+    assert engine.zone_counters(child.id)[0] == 1
+    assert engine.stats()["vehicles_inside"] == 1
+
+    # Zone.occupancy zadrzava znacenje iz DB moda: vozila bas u toj zoni
+    engine.app = app
+    assert engine.flush() == 2
+    db.session.expire_all()
+    assert (db.session.get(Zone, root.id).occupancy, db.session.get(Zone, child.id).occupancy) == (0, 1)
+
+    # Dashboard gradi stablo iz jednog upita (vrednosti iz baze - globalni engine nije ucitan)
+    response = app.test_client().get('/api/gates/dashboard/stats')
+    tree = response.get_json()['zones_tree']
+    assert [node['name'] for node in tree] == ["Aerodrom"]
+    assert [node['name'] for node in tree[0]['children']] == ["Sluzbeni"]
+
+
+@pytest.mark.parametrize("use_engine", [True, False])
+def test_deleting_user_inside_releases_occupancy(app, scenario, use_engine):
+    zone_id, tenant_id, entry_id, _, users = _setup(scenario)
+    if use_engine:
+        OCCUPANCY.recover()
+    try:
+        service = ParkingLogicService(None, occupancy=OCCUPANCY if use_engine else None)
+        assert service.handle_scan(entry_id, "RFID", "CARD-0")["allow"]
+        assert service.handle_scan(entry_id, "RFID", "CARD-1")["allow"]
+
+        if use_engine:
+            # Odluka koja je vec primljena u engine, a jos nije commit-ovana, ne sme da se izgubi
+            in_flight = OCCUPANCY.admit(zone_id, None, tenant_id, check_zone=False)[2]
+
+        response = app.test_client().delete(f'/api/users/{users[0].id}')
+        assert response.status_code == 200
+        assert ParkingSession.query.filter_by(exit_time=None).count() == 1
+
+        if use_engine:
+            assert OCCUPANCY.zone_counters(zone_id)[0] == 2
+            assert OCCUPANCY.tenant_counters(tenant_id)[0] == 2
+            OCCUPANCY.revert(in_flight)
+        db.session.expire_all()
+        if not use_engine:
+            assert db.session.get(Zone, zone_id).occupancy == 1
+            assert db.session.get(Tenant, tenant_id).current_usage == 1
+        # Oslobodjeno mesto je odmah slobodno
+        assert service.handle_scan(entry_id, "RFID", "CARD-2")["allow"]
+    finally:
+        OCCUPANCY.reset()
@@ -0,0 +1,86 @@
+# backend/tests/test_occupancy_broadcaster.py
+import sys
+import os
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.occupancy import OccupancyEngine
+from services.occupancy_broadcaster import OccupancyBroadcaster, EVENT_OCCUPANCY_BATCH
+from services.realtime_rooms import SUBSCRIPTIONS, ROOM_ALL
+from services.parking_service import ParkingLogicService
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.events = []
+        self.emitted = threading.Event()
+
+    def emit(self, event, payload, to=None, namespace=None):
+        self.events.append((event, payload))
+        self.emitted.set()
+
+
+@pytest.fixture(autouse=True)
+def dashboard():
+    # Operaterski dashboard pretplacen na sve
+    SUBSCRIPTIONS.reset()
+    SUBSCRIPTIONS.join("dashboard", [ROOM_ALL])
+    yield
+    SUBSCRIPTIONS.reset()
+
+
+def test_flush_sends_latest_value_per_zone():
+    socketio = FakeSocketIO()
+    broadcaster = OccupancyBroadcaster(socketio)
+    for occupancy in (1, 2, 3):
+        broadcaster.mark(7, "Garaza", occupancy, 10)
+    broadcaster.mark(8, "Nivo -1", 5, 0)
+
+    assert broadcaster.flush() == 2
+    assert broadcaster.flush() == 0
+
+    event, batch = socketio.events[0]
+    assert event == EVENT_OCCUPANCY_BATCH and len(socketio.events) == 1
+    zones = {z["zone_id"]: z for z in batch["zones"]}
+    assert zones[7]["current"] == 3 and zones[7]["percent"] == 30.0
+    assert zones[8]["percent"] == 0
+    stats = broadcaster.stats()
+    assert stats["marks"] == 4 and stats["zones_sent"] == 2 and stats["coalesced"] == 2
+
+
+def test_tick_thread_flushes_and_stop_drains():
+    socketio = FakeSocketIO()
+    broadcaster = OccupancyBroadcaster(socketio, tick_ms=10)
+    broadcaster.start()
+    try:
+        broadcaster.mark(1, "A", 1, 10)
+        assert socketio.emitted.wait(timeout=2)
+    finally:
+        broadcaster.mark(1, "A", 2, 10)
+        broadcaster.stop()
+    assert socketio.events[-1][1]["zones"][0]["current"] == 2
+    assert broadcaster.stats()["pending_zones"] == 0
+
+
+@pytest.mark.parametrize("use_engine", [True, False])
+def test_scans_do_not_emit_occupancy_on_decision_thread(scenario, use_engine):
+    setup = scenario(users=3)
+    gate, zone = setup.gate, setup.zone
+
+    socketio = FakeSocketIO()
+    broadcaster = OccupancyBroadcaster(socketio)
+    service = ParkingLogicService(socketio, occupancy=OccupancyEngine() if use_engine else None,
+                                  broadcaster=broadcaster)
+    for i in range(3):
+        assert service.handle_scan(gate.id, "RFID", f"CARD-{i}")["allow"]
+
+    # Na decision thread-u ide samo access_log
+    assert {event for event, _ in socketio.events} == {"access_log"}
+    broadcaster.flush()
+    event, batch = socketio.events[-1]
+    assert event == EVENT_OCCUPANCY_BATCH
+    assert batch["zones"] == [{"zone_id": zone.id, "zone_name": "Garaza", "current": 3,
+                               "capacity": 10, "percent": 30.0}]
@@ -0,0 +1,105 @@
+# backend/tests/test_realtime_rooms.py
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, Zone, Tenant
+from services.occupancy import OccupancyEngine
+from services.occupancy_broadcaster import OccupancyBroadcaster
+from services.parking_service import ParkingLogicService
+from services.realtime_rooms import SUBSCRIPTIONS, RoomSubscriptions, ROOM_ALL, parse_subscription
+
+
+def test_parse_subscription():
+    assert parse_subscription({"zones": [1], "gates": [2], "tenants": [3], "all": True}) == \
+        [ROOM_ALL, "zone:1", "gate:2", "tenant:3"]
+    with pytest.raises(ValueError):
+        parse_subscription({"zones": ["1"]})
+    with pytest.raises(ValueError):
+        parse_subscription(["zone:1"])
+
+
+def test_fanout_counts_each_client_once():
+    subs = RoomSubscriptions()
+    subs.join("a", ["zone:1", "gate:1"])
+    subs.join("b", ["zone:1"])
+
+    assert subs.audience("access_log", ["all", "zone:1", "gate:1"]) == ["zone:1", "gate:1"]
+    assert subs.audience("access_log", ["zone:2"]) == []
+
+    stats = subs.stats()
+    assert stats["rooms"]["zone:1"] == {"members": 2, "events": 1, "deliveries": 2}
+    assert stats["events"]["access_log"] == {"emitted": 1, "skipped_no_audience": 1, "deliveries": 2}
+
+    subs.drop("a")
+    assert subs.stats()["clients"] == 1
+    assert subs.stats()["rooms"]["gate:1"]["members"] == 0
+
+
+@pytest.fixture(autouse=True)
+def subscriptions():
+    SUBSCRIPTIONS.reset()
+    yield
+    SUBSCRIPTIONS.reset()
+
+
+def _setup(scenario):
+    """Kompleks -> Garaza (podzona); zasebna zona Lobby; korisnik tenanta Firma."""
+    tenant = Tenant(name="Firma", quota_limit=10)
+    complex_zone = Zone(name="Kompleks", capacity=100, occupancy=0)
+    lobby = Zone(name="Lobby", capacity=10, occupancy=0)
+    db.session.add_all([tenant, complex_zone, lobby])
+    db.session.commit()
+    setup = scenario(parent_zone_id=complex_zone.id, tenant_id=tenant.id, gate_name="Ulaz Garaza")
+    return setup.gate.id, complex_zone.id, setup.zone.id, lobby.id, tenant.id
+
+
+def _events(client):
+    return [(m["name"], m["args"][0]) for m in client.get_received()]
+
+
+def test_events_reach_only_subscribed_rooms(app_and_socketio, scenario):
+    app, socketio = app_and_socketio
+    gate_id, complex_id, garage_id, lobby_id, tenant_id = _setup(scenario)
+
+    operator = socketio.test_client(app)
+    building = socketio.test_client(app)
+    lobby = socketio.test_client(app)
+    tenant = socketio.test_client(app)
+    silent = socketio.test_client(app)
+    assert operator.emit('subscribe', {"all": True}, callback=True) == {"rooms": [ROOM_ALL]}
+    building.emit('subscribe', {"zones": [complex_id]}, callback=True)
+    lobby.emit('subscribe', {"zones": [lobby_id]}, callback=True)
+    tenant.emit('subscribe', {"tenants": [tenant_id]}, callback=True)
+    assert "error" in silent.emit('subscribe', {"gates": "x"}, callback=True)
+
+    engine = OccupancyEngine()
+    broadcaster = OccupancyBroadcaster(socketio, zone_path=engine.zone_path)
+    service = ParkingLogicService(socketio, occupancy=engine, broadcaster=broadcaster)
+    assert service.handle_scan(gate_id, "RFID", "CARD-0")["allow"]
+    broadcaster.flush()
+
+    operator_events = _events(operator)
+    assert [name for name, _ in operator_events] == ["access_log", "occupancy_batch"]
+    assert {z["zone_id"] for z in operator_events[1][1]["zones"]} == {complex_id, garage_id}
+
+    # Nadzona vidi sken u podzoni i popunjenost obe zone na putanji
+    building_events = _events(building)
+    assert [name for name, _ in building_events] == ["access_log", "occupancy_batch"]
+    assert {z["zone_id"] for z in building_events[1][1]["zones"]} == {complex_id, garage_id}
+
+    assert [name for name, _ in _events(tenant)] == ["access_log"]
+    assert _events(lobby) == []
+    assert _events(silent) == []
+
+    stats = SUBSCRIPTIONS.stats()
+    assert stats["rooms"][f"zone:{lobby_id}"] == {"members": 1, "events": 0, "deliveries": 0}
+    assert stats["events"]["access_log"]["deliveries"] == 3
+
+    tenant.emit('unsubscribe', {"tenants": [tenant_id]}, callback=True)
+    building.disconnect()
+    assert SUBSCRIPTIONS.stats()["rooms"][f"tenant:{tenant_id}"]["members"] == 0
+    assert SUBSCRIPTIONS.stats()["rooms"][f"zone:{complex_id}"]["members"] == 0
@@ -0,0 +1,75 @@
+# backend/tests/test_rule_index.py
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, Gate, Zone, Role, ValidationRule, RuleScope, RuleType
+from services.rule_index import RULE_INDEX
+
+
+@pytest.fixture
+def client(app):
+    zone = Zone(name="Garaza", capacity=10)
+    role = Role(name="Staff")
+    db.session.add_all([zone, role])
+    db.session.commit()
+    gate = Gate(name="Ulaz", zone_to_id=zone.id)
+    other_gate = Gate(name="Izlaz", zone_from_id=zone.id)
+    db.session.add_all([gate, other_gate])
+    db.session.commit()
+    RULE_INDEX.invalidate()
+    return app.test_client(), gate.id, other_gate.id, zone.id, role.id
+
+
+def test_rules_are_indexed_by_scope_and_ordered(client):
+    http, gate_id, other_gate_id, zone_id, role_id = client
+    db.session.add_all([
+        ValidationRule(scope=RuleScope.GLOBAL, rule_type=RuleType.CHECK_ANTIPASSBACK),
+        ValidationRule(scope=RuleScope.ZONE, rule_type=RuleType.CHECK_CAPACITY, target_zone_id=zone_id),
+        ValidationRule(scope=RuleScope.GATE, rule_type=RuleType.CHECK_SCHEDULE, target_gate_id=gate_id,
+                       custom_params='{"start_time": "08:00"}'),
+        ValidationRule(scope=RuleScope.ROLE, rule_type=RuleType.CHECK_PAYMENT, target_role_id=role_id),
+        ValidationRule(scope=RuleScope.GLOBAL, rule_type=RuleType.CHECK_BLACKLIST, is_enabled=False),
+    ])
+    db.session.commit()
+
+    rules = RULE_INDEX.rules_for(gate_id, zone_id, role_id)
+    assert [r.rule_type for r in rules] == [
+        RuleType.CHECK_ANTIPASSBACK, RuleType.CHECK_CAPACITY, RuleType.CHECK_SCHEDULE, RuleType.CHECK_PAYMENT
+    ]
+    assert rules[2].params["start_time"] == "08:00"
+    assert RULE_INDEX.rules_for(gate_id, zone_id, role_id) is rules
+
+    other = RULE_INDEX.rules_for(other_gate_id, None, None)
+    assert [r.rule_type for r in other] == [RuleType.CHECK_ANTIPASSBACK]
+
+
+def test_invalid_params_do_not_break_compilation(client):
+    http, gate_id, _, zone_id, _ = client
+    db.session.add(ValidationRule(scope=RuleScope.GLOBAL, rule_type=RuleType.CHECK_SCHEDULE, custom_params="{oops"))
+    db.session.commit()
+
+    rules = RULE_INDEX.rules_for(gate_id, zone_id, None)
+    assert len(rules) == 1 and dict(rules[0].params) == {}
+
+
+def test_toggle_and_delete_routes_rebuild_index(client):
+    http, gate_id, _, zone_id, _ = client
+    rule = ValidationRule(scope=RuleScope.ZONE, rule_type=RuleType.CHECK_CAPACITY, target_zone_id=zone_id)
+    db.session.add(rule)
+    db.session.commit()
+    rule_id = rule.id
+
+    assert len(RULE_INDEX.rules_for(gate_id, zone_id, None)) == 1
+    http.post(f'/api/rules/{rule_id}/toggle')
+    assert RULE_INDEX.rules_for(gate_id, zone_id, None) == ()
+    http.post(f'/api/rules/{rule_id}/toggle')
+    assert len(RULE_INDEX.rules_for(gate_id, zone_id, None)) == 1
+
+    http.post('/api/rules/init')
+    assert [r.scope for r in RULE_INDEX.rules_for(gate_id, zone_id, None)] == [
+        RuleScope.ZONE, RuleScope.GLOBAL, RuleScope.GLOBAL
+    ]
@@ -0,0 +1,120 @@
+# backend/tests/test_scan_log_writer.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, ScanLog, CredentialType
+from services.scan_log_writer import ScanLogWriter
+from services.parking_service import ParkingLogicService
+
+
+def _row(event_id, payload="CARD-1"):
+    return {"event_id": event_id, "gate_name_snapshot": "Ulaz", "scan_type": CredentialType.RFID,
+            "raw_payload": payload, "is_access_granted": True, "denial_reason": "ACCESS_GRANTED"}
+
+
+def test_batch_insert_and_ack_before_flush(app):
+    writer = ScanLogWriter(app)
+    for i in range(5):
+        writer.write(_row(f"ev{i}", f"CARD-{i}"))
+    # Ack stize pre nego sto je red upisan - vezuje se preko event_id
+    writer.record_ack("ev2", "ACKED", "ok", 1)
+
+    assert ScanLog.query.count() == 0
+    assert writer.flush_now() == 6
+
+    assert ScanLog.query.count() == 5
+    acked = ScanLog.query.filter_by(event_id="ev2").one()
+    assert acked.hw_ack_status == "ACKED" and acked.hw_ack_attempts == 1
+    stats = writer.stats()
+    assert stats["flushes"] == 1 and stats["written"] == 5 and stats["acks"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_spill_to_disk_when_db_is_down(app, tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    writer = ScanLogWriter(app, spill_path=str(spill))
+
+    ScanLog.__table__.drop(db.engine)
+    writer.write(_row("ev1"))
+    writer.record_ack("ev1", "FAILED", "timeout", 3)
+    writer.flush_now()
+    assert writer.stats()["flush_errors"] >= 1
+    assert writer.stats()["spill_pending"]
+    assert len(spill.read_text().splitlines()) == 2
+
+    # Baza se vratila - spill se upisuje pri sledecem flush-u
+    ScanLog.__table__.create(db.engine)
+    writer.write(_row("ev2", "CARD-2"))
+    writer.flush_now()
+
+    assert ScanLog.query.count() == 2
+    assert ScanLog.query.filter_by(event_id="ev1").one().hw_ack_status == "FAILED"
+    assert not writer.stats()["spill_pending"]
+    assert writer.stats()["replayed"] == 2
+
+
+def test_overflow_goes_to_spill(app, tmp_path):
+    writer = ScanLogWriter(app, capacity=2, spill_path=str(tmp_path / "spill.jsonl"))
+    for i in range(4):
+        writer.write(_row(f"ev{i}", f"CARD-{i}"))
+    assert writer.stats()["overflowed"] == 2
+
+    writer.flush_now()
+    assert ScanLog.query.count() == 4
+
+
+def test_decision_does_not_write_scan_log_synchronously(scenario, app):
+    entry = scenario().gate
+
+    writer = ScanLogWriter(app)
+    service = ParkingLogicService(None, log_writer=writer)
+    granted = service.handle_scan(entry.id, "RFID", "CARD-0")
+    denied = service.handle_scan(entry.id, "RFID", "NEPOZNATA")
+
+    assert granted["allow"] and granted["scan_log_id"] is None
+    assert denied["reason"] == "UNKNOWN_CREDENTIAL"
+    assert ScanLog.query.count() == 0
+
+    writer.flush_now()
+    log = ScanLog.query.filter_by(event_id=granted["scan_event_id"]).one()
+    assert log.is_access_granted
+    assert ScanLog.query.count() == 2
+
+
+def test_bad_row_is_rejected_without_blocking_batch(app, tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    writer = ScanLogWriter(app, spill_path=str(spill))
+    writer.write(_row("ev1"))
+    writer.flush_now()
+
+    # Duplikat event_id nikad ne prolazi - ostali redovi iz batch-a se ipak upisuju
+    writer.write(_row("ev2", "CARD-2"))
+    writer.write(_row("ev1"))
+    writer.write(_row("ev3", "CARD-3"))
+    assert writer.flush_now() == 2
+
+    assert ScanLog.query.count() == 3
+    stats = writer.stats()
+    assert stats["rejected"] == 1 and stats["flush_errors"] == 1
+    assert stats["spilled"] == 0 and not stats["spill_pending"]
+
+
+def test_spill_is_kept_until_written(app, tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    writer = ScanLogWriter(app, spill_path=str(spill))
+
+    ScanLog.__table__.drop(db.engine)
+    writer.write(_row("ev1"))
+    writer.flush_now()
+    # Ponovljeni flush dok baza ne radi ne brise spill i ne dopisuje iste redove
+    writer.flush_now()
+    writer.flush_now()
+    assert len(spill.read_text().splitlines()) == 1
+    assert writer.stats()["spilled"] == 1
+
+    ScanLog.__table__.create(db.engine)
+    writer.flush_now()
+    assert ScanLog.query.count() == 1
+    assert spill.read_text() == ""
@@ -0,0 +1,52 @@
+# backend/tests/test_schema_upgrade.py
+import sys
+import os
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, ParkingSession, ScanLog, CredentialType, Credential, upgrade_schema
+
+ADDED_COLUMNS = {
+    "parking_sessions": {"zone_id"},
+    "scan_logs": {"event_id", "hw_ack_status", "hw_ack_message", "hw_ack_attempts", "hw_ack_at"},
+}
+
+
+def _recreate_without(table, columns):
+    """Tabela kakva je bila pre novih kolona (DDL iz modela bez njihovih linija)."""
+    ddl = str(CreateTable(table).compile(db.engine)).strip()
+    head, body = ddl.split("(", 1)
+    parts = [line.strip().rstrip(",").strip() for line in body.rsplit(")", 1)[0].split("\n")]
+    kept = [p for p in parts if p and not any(name in p.replace("(", " ").replace(")", " ").split() for name in columns)]
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {table.name}"))
+        conn.execute(text(f"{head}({', '.join(kept)})"))
+
+
+def test_old_database_gets_new_columns(app, scenario):
+    for model in (ParkingSession, ScanLog):
+        _recreate_without(model.__table__, ADDED_COLUMNS[model.__tablename__])
+    db.session.remove()
+    inspector = inspect(db.engine)
+    assert "zone_id" not in {c["name"] for c in inspector.get_columns("parking_sessions")}
+
+    added = upgrade_schema()
+    assert sorted(added) == sorted(f"{t}.{c}" for t, cols in ADDED_COLUMNS.items() for c in cols)
+    assert "ix_scan_logs_event_id" in {i["name"] for i in inspect(db.engine).get_indexes("scan_logs")}
+    # Drugi poziv nema sta da doda
+    assert upgrade_schema() == []
+
+    setup = scenario()
+    user = setup.users[0]
+    cred = Credential.query.filter_by(user_id=user.id).one()
+    db.session.add(ParkingSession(user_id=user.id, credential_id=cred.id, entry_gate_id=setup.gate.id,
+                                  entry_time=datetime.now(), zone_id=setup.zone.id))
+    db.session.add(ScanLog(gate_name_snapshot="Ulaz", scan_type=CredentialType.RFID, raw_payload="CARD-0",
+                           is_access_granted=True, event_id="ev1", hw_ack_status="ACKED"))
+    db.session.commit()
+    assert ParkingSession.query.one().zone_id == setup.zone.id
+    assert ScanLog.query.filter_by(event_id="ev1").one().hw_ack_status == "ACKED"
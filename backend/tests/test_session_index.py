@@ -0,0 +1,121 @@
+# backend/tests/test_session_index.py
+import sys
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import db, User, Zone, Gate, Credential, ParkingSession, Role, ValidationRule, RuleScope, RuleType
+from services import session_index
+from services.session_index import ActiveSessionIndex, ActiveSession
+from services.occupancy import OccupancyEngine
+from services.parking_service import ParkingLogicService
+from services.debounce import SCAN_DEBOUNCE
+
+
+def _setup():
+    """Kompleks (ulaz) -> Garaza A -> interni gejt -> Garaza B -> izlaz."""
+    role = Role(name="Guest")
+    zone_a = Zone(name="A", capacity=10, occupancy=0)
+    zone_b = Zone(name="B", capacity=10, occupancy=0)
+    db.session.add_all([role, zone_a, zone_b])
+    db.session.commit()
+
+    gates = {
+        "entry": Gate(name="Ulaz", zone_to_id=zone_a.id),
+        "a_to_b": Gate(name="A->B", zone_from_id=zone_a.id, zone_to_id=zone_b.id),
+        "b_to_a": Gate(name="B->A", zone_from_id=zone_b.id, zone_to_id=zone_a.id),
+        "exit_b": Gate(name="Izlaz B", zone_from_id=zone_b.id),
+    }
+    user = User(first_name="Pera", last_name="Peric", role_id=role.id)
+    db.session.add_all(list(gates.values()) + [user])
+    db.session.flush()
+    db.session.add(Credential(user_id=user.id, cred_type="RFID", cred_value="CARD-1"))
+    db.session.add(ValidationRule(rule_type=RuleType.CHECK_ANTIPASSBACK, scope=RuleScope.GLOBAL))
+    db.session.commit()
+    return {name: gate.id for name, gate in gates.items()}, zone_a.id, zone_b.id, user.id
+
+
+def _scan(service, gate_id):
+    SCAN_DEBOUNCE.reset()
+    return service.handle_scan(gate_id, "RFID", "CARD-1")
+
+
+@pytest.mark.parametrize("with_index", [True, False])
+def test_transit_apb_uses_current_zone(app, with_index):
+    gates, zone_a, zone_b, user_id = _setup()
+    index = ActiveSessionIndex() if with_index else None
+    service = ParkingLogicService(None, occupancy=OccupancyEngine(), sessions=index)
+
+    assert _scan(service, gates["entry"])["allow"]
+    # Nije u zoni B - ne moze kroz B->A ni kroz izlaz iz B
+    assert _scan(service, gates["b_to_a"])["reason"] == "APB_VIOLATION_WRONG_ZONE"
+    assert _scan(service, gates["a_to_b"])["allow"]
+    assert _scan(service, gates["a_to_b"])["reason"] == "APB_VIOLATION_WRONG_ZONE"
+
+    session = ParkingSession.query.filter_by(user_id=user_id, exit_time=None).one()
+    assert session.zone_id == zone_b
+    if with_index:
+        assert index.get(user_id).zone_id == zone_b
+
+    assert _scan(service, gates["exit_b"])["allow"]
+    assert _scan(service, gates["exit_b"])["reason"] == "NO_ENTRY_RECORD"
+    if with_index:
+        assert index.get(user_id) is None
+
+
+def test_apb_decides_without_reading_sessions(app):
+    gates, _, _, user_id = _setup()
+    index = ActiveSessionIndex()
+    service = ParkingLogicService(None, occupancy=OccupancyEngine(), sessions=index)
+    assert _scan(service, gates["entry"])["allow"]
+
+    selects = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "parking_sessions" in statement:
+            selects.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        assert _scan(service, gates["entry"])["reason"] == "ALREADY_INSIDE"
+        assert _scan(service, gates["a_to_b"])["allow"]
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+    assert selects == []
+
+
+def test_load_falls_back_to_entry_gate_zone(app):
+    gates, zone_a, _, user_id = _setup()
+    cred = Credential.query.filter_by(user_id=user_id).one()
+    # Sesija upisana pre zone_id kolone
+    db.session.add(ParkingSession(user_id=user_id, credential_id=cred.id, entry_gate_id=gates["entry"],
+                                  entry_time=datetime.now()))
+    db.session.commit()
+
+    index = ActiveSessionIndex()
+    index.load()
+    assert index.get(user_id).zone_id == zone_a
+    assert index.stats()["active_sessions"] == 1
+
+
+def test_set_during_load_survives_the_new_snapshot(monkeypatch):
+    index = ActiveSessionIndex()
+    entered = ActiveSession(7, 1, 3)
+
+    def query_while_worker_commits():
+        # Worker zabelezi ulaz (user 1) i izlaz (user 2) dok load() cita bazu
+        index.set(1, entered)
+        index.set(2, None)
+        return SimpleNamespace(all=lambda: [(5, 2, 3)])
+
+    monkeypatch.setattr(session_index, "active_session_query", query_while_worker_commits)
+    index.ensure_loaded()
+
+    assert index.is_loaded
+    assert index.get(1) == entered
+    assert index.get(2) is None
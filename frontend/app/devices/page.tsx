@@ -9,6 +9,7 @@ interface Device {
   name: string;
   ip_address: string;
   port: number;
+  ingress_port: number | null;
   device_type: string;
   gate_id: number | null;
   gate_name: string;
@@ -34,6 +35,7 @@ export default function DevicesPage() {
     name: "",
     ip_address: "",
     port: 80,
+    ingress_port: "",
     device_type: "CONTROLLER",
     gate_id: ""
   });
@@ -69,7 +71,7 @@ export default function DevicesPage() {
   // --- HANDLERS ZA FORMU ---
   const handleOpenAdd = () => {
     setEditingId(null);
-    setFormData({ name: "", ip_address: "", port: 80, device_type: "CONTROLLER", gate_id: "" });
+    setFormData({ name: "", ip_address: "", port: 80, ingress_port: "", device_type: "CONTROLLER", gate_id: "" });
     setShowModal(true);
   };
 
@@ -79,6 +81,7 @@ export default function DevicesPage() {
         name: dev.name,
         ip_address: dev.ip_address,
         port: dev.port,
+        ingress_port: dev.ingress_port ? String(dev.ingress_port) : "",
         device_type: dev.device_type,
         gate_id: dev.gate_id ? String(dev.gate_id) : ""
     });
@@ -249,6 +252,13 @@ export default function DevicesPage() {
                                 className="w-full p-2.5 border border-slate-300 rounded-lg font-mono text-sm focus:ring-2 focus:ring-blue-500 outline-none" 
                                 value={formData.port} onChange={e => setFormData({...formData, port: Number(e.target.value)})}/>
                         </div>
+                        <div className="w-24">
+                            <label htmlFor="ingress_port" className="block text-xs font-bold text-slate-500 mb-1 uppercase tracking-wider">Scan Port</label>
+                            <input id="ingress_port" type="number" 
+                                className="w-full p-2.5 border border-slate-300 rounded-lg font-mono text-sm focus:ring-2 focus:ring-blue-500 outline-none" 
+                                value={formData.ingress_port} onChange={e => setFormData({...formData, ingress_port: e.target.value})}
+                                placeholder="auto"/>
+                        </div>
                     </div>
 
                     <div className="grid grid-cols-2 gap-4">
@@ -159,6 +159,11 @@ export default function Dashboard() {
     const newSocket = io("http://127.0.0.1:5000", { transports: ["websocket"] });
     setSocket(newSocket);
 
+    // Server salje evente samo pretplacenim klijentima (sobe po zoni / gejtu / tenantu ili sve)
+    newSocket.on("connect", () => {
+      newSocket.emit("subscribe", { all: true });
+    });
+
     newSocket.on("access_log", (newLog: Log) => {
       // Kada stigne log, ubacujemo ga u niz TAČNO ODREĐENOG gejta
       setGateLogs((prevLogs) => {
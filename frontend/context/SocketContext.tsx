@@ -1,6 +1,6 @@
 "use client";
 
-import React, { createContext, useContext, useEffect, useState } from "react";
+import React, { createContext, useContext, useEffect, useRef, useState } from "react";
 import { io, Socket } from "socket.io-client";
 import { AccessLog, Zone } from "@/types";
 
@@ -11,6 +11,25 @@ interface SocketContextType {
   zones: Zone[];
 }
 
+const API_URL = "http://127.0.0.1:5000";
+
+// Snapshot (type: "snapshot") ili delta (type: "delta") stanja dashboard-a sa servera
+interface DashboardUpdate {
+  type: "snapshot" | "delta" | "resync";
+  version: number;
+  from_version?: number;
+  zones?: Zone[];
+}
+
+// Jedna zona iz occupancy_update / occupancy_batch (services/occupancy_broadcaster.py)
+interface OccupancyPayload {
+  zone_id: number;
+  zone_name: string;
+  current: number;
+  capacity: number;
+  percent: number;
+}
+
 const SocketContext = createContext<SocketContextType>({
   socket: null,
   isConnected: false,
@@ -25,11 +44,48 @@ export const SocketProvider = ({ children }: { children: React.ReactNode }) => {
   const [isConnected, setIsConnected] = useState(false);
   const [logs, setLogs] = useState<AccessLog[]>([]);
   const [zones, setZones] = useState<Zone[]>([]);
+  // Verzija stanja dashboard-a koju klijent ima (null = jos nema snapshot)
+  const versionRef = useRef<number | null>(null);
+
+  const applyDashboard = (update: DashboardUpdate) => {
+    if (update.type === "snapshot") {
+      setZones(update.zones || []);
+    } else if (update.zones && update.zones.length) {
+      const changed = new Map(update.zones.map((z) => [z.id, z]));
+      setZones((prev) => prev.map((z) => changed.get(z.id) || z));
+    }
+    versionRef.current = update.version;
+  };
+
+  // Popunjenost stize cesce od dashboard delte - upisuje se u iste zone (parent_id ostaje)
+  const applyOccupancy = (payloads: OccupancyPayload[]) => {
+    if (!payloads.length) return;
+    const changed = new Map(payloads.map((p) => [p.zone_id, p]));
+    setZones((prev) =>
+      prev.map((z) => {
+        const p = changed.get(z.id);
+        return p
+          ? { ...z, occupancy: p.current, capacity: p.capacity, percent_full: p.percent }
+          : z;
+      })
+    );
+  };
+
+  // Samo promene od poslednje poznate verzije (server vraca snapshot ako je verzija prestara)
+  const resyncDashboard = async () => {
+    const since = versionRef.current === null ? "" : `?since=${versionRef.current}`;
+    try {
+      const res = await fetch(`${API_URL}/api/gates/dashboard/state${since}`);
+      applyDashboard(await res.json());
+    } catch (err) {
+      console.error("❌ Dashboard state fetch failed:", err);
+    }
+  };
 
   useEffect(() => {
     // ⚠️ PROMENA: Koristimo 127.0.0.1 umesto localhost radi stabilnosti na Windowsu
     // Uklonili smo 'transports: websocket' da dozvolimo polling ako treba
-    const socketInstance = io("http://127.0.0.1:5000", {
+    const socketInstance = io(API_URL, {
       reconnectionAttempts: 5,
       reconnectionDelay: 1000,
       autoConnect: true,
@@ -38,6 +94,10 @@ export const SocketProvider = ({ children }: { children: React.ReactNode }) => {
     socketInstance.on("connect", () => {
       console.log("✅ SOCKET CONNECTED! ID:", socketInstance.id);
       setIsConnected(true);
+      // Bez pretplate server ne salje evente; operaterski dashboard prati sve sobe
+      socketInstance.emit("subscribe", { all: true });
+      // Posle (re)konekcije dopuni stanje od poslednje verzije
+      resyncDashboard();
     });
 
     socketInstance.on("connect_error", (err) => {
@@ -55,8 +115,25 @@ export const SocketProvider = ({ children }: { children: React.ReactNode }) => {
       setLogs((prev) => [data, ...prev].slice(0, 50));
     });
 
-    socketInstance.on("occupancy_update", (data: any) => {
+    socketInstance.on("occupancy_update", (data: OccupancyPayload) => {
        console.log("📊 EVENT RECEIVED (Occupancy):", data);
+       applyOccupancy([data]);
+    });
+
+    // Backend salje popunjenost spojeno, jednom po tick-u (samo poslednje stanje po zoni)
+    socketInstance.on("occupancy_batch", (data: { seq: number; zones: OccupancyPayload[] }) => {
+       applyOccupancy(data.zones || []);
+    });
+
+    socketInstance.on("dashboard_delta", (update: DashboardUpdate) => {
+      if (update.type === "resync") {
+        if (update.version !== versionRef.current) resyncDashboard();
+      } else if (update.from_version !== versionRef.current) {
+        // Propustena delta - trazimo sve od nase verzije
+        resyncDashboard();
+      } else {
+        applyDashboard(update);
+      }
     });
 
     setSocket(socketInstance);
@@ -4,6 +4,7 @@ export interface Zone {
   capacity: number;
   occupancy: number;
   percent_full: number;
+  parent_id?: number | null;
   children?: Zone[];
 }
 